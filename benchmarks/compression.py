@@ -0,0 +1,110 @@
+"""
+Сжатие снимков таблиц и резервная копия (compression.py, backup.py).
+
+Таблица из --rows строк сохраняется в режиме json с каждым кодеком;
+для каждого замеряются размер файла, время записи и время чтения таблицы
+с диска (разбор без кэша) и select по условию. Затем замеряются backup
+и restore базы с несжатой таблицей: объём копии и время.
+
+Запуск из корня репозитория:
+    python -m benchmarks.compression --rows 200000 --codecs none,zlib,lzma
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from src.primitive_db.backup import backup_database, restore_database
+from src.primitive_db.cache import table_cache
+from src.primitive_db.core import iter_select
+from src.primitive_db.utils import (
+    METADATA_FILE,
+    load_table_data,
+    save_metadata,
+    save_table_data,
+    table_filepath,
+)
+from src.primitive_db.where import parse_where
+
+TABLE = "bench"
+COLUMNS = [['id', 'int'], ['name', 'str'], ['city', 'str'], ['age', 'int'],
+           ['active', 'bool']]
+CITIES = ("Москва", "Казань", "Омск", "Пермь")
+CONDITION = "age >= 30 and age < 40 and active = true"
+
+
+def make_records(rows):
+    return [
+        {'id': i + 1, 'name': f"user{i}", 'city': CITIES[i % len(CITIES)],
+         'age': i * 7 % 90, 'active': i % 3 == 0}
+        for i in range(rows)
+    ]
+
+
+def best(function, repeat):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - started)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--codecs', default='none,zlib,lzma')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    records = make_records(args.rows)
+    condition = parse_where(CONDITION)
+    root = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        try:
+            for codec in args.codecs.split(','):
+                table_info = {'columns': COLUMNS, 'compression': codec}
+                save_metadata(METADATA_FILE, {'tables': {TABLE: table_info}})
+                written = best(
+                    lambda: save_table_data(TABLE, records, table_info), 1
+                )
+                size = os.path.getsize(table_filepath(TABLE))
+
+                def load():
+                    table_cache.clear()
+                    return load_table_data(TABLE, table_info)
+
+                def select():
+                    return sum(1 for _ in iter_select(load(), condition))
+
+                print(
+                    f"{codec}: {size} байт, запись {written:.3f} с, "
+                    f"чтение {best(load, args.repeat):.3f} с, "
+                    f"select {best(select, args.repeat):.3f} с"
+                )
+
+            # копия базы с несжатой таблицей — то, что раньше копировалось каталогом
+            table_info = {'columns': COLUMNS}
+            save_metadata(METADATA_FILE, {'tables': {TABLE: table_info}})
+            save_table_data(TABLE, records, table_info)
+            started = time.perf_counter()
+            manifest = backup_database(METADATA_FILE, 'backup')
+            backup_time = time.perf_counter() - started
+            started = time.perf_counter()
+            restore_database(METADATA_FILE, 'backup')
+            restore_time = time.perf_counter() - started
+            files = manifest['files'].values()
+            print(
+                f"backup: {sum(info['size'] for info in files)} -> "
+                f"{sum(info['stored'] for info in files)} байт за "
+                f"{backup_time:.3f} с, restore {restore_time:.3f} с"
+            )
+            shutil.rmtree('backup')
+        finally:
+            os.chdir(root)
+
+
+if __name__ == '__main__':
+    main()
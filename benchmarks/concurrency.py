@@ -0,0 +1,187 @@
+"""
+Стресс-тест одновременной работы нескольких процессов с одной базой.
+
+1. Масштабирование читателей: N процессов выполняют select с WHERE, пока
+   отдельный процесс непрерывно вставляет строки. Читатели не берут
+   блокировок, поэтому суммарная пропускная способность растёт с N
+   (пока хватает ядер), а писатель не останавливается.
+2. Безопасность id: несколько процессов одновременно вставляют строки
+   в одну таблицу, пока читатели выполняют select по индексам; все строки
+   должны сохраниться с уникальными id. Проверяется и таблица с hash-индексами
+   по age и name: индексы на диске должны совпасть с перестроенными заново.
+
+Запуск из корня репозитория:
+    python -m benchmarks.concurrency --rows 20000 --readers 1,2,4
+"""
+import argparse
+import contextlib
+import io
+import multiprocessing
+import os
+import tempfile
+import time
+
+from src.primitive_db.cache import table_cache
+from src.primitive_db.core import (
+    add_index,
+    bulk_insert,
+    create_table,
+    insert,
+    iter_select,
+)
+from src.primitive_db.indexes import build_index, load_table_indexes
+from src.primitive_db.utils import (
+    load_metadata,
+    load_table_data,
+    save_metadata,
+)
+
+METADATA_FILE = "db_meta.json"
+TABLE = "bench"
+
+
+def _quiet():
+    return contextlib.redirect_stdout(io.StringIO())
+
+
+INDEXED_COLUMNS = ('age', 'name')
+
+
+def setup(directory, rows, storage, indexed=False):
+    os.chdir(directory)
+    table_cache.clear()
+    with _quiet():
+        metadata = create_table(load_metadata(METADATA_FILE), TABLE,
+                                [('name', 'str'), ('age', 'int')])
+        metadata['tables'][TABLE]['storage'] = storage
+        if indexed:
+            for column in INDEXED_COLUMNS:
+                metadata = add_index(metadata, TABLE, column)
+        save_metadata(METADATA_FILE, metadata)
+        bulk_insert(metadata, TABLE, ([f"user{i}", i % 100] for i in range(rows)))
+
+
+def reader(directory, stop_at, results, condition=('cmp', '>=', 'age', 90)):
+    os.chdir(directory)
+    queries = 0
+    while time.monotonic() < stop_at:
+        table_info = load_metadata(METADATA_FILE)['tables'][TABLE]
+        table_data = load_table_data(TABLE, table_info)
+        indexes = load_table_indexes(TABLE, table_info, table_data)
+        sum(1 for _ in iter_select(table_data, condition, indexes))
+        queries += 1
+    results.put(('reader', queries))
+
+
+def writer(directory, stop_at, results, limit=None):
+    os.chdir(directory)
+    inserted = 0
+    with _quiet():
+        while time.monotonic() < stop_at and (limit is None or inserted < limit):
+            metadata = load_metadata(METADATA_FILE)
+            insert(metadata, TABLE, [f"new{os.getpid()}_{inserted}", "1"])
+            inserted += 1
+    results.put(('writer', inserted))
+
+
+def _run(processes):
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+
+def reader_scaling(context, rows, storage, reader_counts, duration):
+    print(f"Читатели + 1 писатель, {rows} строк, хранение '{storage}', "
+          f"{duration:g} с на замер")
+    for count in reader_counts:
+        with tempfile.TemporaryDirectory() as directory:
+            setup(directory, rows, storage)
+            results = context.Queue()
+            stop_at = time.monotonic() + duration
+            processes = [
+                context.Process(target=reader, args=(directory, stop_at, results))
+                for _ in range(count)
+            ]
+            processes.append(
+                context.Process(target=writer, args=(directory, stop_at, results))
+            )
+            _run(processes)
+            totals = {'reader': 0, 'writer': 0}
+            for _ in processes:
+                role, value = results.get()
+                totals[role] += value
+        print(
+            f"  читателей {count}: {totals['reader'] / duration:.1f} select/с, "
+            f"писатель: {totals['writer'] / duration:.1f} insert/с"
+        )
+
+
+def id_safety(context, storage, writers, rows_per_writer, readers=0, indexed=False):
+    with tempfile.TemporaryDirectory() as directory:
+        setup(directory, 0, storage, indexed)
+        results = context.Queue()
+        processes = [
+            context.Process(
+                target=writer,
+                args=(directory, time.monotonic() + 3600, results, rows_per_writer),
+            )
+            for _ in range(writers)
+        ]
+        # читатели работают, пока идёт вставка (оценка сверху по времени)
+        stop_at = time.monotonic() + max(1.0, writers * rows_per_writer * 0.01)
+        processes += [
+            context.Process(
+                target=reader,
+                args=(directory, stop_at, results, ('cmp', '=', 'age', 1)),
+            )
+            for _ in range(readers)
+        ]
+        _run(processes)
+        failed = [process.exitcode for process in processes if process.exitcode]
+        table_cache.clear()
+        table_info = load_metadata(METADATA_FILE)['tables'][TABLE]
+        table_data = load_table_data(TABLE, table_info)
+        ids = [record['id'] for record in table_data]
+        stale = [
+            column for column, index in
+            load_table_indexes(TABLE, table_info, table_data).items()
+            if index['hash'] != build_index(table_data, column)['hash']
+        ]
+    expected = writers * rows_per_writer
+    ok = len(ids) == expected == len(set(ids)) and not failed and not stale
+    status = "OK" if ok else "ОШИБКА"
+    print(
+        f"Одновременная вставка{' с индексами' if indexed else ''}: "
+        f"{writers} процессов по {rows_per_writer} строк, читателей {readers}, "
+        f"сохранено {len(ids)} из {expected}, уникальных id {len(set(ids))}, "
+        f"упавших процессов {len(failed)}, расхождений индексов {len(stale)} "
+        f"— {status}"
+    )
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--storage', choices=('json', 'log', 'binary'), default='log')
+    parser.add_argument('--readers', default='1,2,4')
+    parser.add_argument('--duration', type=float, default=3.0)
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--inserts', type=int, default=50)
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context('spawn')
+    counts = [int(count) for count in args.readers.split(',')]
+    reader_scaling(context, args.rows, args.storage, counts, args.duration)
+    safe = [
+        id_safety(context, args.storage, args.writers, args.inserts, indexed=indexed,
+                  readers=2 if indexed else 0)
+        for indexed in (False, True)
+    ]
+    if not all(safe):
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,271 @@
+"""
+Набор замеров CRUD-операций для сравнения коммитов: database bench.
+
+Для каждого размера таблицы (--rows, например 1000,100000,10000000)
+и каждого режима хранения (--storage) во временном каталоге создаётся
+синтетическая таблица со столбцами заданных типов (--columns) и индексом
+по id, затем измеряются:
+
+    bulk_load      загрузка всех строк пачками (executemany)
+    insert         одиночные insert
+    point_select   select по id (hash-индекс)
+    filtered_scan  select с условием по столбцу без индекса
+    update         update по id
+    delete         delete по id
+    cold_start     новый процесс database, выполняющий один select по id
+
+и размер файлов таблицы. Результат — JSON с перцентилями задержек
+(p50/p95/p99/max, секунды) на stdout или в --output; ход замеров — в stderr.
+
+Запуск из корня репозитория:
+    python -m benchmarks.crud --rows 1000,100000 --storage json,log,binary
+    database bench --rows 1000,10000,100000 --output bench.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+from src.primitive_db.api import connect
+from src.primitive_db.cache import table_cache
+from src.primitive_db.core import set_storage
+from src.primitive_db.utils import (
+    METADATA_FILE,
+    STORAGE_MODES,
+    load_metadata,
+    save_metadata,
+)
+
+TABLE = "bench"
+TYPES = ('int', 'str', 'bool')
+LOAD_BATCH = 100_000
+# Значения int-столбцов — от 0 до INT_RANGE: условие "< 1%" отбирает 1% строк
+INT_RANGE = 1000
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentiles(latencies):
+    """Сводка задержек в секундах: число замеров, p50/p95/p99, max, среднее"""
+    values = sorted(latencies)
+    if not values:
+        return {'count': 0}
+
+    def rank(fraction):
+        return values[min(len(values) - 1, int(len(values) * fraction))]
+
+    return {
+        'count': len(values),
+        'p50': rank(0.5),
+        'p95': rank(0.95),
+        'p99': rank(0.99),
+        'max': values[-1],
+        'mean': sum(values) / len(values),
+    }
+
+
+def make_columns(types):
+    return [(f"c{i}", col_type) for i, col_type in enumerate(types)]
+
+
+def make_row(columns, i):
+    row = []
+    for _, col_type in columns:
+        if col_type == 'int':
+            row.append(i * 7919 % INT_RANGE)
+        elif col_type == 'bool':
+            row.append(i % 2 == 0)
+        else:
+            row.append(f"value{i}")
+    return row
+
+
+def timed(function, repeat):
+    latencies = []
+    for i in range(repeat):
+        started = time.perf_counter()
+        function(i)
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def scan_clause(columns):
+    """Условие для просмотра без индекса: ~1% строк"""
+    for name, col_type in columns:
+        if col_type == 'int':
+            return f"{name} < ?", INT_RANGE // 100
+    name, col_type = columns[0]
+    return f"{name} = ?", True if col_type == 'bool' else "value0"
+
+
+def cold_start(directory, repeat):
+    """Время нового процесса database с одним select по id"""
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    command = [sys.executable, "-m", "src.primitive_db.main", "--script", "-"]
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        subprocess.run(
+            command, input=f"select {TABLE} where id = 1\n", text=True, cwd=directory,
+            env=env, stdout=subprocess.DEVNULL, check=True,
+        )
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def files_size(directory):
+    total = 0
+    for folder, _, files in os.walk(directory):
+        total += sum(os.path.getsize(os.path.join(folder, name)) for name in files)
+    return total
+
+
+def run_case(storage, rows, columns, ops, scans, cold_runs, rng):
+    """Замеры одной таблицы: rows строк в режиме storage"""
+    names = ' '.join(f"{name}:{col_type}" for name, col_type in columns)
+    values = ' '.join('?' for _ in columns)
+    scan, scan_value = scan_clause(columns)
+    update_column = columns[0][0]
+    root = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        table_cache.clear()
+        try:
+            with connect() as db:
+                db.execute(f"create_table {TABLE} {names}")
+                db.execute(f"create_index {TABLE} id")
+                with contextlib.redirect_stdout(io.StringIO()):
+                    metadata = set_storage(
+                        load_metadata(METADATA_FILE), TABLE, storage
+                    )
+                save_metadata(METADATA_FILE, metadata)
+
+                started = time.perf_counter()
+                for start in range(0, rows, LOAD_BATCH):
+                    db.executemany(
+                        f"insert {TABLE} {values}",
+                        [
+                            make_row(columns, i)
+                            for i in range(start, min(start + LOAD_BATCH, rows))
+                        ],
+                    )
+                load_time = time.perf_counter() - started
+
+                insert = db.prepare(f"insert {TABLE} {values}")
+                point = db.prepare(f"select * from {TABLE} where id = ?")
+                filtered = db.prepare(f"select * from {TABLE} where {scan}")
+                update = db.prepare(
+                    f"update {TABLE} set {update_column} = ? where id = ?"
+                )
+                delete = db.prepare(f"delete {TABLE} where id = ?")
+                new_row = make_row(columns, rows)
+                ids = [rng.randrange(1, rows + 1) for _ in range(ops)]
+                operations = {
+                    'insert': timed(lambda i: insert.execute(new_row), ops),
+                    'point_select': timed(
+                        lambda i: point.execute((ids[i],)).fetchall(), ops
+                    ),
+                    'filtered_scan': timed(
+                        lambda i: filtered.execute((scan_value,)).fetchall(), scans
+                    ),
+                    'update': timed(
+                        lambda i: update.execute((new_row[0], ids[i])), ops
+                    ),
+                    'delete': timed(lambda i: delete.execute((ids[i],)), ops),
+                }
+            table_cache.clear()
+            operations['cold_start'] = cold_start(directory, cold_runs)
+            size = files_size(os.path.join(directory, 'data'))
+        finally:
+            os.chdir(root)
+    result = {
+        'storage': storage,
+        'rows': rows,
+        'file_bytes': size,
+        'bulk_load': {'seconds': load_time, 'rows_per_second': rows / load_time},
+    }
+    result.update(
+        (name, percentiles(latencies)) for name, latencies in operations.items()
+    )
+    return result
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="database bench", description=__doc__.strip().splitlines()[0]
+    )
+    parser.add_argument(
+        '--rows', default='1000,10000,100000',
+        help="размеры таблиц через запятую (до 10000000)",
+    )
+    parser.add_argument(
+        '--columns', default='str,int,bool',
+        help=f"типы столбцов через запятую: {', '.join(TYPES)}",
+    )
+    parser.add_argument(
+        '--storage', default=','.join(STORAGE_MODES),
+        help="режимы хранения через запятую",
+    )
+    parser.add_argument('--ops', type=int, default=200,
+                        help="замеров точечных операций")
+    parser.add_argument('--scans', type=int, default=10,
+                        help="замеров просмотра с условием")
+    parser.add_argument('--cold', type=int, default=5,
+                        help="запусков процесса для cold_start")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', metavar="ФАЙЛ", help="записать JSON в файл")
+    args = parser.parse_args(argv)
+    args.rows = [int(part) for part in args.rows.split(',')]
+    args.columns = args.columns.split(',')
+    args.storage = args.storage.split(',')
+    unknown = set(args.columns) - set(TYPES) | set(args.storage) - set(STORAGE_MODES)
+    if unknown:
+        parser.error(f"неизвестные типы или режимы: {', '.join(sorted(unknown))}")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    columns = make_columns(args.columns)
+    rng = random.Random(args.seed)
+    results = []
+    for rows in args.rows:
+        for storage in args.storage:
+            print(f"{storage}: {rows} строк...", file=sys.stderr, flush=True)
+            results.append(run_case(
+                storage, rows, columns, args.ops, args.scans, args.cold, rng
+            ))
+    report = {
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'columns': dict(columns),
+        'results': results,
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            file.write(text + '\n')
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""
+Цена индексов при вставке в таблицу режима log.
+
+Таблица из --rows строк (режим log, журнал уже сжат в снимок) и варианты
+индексов: без индексов, hash по age, hash по name и sorted по age.
+Для каждого варианта замеряются:
+- вставка одной строки в работающем процессе (кэш таблицы и индексов тёплый);
+- вставка одной строки «новым процессом»: кэш очищается перед каждой
+  вставкой, таблица и индексы читаются с диска, как при запуске CLI.
+
+Запуск из корня репозитория:
+    python -m benchmarks.index_writes --rows 200000 --inserts 200
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+from src.primitive_db.cache import table_cache
+from src.primitive_db.core import add_index, append_records, create_table
+from src.primitive_db.utils import (
+    compact_table,
+    load_metadata,
+    save_metadata,
+)
+
+METADATA_FILE = "db_meta.json"
+TABLE = "bench"
+VARIANTS = {
+    'без индексов': [],
+    '1 индекс': [('age', 'hash')],
+    '2 индекса': [('name', 'hash'), ('age', 'sorted')],
+}
+
+
+def _quiet():
+    return contextlib.redirect_stdout(io.StringIO())
+
+
+def setup(rows, indexes):
+    table_cache.clear()
+    for name in os.listdir('.'):
+        if name == METADATA_FILE or name.startswith(METADATA_FILE):
+            os.remove(name)
+    with _quiet():
+        metadata = create_table(load_metadata(METADATA_FILE), TABLE,
+                                [('name', 'str'), ('age', 'int')])
+        table_info = metadata['tables'][TABLE]
+        table_info['storage'] = 'log'
+        os.makedirs('data', exist_ok=True)
+        for name in os.listdir('data'):
+            os.remove(os.path.join('data', name))
+        compact_table(TABLE, [
+            {'id': i + 1, 'name': f"user{i}", 'age': i * 7919 % 100}
+            for i in range(rows)
+        ], table_info)
+        for column, kind in indexes:
+            metadata = add_index(metadata, TABLE, column, kind)
+        save_metadata(METADATA_FILE, metadata)
+    return table_info
+
+
+def percentiles(latencies):
+    values = sorted(latencies)
+    return (
+        values[len(values) // 2] * 1000,
+        values[min(len(values) - 1, int(len(values) * 0.95))] * 1000,
+    )
+
+
+def measure(table_info, inserts, cold):
+    latencies = []
+    for i in range(inserts):
+        if cold:
+            table_cache.clear()
+        started = time.perf_counter()
+        append_records(TABLE, table_info, [{'name': f"new{i}", 'age': i % 100}])
+        latencies.append(time.perf_counter() - started)
+    return percentiles(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--inserts', type=int, default=200)
+    parser.add_argument('--cold-inserts', type=int, default=10)
+    args = parser.parse_args()
+
+    root = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        try:
+            for variant, indexes in VARIANTS.items():
+                table_info = setup(args.rows, indexes)
+                warm = measure(table_info, args.inserts, cold=False)
+                cold = measure(table_info, args.cold_inserts, cold=True)
+                print(
+                    f"{variant}: вставка p50 {warm[0]:.2f} мс, p95 {warm[1]:.2f} мс; "
+                    f"новым процессом p50 {cold[0]:.1f} мс, p95 {cold[1]:.1f} мс"
+                )
+        finally:
+            os.chdir(root)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+Пропускная способность параллельного полного просмотра (parallel.py).
+
+Бинарная таблица из --rows строк фильтруется условием по столбцам
+без индекса при разном числе процессов; результат сверяется
+с просмотром в одном потоке. Первый запуск пула (spawn процессов)
+в замер не входит. Для сравнения тот же просмотр выполняется над
+колоночной таблицей в памяти, столбцы которой передаются процессам.
+
+Запуск из корня репозитория:
+    python -m benchmarks.parallel_scan --rows 1000000 --workers 1,2,4,8
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from src.primitive_db.binary_storage import open_binary_table, write_binary_table
+from src.primitive_db.columnar import ColumnarTable
+from src.primitive_db.core import iter_select
+from src.primitive_db.parallel import configure_parallelism
+from src.primitive_db.where import parse_where
+
+COLUMNS = [('id', 'int'), ('name', 'str'), ('age', 'int'), ('active', 'bool')]
+CONDITION = "age >= 30 and age < 40 and active = true or name like 'user99%'"
+
+
+def make_records(rows):
+    return [
+        {'id': i + 1, 'name': f"user{i}", 'age': i * 7 % 90, 'active': i % 3 == 0}
+        for i in range(rows)
+    ]
+
+
+def scan(table, condition, repeat):
+    """Лучшее время из repeat полных просмотров и число найденных строк"""
+    best, found = None, None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        found = sum(1 for _ in iter_select(table, condition, columns=['id']))
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--workers', default='1,2,4')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    condition = parse_where(CONDITION)
+    records = make_records(args.rows)
+    with tempfile.TemporaryDirectory() as directory:
+        filepath = os.path.join(directory, 'bench.bin')
+        write_binary_table(filepath, records, COLUMNS)
+        sources = {
+            'binary': open_binary_table(filepath),
+            'columnar': ColumnarTable.from_records(COLUMNS, records),
+        }
+        del records
+        configure_parallelism(workers=1)
+        for name, table in sources.items():
+            serial, expected = scan(table, condition, args.repeat)
+            print(f"{name}: строк {args.rows}, найдено {expected}")
+            for workers in (int(part) for part in args.workers.split(',')):
+                configure_parallelism(workers=workers, min_rows=0)
+                scan(table, condition, 1)
+                elapsed, found = scan(table, condition, args.repeat)
+                if found != expected:
+                    raise SystemExit(
+                        f"результат {found} не совпадает с {expected}"
+                    )
+                print(
+                    f"  процессов {workers}: {elapsed:.3f} с, "
+                    f"{args.rows / elapsed / 1e6:.2f} млн строк/с, "
+                    f"ускорение x{serial / elapsed:.2f}"
+                )
+
+
+if __name__ == '__main__':
+    main()
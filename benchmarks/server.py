@@ -0,0 +1,143 @@
+"""
+Нагрузочный тест сетевого сервера: много одновременных клиентов на localhost.
+
+Сервер запускается отдельным процессом (database serve) во временном
+каталоге. Каждый клиент держит своё соединение и выполняет запросы
+подряд: точечный select по индексу, иногда update или insert.
+Выводятся пропускная способность и задержки p50/p95/p99/max.
+
+Запуск из корня репозитория:
+    python -m benchmarks.server --clients 2000 --requests 20
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+from src.primitive_db.api import connect
+from src.primitive_db.client import AsyncClientPool, ClientPool
+from src.primitive_db.core import set_storage
+from src.primitive_db.server import raise_open_files_limit
+from src.primitive_db.utils import METADATA_FILE, load_metadata, save_metadata
+
+TABLE = "bench"
+
+
+def start_server(directory, workers):
+    """Запускает сервер на свободном порту, возвращает (процесс, порт)"""
+    env = dict(os.environ, PYTHONPATH=os.getcwd())
+    command = [
+        sys.executable, "-m", "src.primitive_db.main", "serve",
+        "--port", "0", "--workers", str(workers),
+    ]
+    process = subprocess.Popen(
+        command, cwd=directory, env=env, stdout=subprocess.PIPE, text=True
+    )
+    line = process.stdout.readline()
+    if not line:
+        raise SystemExit("сервер не запустился")
+    port = int(line.split()[2].rsplit(':', 1)[1])
+    return process, port
+
+
+def create_schema(directory, storage):
+    """Создаёт таблицу в каталоге базы до запуска сервера"""
+    root = os.getcwd()
+    os.chdir(directory)
+    try:
+        with connect() as db, contextlib.redirect_stdout(io.StringIO()):
+            db.execute(f"create_table {TABLE} name:str age:int")
+            db.execute(f"create_index {TABLE} id")
+            metadata = set_storage(load_metadata(METADATA_FILE), TABLE, storage)
+            save_metadata(METADATA_FILE, metadata)
+    finally:
+        os.chdir(root)
+
+
+def fill(port, rows):
+    with ClientPool(port=port) as db:
+        db.executemany(
+            f"insert {TABLE} ? ?", [(f"user{i}", i % 100) for i in range(rows)]
+        )
+
+
+async def client(pool, requests, rows, write_ratio, latencies, rng):
+    for _ in range(requests):
+        roll = rng.random()
+        if roll < write_ratio / 2:
+            sql, params = f"update {TABLE} set age = ? where id = ?", (
+                rng.randrange(100), rng.randrange(1, rows + 1)
+            )
+        elif roll < write_ratio:
+            sql, params = f"insert {TABLE} ? ?", ("new", rng.randrange(100))
+        else:
+            sql, params = f"select * from {TABLE} where id = ?", (
+                rng.randrange(1, rows + 1),
+            )
+        started = time.perf_counter()
+        await pool.execute(sql, params)
+        latencies.append(time.perf_counter() - started)
+
+
+async def load(port, clients, requests, rows, write_ratio):
+    latencies = []
+    rng = random.Random(42)
+    async with AsyncClientPool(port=port, size=clients) as pool:
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            client(pool, requests, rows, write_ratio, latencies, rng)
+            for _ in range(clients)
+        ))
+        elapsed = time.perf_counter() - started
+    return latencies, elapsed
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--clients', type=int, default=1000)
+    parser.add_argument('--requests', type=int, default=20)
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--write-ratio', type=float, default=0.1)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--storage', choices=('json', 'log', 'binary'), default='log')
+    args = parser.parse_args()
+
+    raise_open_files_limit()
+    with tempfile.TemporaryDirectory() as directory:
+        create_schema(directory, args.storage)
+        process, port = start_server(directory, args.workers)
+        try:
+            fill(port, args.rows)
+            latencies, elapsed = asyncio.run(load(
+                port, args.clients, args.requests, args.rows, args.write_ratio
+            ))
+        finally:
+            process.terminate()
+            process.wait()
+    latencies.sort()
+    print(
+        f"Клиентов {args.clients}, запросов {len(latencies)} "
+        f"(записей {args.write_ratio:.0%}, хранение '{args.storage}') "
+        f"за {elapsed:.2f} с: "
+        f"{len(latencies) / elapsed:.0f} запросов/с"
+    )
+    print(
+        "Задержка, мс: " + ", ".join(
+            f"{name} {percentile(latencies, fraction) * 1000:.2f}"
+            for name, fraction in (('p50', 0.5), ('p95', 0.95), ('p99', 0.99))
+        ) + f", max {latencies[-1] * 1000:.2f}"
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""
+Время запуска CLI: бюджет импорта и запрет тяжёлых модулей при старте.
+
+`database -c "list_tables"` запускается во временном каталоге базы под
+`python -X importtime`; суммарное время импортов сверх пустого интерпретатора
+(модули проекта, argparse и всё, что они тянут) сравнивается с --budget-ms,
+а модули из HEAVY_MODULES
+(вывод, сервер, пул процессов, профилировщик, core и shlex) не должны
+загружаться вовсе.
+Затем замеряется полное время процесса. Код выхода 1 — бюджет превышен.
+
+Байткод (.pyc) в дочерних процессах пишется, даже если задан
+PYTHONDONTWRITEBYTECODE: замеряется запуск установленного пакета.
+
+Запуск из корня репозитория:
+    python -m benchmarks.startup --budget-ms 40 --runs 20
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+HEAVY_MODULES = (
+    'prettytable', 'asyncio', 'ssl', 'multiprocessing',
+    'concurrent.futures.process', 'cProfile', 'pstats',
+    'src.primitive_db.core', 'shlex',
+)
+STATEMENT = "list_tables"
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def command(*options):
+    return [
+        sys.executable, *options, "-m", "src.primitive_db.main", "-c", STATEMENT,
+    ]
+
+
+def bare_command(*options):
+    return [sys.executable, *options, "-c", "pass"]
+
+
+def environment():
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+    return env
+
+
+def import_profile(cmd, directory, skip=frozenset()):
+    """(мкс импортов верхнего уровня, кроме skip; множество загруженных модулей)"""
+    completed = subprocess.run(
+        cmd, cwd=directory, env=environment(),
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=True,
+    )
+    total, modules = 0, set()
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue
+        modules.add(name.strip())
+        # верхний уровень (без отступа): cumulative уже включает вложенные импорты
+        if not name.startswith("  ") and name.strip() not in skip:
+            total += int(cumulative)
+    return total, modules
+
+
+def wall_times(cmd, directory, runs):
+    times = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run(
+            cmd, cwd=directory, env=environment(),
+            stdout=subprocess.DEVNULL, check=True,
+        )
+        times.append(time.perf_counter() - started)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--budget-ms', type=float, default=40.0,
+                        help="бюджет импорта модулей CLI, мс")
+    parser.add_argument('--runs', type=int, default=20,
+                        help="запусков для замера полного времени")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        wall_times(command(), directory, 1)  # прогрев: .pyc и снимок метаданных
+        _, bare_modules = import_profile(bare_command("-X", "importtime"), directory)
+        profiles = [
+            import_profile(command("-X", "importtime"), directory, bare_modules)
+            for _ in range(5)
+        ]
+        imports = min(total for total, _ in profiles) / 1000
+        modules = profiles[0][1]
+        times = wall_times(command(), directory, args.runs)
+        baseline = min(wall_times(bare_command(), directory, 5))
+
+    heavy = sorted(
+        name for name in modules
+        if any(name == heavy or name.startswith(heavy + '.') for heavy in HEAVY_MODULES)
+    )
+    print(f"Импорт модулей CLI: {imports:.1f} мс (бюджет {args.budget_ms:.0f} мс)")
+    print(
+        f"database -c \"{STATEMENT}\": min {min(times) * 1000:.1f} мс, "
+        f"медиана {statistics.median(times) * 1000:.1f} мс "
+        f"(пустой интерпретатор {baseline * 1000:.1f} мс)"
+    )
+    failures = []
+    if imports > args.budget_ms:
+        failures.append(f"импорт {imports:.1f} мс больше бюджета {args.budget_ms} мс")
+    if heavy:
+        failures.append(f"при запуске загружены тяжёлые модули: {', '.join(heavy)}")
+    if failures:
+        for failure in failures:
+            print(f"Ошибка: {failure}")
+        sys.exit(1)
+    print("Бюджет запуска соблюдён")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,10 @@
+import sys
+import threading
 import time
+from collections import OrderedDict
+
+from .primitive_db.errors import DatabaseError
+from .primitive_db.metrics import metrics
 
 
 def handle_db_errors(func):
@@ -8,6 +14,9 @@ def handle_db_errors(func):
     def wrapper(*args, **kwargs):
         try:
             return func(*args, **kwargs)
+        except DatabaseError as e:
+            print(f"Ошибка: {e}")
+            return None
         except KeyError as e:
             print(f"Ошибка: Обращение к несуществующему объекту - {e}")
             return None
@@ -24,47 +33,120 @@ def handle_db_errors(func):
 
 def confirm_action(action_name):
     """
-    Декоратор для подтверждения опасных операций
+    Декоратор для подтверждения опасных операций.
+    confirm_action.answer = True/False отвечает на все запросы без input()
+    (флаг --yes и неинтерактивный режим), None — спрашивать пользователя
     """
     def decorator(func):
         def wrapper(*args, **kwargs):
-            response = input(
-                f'Вы уверены, что хотите выполнить "{action_name}"? [y/n]: '
-            )
-            if response.lower() != 'y':
+            confirmed = confirm_action.answer
+            if confirmed is None:
+                response = input(
+                    f'Вы уверены, что хотите выполнить "{action_name}"? [y/n]: '
+                )
+                confirmed = response.lower() == 'y'
+            if not confirmed:
                 print("Операция отменена")
                 return None
             return func(*args, **kwargs)
         return wrapper
     return decorator
 
+confirm_action.answer = None
+
 def log_time(func):
     """
-    Декоратор для замера времени выполнения функции
+    Декоратор для замера времени выполнения функции.
+    Время попадает в гистограмму metrics (команда stats), а не на экран
     """
     def wrapper(*args, **kwargs):
-        start_time = time.monotonic()
-        result = func(*args, **kwargs)
-        end_time = time.monotonic()
-        execution_time = end_time - start_time
-        print(f"Функция {func.__name__} выполнилась за {execution_time:.3f} секунд")
-        return result
+        if not metrics.enabled:
+            return func(*args, **kwargs)
+        start_time = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            metrics.observe(
+                'operation', func.__name__, time.perf_counter() - start_time
+            )
     return wrapper
 
-def create_cacher():
+def create_cacher(max_entries=128, max_bytes=64 * 1024 * 1024, ttl=None):
     """
-    Фабрика функций для кэширования
+    Фабрика функций для кэширования результатов запросов.
+    Ключ — кортеж (имя_таблицы, версия_данных, ...); записи вытесняются по LRU
+    при превышении max_entries/max_bytes и устаревают через ttl секунд.
+    У возвращаемой функции есть get(key), put(key, value), invalidate(table_name)
+    и stats().
+    Кэш общий для потоков сервера: обращения к нему идут под блокировкой,
+    а сам результат вычисляется вне её
     """
-    cache = {}
-    
+    cache = OrderedDict()
+    counters = {'hits': 0, 'misses': 0, 'evictions': 0, 'bytes': 0}
+    lock = threading.Lock()
+
+    def estimate_size(value):
+        if isinstance(value, list):
+            return sys.getsizeof(value) + sum(sys.getsizeof(item) for item in value)
+        return sys.getsizeof(value)
+
+    def drop(key):
+        _, size, _ = cache.pop(key)
+        counters['bytes'] -= size
+
+    def get(key):
+        """Значение из кэша или None, если его нет или оно устарело"""
+        with lock:
+            entry = cache.get(key)
+            if entry is not None and (ttl is None or time.monotonic() < entry[2]):
+                cache.move_to_end(key)
+                counters['hits'] += 1
+                return entry[0]
+            if entry is not None:
+                drop(key)
+            counters['misses'] += 1
+            return None
+
+    def put(key, value):
+        """Кладёт значение в кэш (больше max_bytes — не кладёт)"""
+        size = estimate_size(value)
+        if size > max_bytes:
+            return
+        expires = time.monotonic() + ttl if ttl is not None else None
+        with lock:
+            if key in cache:
+                drop(key)
+            cache[key] = (value, size, expires)
+            counters['bytes'] += size
+            while len(cache) > max_entries or counters['bytes'] > max_bytes:
+                drop(next(iter(cache)))
+                counters['evictions'] += 1
+
     def cache_result(key, value_func):
-        if key in cache:
-            print(f"Использован кэш для ключа: {key}")
-            return cache[key]
-        else:
+        result = get(key)
+        if result is None:
             result = value_func()
-            cache[key] = result
-            print(f"Добавлено в кэш для ключа: {key}")
-            return result
-    
+            put(key, result)
+        return result
+
+    def invalidate(table_name=None):
+        """Удаляет записи таблицы (или все записи, если имя не задано)"""
+        with lock:
+            for key in list(cache):
+                if table_name is None or key[0] == table_name:
+                    drop(key)
+
+    def stats():
+        with lock:
+            lookups = counters['hits'] + counters['misses']
+            return {
+                **counters,
+                'entries': len(cache),
+                'hit_rate': counters['hits'] / lookups if lookups else 0.0,
+            }
+
+    cache_result.get = get
+    cache_result.put = put
+    cache_result.invalidate = invalidate
+    cache_result.stats = stats
     return cache_result
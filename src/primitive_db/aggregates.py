@@ -0,0 +1,170 @@
+import re
+
+from .columnar import column_reader
+from .errors import QuerySyntaxError, ValidationError
+from .indexes import lookup, range_lookup
+from .where import RANGE_OPERATORS
+
+AGGREGATE_FUNCTIONS = ('count', 'sum', 'min', 'max', 'avg')
+
+_AGGREGATE_PATTERN = re.compile(r'^(\w+)\s*\(\s*(\*|[^()\s]+)\s*\)$')
+
+
+def parse_aggregate(text):
+    """
+    Разбирает элемент списка select: 'count(*)' -> ('count', None),
+    'avg(age)' -> ('avg', 'age'); для обычного столбца возвращает None
+    """
+    match = _AGGREGATE_PATTERN.match(text.strip())
+    if match is None:
+        return None
+    function, column = match.group(1).lower(), match.group(2)
+    if function not in AGGREGATE_FUNCTIONS:
+        raise QuerySyntaxError(f"неизвестная агрегатная функция '{function}'")
+    if column == '*':
+        if function != 'count':
+            raise QuerySyntaxError(f"{function}(*) не поддерживается, укажите столбец")
+        column = None
+    return function, column
+
+
+def _column_reader(table_data, column):
+    """Чтение столбца агрегата; None для count(*)"""
+    return None if column is None else column_reader(table_data, column)
+
+
+def hash_aggregate(table_data, positions, group_by, aggregates):
+    """
+    Хэш-агрегация за один проход по позициям строк.
+    group_by — список столбцов группировки, aggregates — список пар
+    (функция, столбец). Возвращает словарь {ключ группы: [значения агрегатов]}
+    """
+    group_readers = [_column_reader(table_data, column) for column in group_by]
+    readers = [_column_reader(table_data, column) for _, column in aggregates]
+    functions = [function for function, _ in aggregates]
+    # состояние агрегата: [число непустых значений, сумма, минимум, максимум]
+    groups = {}
+    for position in positions:
+        key = tuple(read(position) for read in group_readers)
+        states = groups.get(key)
+        if states is None:
+            states = groups[key] = [[0, 0, None, None] for _ in aggregates]
+        for function, read, state in zip(functions, readers, states):
+            if read is None:
+                state[0] += 1
+                continue
+            value = read(position)
+            if value is None:
+                continue
+            state[0] += 1
+            if function in ('sum', 'avg'):
+                if isinstance(value, str):
+                    raise ValidationError(
+                        f"{function} не применим к строковым значениям"
+                    )
+                state[1] += value
+            elif function == 'min':
+                if state[2] is None or value < state[2]:
+                    state[2] = value
+            elif function == 'max':
+                if state[3] is None or value > state[3]:
+                    state[3] = value
+    if not groups and not group_by:
+        groups[()] = [[0, 0, None, None] for _ in aggregates]
+    return {
+        key: [_finish(function, state) for function, state in zip(functions, states)]
+        for key, states in groups.items()
+    }
+
+
+def _finish(function, state):
+    count, total, minimum, maximum = state
+    if function == 'count':
+        return count
+    if function == 'sum':
+        return total if count else None
+    if function == 'avg':
+        return total / count if count else None
+    return minimum if function == 'min' else maximum
+
+
+def _exact_positions(indexes, node):
+    """Позиции строк по индексу, только если индекс отвечает на условие
+    точно (без проверки строк); иначе None"""
+    kind = node[0]
+    if kind == 'or':
+        union = set()
+        for child in node[1]:
+            positions = _exact_positions(indexes, child)
+            if positions is None:
+                return None
+            union.update(positions)
+        return union
+    if kind not in ('cmp', 'in', 'between'):
+        return None
+    index = indexes.get(node[2] if kind == 'cmp' else node[1])
+    if index is None:
+        return None
+    if kind == 'cmp' and node[1] == '=':
+        return lookup(index, node[3])
+    if kind == 'in':
+        return {position for value in node[2] for position in lookup(index, value)}
+    if index['kind'] != 'sorted':
+        return None
+    if kind == 'between' and all(isinstance(v, int) for v in node[2:]):
+        return range_lookup(index, node[2], node[3])
+    if kind == 'cmp' and node[1] in RANGE_OPERATORS and isinstance(node[3], int):
+        op, value = node[1], node[3]
+        if op in ('<', '<='):
+            return range_lookup(index, high=value, include_high=op == '<=')
+        return range_lookup(index, low=value, include_low=op == '>=')
+    return None
+
+
+def answer_from_indexes(table_data, condition, group_by, aggregates, indexes):
+    """
+    Пытается ответить на агрегатный запрос без чтения строк:
+    count(*) — по длине таблицы или по индексу на условии WHERE,
+    min/max — по краям sorted-индекса, count(*) GROUP BY — по хэш-индексу.
+    Возвращает результат как у hash_aggregate или None
+    """
+    indexes = indexes or {}
+    if group_by:
+        index = indexes.get(group_by[0])
+        if (
+            condition is None
+            and len(group_by) == 1
+            and index is not None
+            and all(aggregate == ('count', None) for aggregate in aggregates)
+        ):
+            # ключ индекса не различает True и 1 (см. index_key) — значение
+            # группы берётся из первой её строки, как при hash_aggregate
+            read = column_reader(table_data, group_by[0])
+            return {
+                (read(positions[0]),): [len(positions)] * len(aggregates)
+                for positions in index['hash'].values()
+            }
+        return None
+    values = []
+    for function, column in aggregates:
+        if function == 'count' and column is None:
+            if condition is None:
+                values.append(len(table_data))
+                continue
+            positions = _exact_positions(indexes, condition)
+            if positions is None:
+                return None
+            values.append(len(positions))
+            continue
+        index = indexes.get(column)
+        if (
+            condition is None
+            and function in ('min', 'max')
+            and index is not None
+            and index['kind'] == 'sorted'
+        ):
+            keys = index['keys'] or [None]
+            values.append(keys[0] if function == 'min' else keys[-1])
+            continue
+        return None
+    return {(): values}
@@ -0,0 +1,599 @@
+"""
+Встраиваемый интерфейс к базе без REPL и без вывода на экран.
+
+    from src.primitive_db.api import connect
+
+    with connect() as db:
+        db.execute("insert users ? ? ?", ("Анна", 30, True))
+        adults = db.prepare("select name from users where age >= ?")
+        for row in adults.execute((18,)):
+            print(row['name'])
+
+База — каталог, из которого запущен процесс (как и у REPL).
+Ошибки — исключения из errors.py; транзакция одна на процесс.
+"""
+import itertools
+import shlex
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from .aggregates import parse_aggregate
+from .cache import table_cache
+from .core import (
+    _validate_batch,
+    add_index,
+    alter_columns,
+    append_records,
+    apply_delete,
+    apply_update,
+    compute_aggregate,
+    convert_set_clause,
+    define_table,
+    iter_select,
+    join_rows,
+    remove_table,
+    require_table,
+    select_cacher,
+)
+from .errors import (
+    ColumnNotFoundError,
+    DatabaseError,
+    QuerySyntaxError,
+    TransactionError,
+    ValidationError,
+)
+from .indexes import load_table_indexes, save_table_indexes
+from .metrics import metrics
+from .parser import clause_text, parse_limit_offset, parse_select
+from .planner import plan_order, plan_parameters, plan_query
+from .transaction import (
+    begin_transaction,
+    commit_transaction,
+    current_transaction,
+    rollback_transaction,
+)
+from .utils import (
+    METADATA_FILE,
+    load_metadata,
+    load_table_data,
+    metadata_lock,
+    save_metadata,
+    save_table_data,
+    table_lock,
+)
+from .where import (
+    Param,
+    bind_params,
+    condition_fields,
+    parse_assignments,
+    parse_values,
+    parse_where,
+)
+
+STATEMENT_CACHE_SIZE = 128
+# Планов на одну подготовленную команду (разные границы диапазонов)
+MAX_CACHED_PLANS = 64
+# Команды, меняющие данные таблиц, и команды, меняющие схему
+WRITE_COMMANDS = ("insert", "update", "delete")
+SCHEMA_COMMANDS = ("create_table", "drop_table", "create_index", "alter_table")
+TRANSACTION_COMMANDS = ("begin", "commit", "rollback")
+# Тип результата агрегатной функции; min/max — тип самого столбца
+AGGREGATE_TYPES = {'count': 'int', 'sum': 'int', 'avg': 'float'}
+
+
+class Result:
+    """
+    Результат execute: итератор строк-словарей.
+    columns — [(имя, тип)] столбцов результата, rowcount — число
+    изменённых строк (-1 для select), lastrowid — id последней вставленной записи
+    """
+
+    def __init__(self, columns=(), rows=(), rowcount=-1, lastrowid=None):
+        self.columns = list(columns)
+        self.rowcount = rowcount
+        self.lastrowid = lastrowid
+        self._rows = iter(rows)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._rows)
+
+    def fetchone(self):
+        """Следующая строка или None"""
+        return next(self._rows, None)
+
+    def fetchmany(self, size):
+        """Не больше size следующих строк"""
+        return list(itertools.islice(self._rows, size))
+
+    def fetchall(self):
+        """Все оставшиеся строки"""
+        return list(self._rows)
+
+    def scalar(self):
+        """Первое значение первой строки (например, count(*)) или None"""
+        row = self.fetchone()
+        return None if row is None else next(iter(row.values()), None)
+
+
+def _bind(value, params):
+    return params[value.index] if isinstance(value, Param) else value
+
+
+def _check_columns(table_name, table_info, names):
+    known = dict(table_info['columns'])
+    unknown = [name for name in names if name not in known]
+    if unknown:
+        raise ColumnNotFoundError(
+            f"Столбцы {unknown} не существуют в таблице '{table_name}'"
+        )
+    return known
+
+
+def _condition_columns(condition):
+    return [] if condition is None else condition_fields(condition)
+
+
+def _load(table_name, table_info):
+    table_data = load_table_data(table_name, table_info)
+    if table_data is None:
+        raise DatabaseError(f"не удалось прочитать таблицу '{table_name}'")
+    return table_data
+
+
+def _parse_statement(sql, params):
+    """Разбирает команду в (команда, части); params — счётчик параметров '?'"""
+    words = sql.split()
+    if not words:
+        raise QuerySyntaxError("пустая команда")
+    command = words[0].lower()
+    if command == "select":
+        query = parse_select(sql)
+        query['limit'], query['offset'] = parse_limit_offset(sql)
+        where = query.pop('where')
+        query['condition'] = None if where is None else parse_where(where, params)
+        query['aggregates'] = [parse_aggregate(item) for item in query['columns'] or []]
+        return command, query
+    if command == "insert":
+        if len(words) < 3:
+            raise QuerySyntaxError("ожидается insert <таблица> <значение> ...")
+        values_text = sql.split(None, 2)[2]
+        return command, {'table': words[1], 'values': parse_values(values_text, params)}
+    if command == "update":
+        if len(words) < 4 or words[2].lower() != "set":
+            raise QuerySyntaxError("ожидается update <таблица> SET поле = значение ...")
+        assignments = parse_assignments(clause_text(sql, "set", "where"), params)
+        where = clause_text(sql, "where")
+        return command, {
+            'table': words[1],
+            'set': assignments,
+            'condition': None if where is None else parse_where(where, params),
+        }
+    if command == "delete":
+        if len(words) < 2 or (len(words) > 2 and words[2].lower() != "where"):
+            raise QuerySyntaxError("ожидается delete <таблица> [WHERE условие]")
+        where = clause_text(sql, "where")
+        return command, {
+            'table': words[1],
+            'condition': None if where is None else parse_where(where, params),
+        }
+    args = shlex.split(sql)
+    if command == "create_table" and len(args) >= 3:
+        columns = [arg.split(':', 1) for arg in args[2:]]
+        if not all(len(column) == 2 for column in columns):
+            raise QuerySyntaxError("столбцы задаются в формате name:type")
+        return command, {
+            'table': args[1],
+            'columns': [(name.strip(), kind.strip()) for name, kind in columns],
+        }
+    if command == "drop_table" and len(args) == 2:
+        return command, {'table': args[1]}
+    if command == "create_index" and len(args) in (3, 4):
+        kind = args[3].lower() if len(args) == 4 else 'hash'
+        return command, {'table': args[1], 'column': args[2], 'kind': kind}
+    if command == "alter_table" and len(args) > 3:
+        action = args[2].lower()
+        if action == "drop" and len(args) == 4:
+            return command, {'table': args[1], 'action': action, 'column': args[3]}
+        column = args[3].split(':', 1)
+        if action == "add" and len(column) == 2 and (
+            len(args) == 4 or len(args) == 6 and args[4].lower() == "default"
+        ):
+            return command, {
+                'table': args[1],
+                'action': action,
+                'column': (column[0].strip(), column[1].strip()),
+                'default': args[5] if len(args) == 6 else None,
+            }
+        raise QuerySyntaxError(
+            "ожидается alter_table <таблица> add <столбец:тип> "
+            "[default <значение>] | drop <столбец>"
+        )
+    if command in ("begin", "commit", "rollback") and len(args) == 1:
+        return command, {}
+    raise QuerySyntaxError(f"команда '{sql}' не поддерживается")
+
+
+class PreparedStatement:
+    """
+    Подготовленная команда с параметрами '?'. Разбор выполняется один раз,
+    план доступа (какие индексы использовать) — при первом выполнении
+    с такими границами диапазонов и переиспользуется, пока не изменятся
+    индексы, статистика или порядок числа строк таблицы
+    """
+
+    def __init__(self, connection, sql):
+        self.sql = sql
+        self._connection = connection
+        self._plans = {}
+        params = itertools.count()
+        self.command, self._parts = _parse_statement(sql, params)
+        self.param_count = next(params)
+
+    @property
+    def tables(self):
+        """Таблицы, к которым обращается команда"""
+        table_name = self._parts.get('table')
+        if table_name is None:
+            return ()
+        if self._parts.get('join') is not None:
+            return (table_name, self._parts['join'][0])
+        return (table_name,)
+
+    def execute(self, params=()):
+        """Выполняет команду с параметрами, возвращает Result"""
+        params = tuple(params)
+        self._check_params(params)
+        with metrics.statement(self.command):
+            return getattr(self, f"_{self.command}")(self._parts, params)
+
+    def executemany(self, seq_of_params):
+        """Выполняет команду для каждого набора параметров; insert —
+        одной пачкой с одной записью на диск. Возвращает Result с суммарным rowcount"""
+        if self.command == "insert":
+            params_list = [tuple(params) for params in seq_of_params]
+            for params in params_list:
+                self._check_params(params)
+            with metrics.statement(self.command):
+                return self._insert_many(self._parts, params_list)
+        rowcount = 0
+        for params in seq_of_params:
+            rowcount += max(self.execute(params).rowcount, 0)
+        return Result(rowcount=rowcount)
+
+    def _check_params(self, params):
+        if len(params) != self.param_count:
+            raise QuerySyntaxError(
+                f"ожидается параметров: {self.param_count}, передано {len(params)}"
+            )
+
+    def _condition(self, parts, params):
+        condition = parts['condition']
+        return None if condition is None else bind_params(condition, params)
+
+    def _plan(self, table_name, table_info, condition, indexes, row_count):
+        """План доступа из кэша подготовленной команды. Ключ — всё, от чего
+        зависит оценка: индексы, границы диапазонов из параметров, статистика
+        и порядок числа строк; число строк в плане всегда текущее"""
+        key = (
+            table_name,
+            tuple(sorted(table_info.get('indexes', {}).items())),
+            plan_parameters(condition),
+            table_info.get('stats', {}).get('rows'),
+            row_count.bit_length(),
+        )
+        plan = self._plans.get(key)
+        if plan is None:
+            if len(self._plans) >= MAX_CACHED_PLANS:
+                self._plans.clear()
+            plan = plan_query(condition, indexes, table_info.get('stats'), row_count)
+            self._plans[key] = plan
+        return {**plan, 'row_count': row_count}
+
+    def _select(self, parts, params):
+        metadata = self._connection.metadata()
+        table_name = parts['table']
+        columns, order_by = parts['columns'], parts['order_by']
+        condition = self._condition(parts, params)
+        if parts['join'] is not None:
+            return self._join(metadata, parts, condition)
+        table_info = require_table(metadata, table_name)
+        group_by, aggregates = parts['group_by'], parts['aggregates']
+        aggregated = bool(group_by) or any(aggregates)
+        if aggregated:
+            requested = group_by + [
+                column for _, column in filter(None, aggregates) if column is not None
+            ]
+        else:
+            requested = list(columns or [])
+            if order_by is not None:
+                requested.append(order_by[0])
+        known = _check_columns(
+            table_name, table_info, requested + _condition_columns(condition)
+        )
+
+        table_data = _load(table_name, table_info)
+        indexes = load_table_indexes(table_name, table_info, table_data)
+        plan = plan_order(
+            self._plan(table_name, table_info, condition, indexes, len(table_data)),
+            order_by, indexes, parts['limit'],
+        )
+        if aggregated:
+            items = columns or group_by
+            rows = compute_aggregate(
+                table_data, items, condition, group_by, indexes, plan,
+                order_by, parts['limit'], parts['offset'],
+            )
+            types = []
+            for item, parsed in zip(items, [parse_aggregate(i) for i in items]):
+                if parsed is None:
+                    types.append((item, known[item]))
+                else:
+                    function, column = parsed
+                    kind = AGGREGATE_TYPES.get(function, known.get(column))
+                    types.append((item, kind))
+            return Result(types, rows)
+        rows = iter_select(
+            table_data, condition, indexes, plan, parts['limit'], parts['offset'],
+            columns, order_by,
+        )
+        if columns is None:
+            # записи строкового движка — объекты кэша, наружу отдаются копии
+            rows = map(dict, rows)
+            columns = list(known)
+        return Result([(name, known[name]) for name in columns], rows)
+
+    def _join(self, metadata, parts, condition):
+        right_name, on = parts['join']
+        rows = join_rows(
+            metadata, parts['table'], right_name, on, condition, parts['columns'],
+            parts['order_by'], parts['limit'], parts['offset'],
+        )
+        types = {
+            f"{name}.{column}": kind
+            for name in (parts['table'], right_name)
+            for column, kind in require_table(metadata, name)['columns']
+        }
+        names = list(rows[0]) if rows else []
+        return Result([(name, types.get(name)) for name in names], rows)
+
+    def _insert(self, parts, params):
+        return self._insert_many(parts, [params])
+
+    def _insert_many(self, parts, params_list):
+        table_name = parts['table']
+        table_info = require_table(self._connection.metadata(), table_name)
+        rows = [
+            [_bind(value, params) for value in parts['values']]
+            for params in params_list
+        ]
+        records, errors = _validate_batch(table_info['columns'], rows)
+        if errors:
+            number, error = errors[0]
+            prefix = f"строка {number + 1}: " if len(rows) > 1 else ""
+            raise ValidationError(prefix + error)
+        if not records:
+            return Result(rowcount=0)
+        first_id = append_records(table_name, table_info, records)
+        return Result(rowcount=len(records), lastrowid=first_id + len(records) - 1)
+
+    def _update(self, parts, params):
+        table_name = parts['table']
+        table_info = require_table(self._connection.metadata(), table_name)
+        set_clause = convert_set_clause(table_name, table_info, {
+            name: _bind(value, params) for name, value in parts['set'].items()
+        })
+        condition = self._condition(parts, params)
+        _check_columns(table_name, table_info, _condition_columns(condition))
+        with table_lock(table_name):
+            table_data = _load(table_name, table_info)
+            indexes = load_table_indexes(table_name, table_info, table_data)
+            plan = self._plan(
+                table_name, table_info, condition, indexes, len(table_data)
+            )
+            journal = []
+            count = apply_update(
+                table_data, set_clause, condition, indexes, journal, plan
+            )
+            save_table_data(table_name, table_data, table_info, journal)
+            save_table_indexes(table_name, indexes)
+        select_cacher.invalidate(table_name)
+        return Result(rowcount=count)
+
+    def _delete(self, parts, params):
+        table_name = parts['table']
+        table_info = require_table(self._connection.metadata(), table_name)
+        condition = self._condition(parts, params)
+        _check_columns(table_name, table_info, _condition_columns(condition))
+        with table_lock(table_name):
+            table_data = _load(table_name, table_info)
+            indexes = load_table_indexes(table_name, table_info, table_data)
+            plan = self._plan(
+                table_name, table_info, condition, indexes, len(table_data)
+            )
+            journal = []
+            table_data, count = apply_delete(
+                table_data, condition, indexes, journal, plan
+            )
+            save_table_data(table_name, table_data, table_info, journal)
+            save_table_indexes(table_name, indexes)
+        select_cacher.invalidate(table_name)
+        return Result(rowcount=count)
+
+    def _change_metadata(self, change):
+        """Меняет метаданные под блокировкой, перечитав их с диска"""
+        metadata_file = self._connection.metadata_file
+        with metadata_lock(metadata_file):
+            metadata = load_metadata(metadata_file)
+            save_metadata(metadata_file, change(metadata))
+        return Result(rowcount=0)
+
+    def _create_table(self, parts, params):
+        return self._change_metadata(
+            lambda metadata: define_table(metadata, parts['table'], parts['columns'])
+        )
+
+    def _drop_table(self, parts, params):
+        if current_transaction() is not None:
+            raise TransactionError("drop_table недоступна внутри транзакции")
+        return self._change_metadata(
+            lambda metadata: remove_table(metadata, parts['table'])
+        )
+
+    def _create_index(self, parts, params):
+        return self._change_metadata(
+            lambda metadata: add_index(
+                metadata, parts['table'], parts['column'], parts['kind']
+            )
+        )
+
+    def _alter_table(self, parts, params):
+        if current_transaction() is not None:
+            raise TransactionError("alter_table недоступна внутри транзакции")
+        return self._change_metadata(
+            lambda metadata: alter_columns(
+                metadata, parts['table'], parts['action'], parts['column'],
+                parts.get('default'),
+            )
+        )
+
+    def _begin(self, parts, params):
+        self._connection.begin()
+        return Result(rowcount=0)
+
+    def _commit(self, parts, params):
+        self._connection.commit()
+        return Result(rowcount=0)
+
+    def _rollback(self, parts, params):
+        self._connection.rollback()
+        return Result(rowcount=0)
+
+
+class Connection:
+    """
+    Соединение с базой в текущем каталоге. Хранит кэш подготовленных
+    команд (LRU по тексту запроса) и планы их выполнения; данные таблиц
+    берутся из общего кэша процесса (cache.table_cache)
+    """
+
+    _open = 0
+
+    def __init__(self, metadata_file=METADATA_FILE,
+                 statement_cache_size=STATEMENT_CACHE_SIZE):
+        self.metadata_file = metadata_file
+        self.closed = False
+        self._statements = OrderedDict()
+        self._statement_cache_size = statement_cache_size
+        self._transaction = None
+        Connection._open += 1
+
+    def metadata(self):
+        """Актуальные метаданные (из кэша, если файл не менялся)"""
+        self._check_open()
+        metadata = load_metadata(self.metadata_file)
+        if metadata is None:
+            raise DatabaseError(f"не удалось прочитать '{self.metadata_file}'")
+        return metadata
+
+    def prepare(self, sql):
+        """Подготовленная команда; повторная подготовка того же текста
+        берётся из кэша соединения"""
+        self._check_open()
+        statement = self._statements.get(sql)
+        if statement is None:
+            statement = PreparedStatement(self, sql)
+            self._statements[sql] = statement
+            if len(self._statements) > self._statement_cache_size:
+                self._statements.popitem(last=False)
+        else:
+            self._statements.move_to_end(sql)
+        return statement
+
+    def execute(self, sql, params=()):
+        """Выполняет команду с параметрами '?', возвращает Result"""
+        return self.prepare(sql).execute(params)
+
+    def executemany(self, sql, seq_of_params):
+        """Выполняет команду для каждого набора параметров"""
+        return self.prepare(sql).executemany(seq_of_params)
+
+    def begin(self):
+        """Начинает транзакцию: записи копятся в памяти до commit"""
+        self._check_open()
+        self._transaction = begin_transaction()
+
+    def commit(self):
+        """Фиксирует транзакцию, начатую этим соединением"""
+        self._check_own_transaction()
+        self._transaction = None
+        commit_transaction()
+
+    def rollback(self):
+        """Отменяет транзакцию, начатую этим соединением"""
+        self._check_own_transaction()
+        self._transaction = None
+        rollback_transaction()
+        select_cacher.invalidate()
+
+    @contextmanager
+    def transaction(self):
+        """with db.transaction(): — commit при выходе, rollback при исключении"""
+        self.begin()
+        try:
+            yield self
+        except BaseException:
+            self.rollback()
+            raise
+        self.commit()
+
+    def cache_stats(self):
+        """Статистика кэшей: таблиц, результатов select и подготовленных команд"""
+        return {
+            'tables': table_cache.stats(),
+            'select': select_cacher.stats(),
+            'statements': len(self._statements),
+        }
+
+    def close(self):
+        """Закрывает соединение: незавершённая транзакция отменяется;
+        последнее соединение процесса освобождает кэш таблиц
+        (и отображённые в память файлы binary-таблиц)"""
+        if self.closed:
+            return
+        if self._transaction is not None and current_transaction() is self._transaction:
+            self.rollback()
+        self._statements.clear()
+        self.closed = True
+        Connection._open -= 1
+        if Connection._open == 0:
+            table_cache.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if (
+            exc_type is None
+            and self._transaction is not None
+            and current_transaction() is self._transaction
+        ):
+            self.commit()
+        self.close()
+
+    def _check_open(self):
+        if self.closed:
+            raise DatabaseError("соединение закрыто")
+
+    def _check_own_transaction(self):
+        self._check_open()
+        if self._transaction is None or current_transaction() is not self._transaction:
+            self._transaction = None
+            raise TransactionError("нет активной транзакции этого соединения")
+
+
+def connect(metadata_file=METADATA_FILE):
+    """Открывает соединение с базой в текущем каталоге"""
+    return Connection(metadata_file)
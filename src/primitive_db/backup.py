@@ -0,0 +1,189 @@
+"""
+Резервная копия базы: backup <каталог> и restore <каталог>.
+
+Метаданные и файлы каждой таблицы (снимок, журнал, бинарный файл, счётчик id,
+индексы) копируются потоково: кусками по CHUNK_BYTES, каждый кусок — кадр
+сжатого потока со своей crc32 (см. compression.py), так что таблица целиком
+в память не читается. Файлы таблицы копируются под её блокировкой записи
+и согласованы между собой; метаданные — под блокировкой метаданных.
+manifest.json копии хранит исходный размер и sha256 каждого файла.
+
+Восстановление сначала распаковывает все файлы копии во временные файлы,
+проверяя crc32 кадров, размер и sha256, и только если копия цела,
+заменяет ими файлы базы (таблицы, которых нет в копии, удаляются).
+"""
+import json
+import os
+import time
+from contextlib import ExitStack
+
+from .cache import table_cache
+from .compression import CODECS, file_chunks, iter_frames, read_header, write_frames
+from .errors import ValidationError
+from .indexes import index_filepath
+from .transaction import atomic_write
+from .utils import (
+    load_metadata,
+    metadata_lock,
+    table_binary_filepath,
+    table_filepath,
+    table_lock,
+    table_log_filepath,
+    table_sequence_filepath,
+)
+
+MANIFEST_FILE = "manifest.json"
+BACKUP_SUFFIX = ".pdbz"
+BACKUP_VERSION = 1
+
+
+def _table_files(table_name, table_info):
+    return [
+        table_filepath(table_name),
+        table_log_filepath(table_name),
+        table_binary_filepath(table_name),
+        table_sequence_filepath(table_name),
+        *(
+            index_filepath(table_name, column)
+            for column in table_info.get('indexes', {})
+        ),
+    ]
+
+
+def _backup_file(filepath, target, codec):
+    """Копирует файл кадрами сжатого потока; {'size', 'stored', 'sha256'}"""
+    # hashlib (OpenSSL) импортируется только при работе с копией, не при запуске CLI
+    import hashlib
+
+    os.makedirs(os.path.dirname(target) or '.', exist_ok=True)
+    digest = hashlib.sha256()
+
+    def chunks(source):
+        for chunk in file_chunks(source):
+            digest.update(chunk)
+            yield chunk
+
+    with open(filepath, 'rb') as source, atomic_write(target, 'wb') as file:
+        size = write_frames(file, chunks(source), codec)
+        stored = file.tell()
+    return {'size': size, 'stored': stored, 'sha256': digest.hexdigest()}
+
+
+def backup_database(metadata_file, directory, codec='zlib'):
+    """Записывает резервную копию базы в каталог directory, возвращает манифест"""
+    if codec not in CODECS or codec == 'none':
+        raise ValidationError(
+            f"Недопустимый кодек копии '{codec}'. Разрешены: {CODECS[1:]}"
+        )
+    metadata_name = os.path.basename(metadata_file)
+    files = {}
+    with metadata_lock(metadata_file):
+        if not os.path.exists(metadata_file):
+            raise ValidationError("В базе нет таблиц — копировать нечего")
+        tables = load_metadata(metadata_file).get('tables', {})
+        files[metadata_name] = _backup_file(
+            metadata_file, os.path.join(directory, metadata_name + BACKUP_SUFFIX),
+            codec,
+        )
+        for table_name, table_info in tables.items():
+            with table_lock(table_name):
+                for filepath in _table_files(table_name, table_info):
+                    if os.path.exists(filepath):
+                        files[filepath] = _backup_file(
+                            filepath,
+                            os.path.join(directory, filepath + BACKUP_SUFFIX),
+                            codec,
+                        )
+    manifest = {
+        'version': BACKUP_VERSION,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'codec': codec,
+        'metadata': metadata_name,
+        'tables': list(tables),
+        'files': files,
+    }
+    with atomic_write(os.path.join(directory, MANIFEST_FILE)) as file:
+        json.dump(manifest, file, ensure_ascii=False, indent=2)
+    return manifest
+
+
+def _read_manifest(directory):
+    filepath = os.path.join(directory, MANIFEST_FILE)
+    try:
+        with open(filepath, 'r', encoding='utf-8') as file:
+            manifest = json.load(file)
+    except FileNotFoundError:
+        raise ValidationError(f"В '{directory}' нет резервной копии") from None
+    if manifest.get('version') != BACKUP_VERSION:
+        raise ValidationError(
+            f"Неподдерживаемая версия копии: {manifest.get('version')}"
+        )
+    for name in manifest['files']:
+        # файлы таблиц восстанавливаются только внутрь data/
+        parts = name.split('/')
+        if name != manifest['metadata'] and (
+            parts[0] != 'data' or len(parts) != 2 or os.path.isabs(name)
+        ):
+            raise ValidationError(f"Недопустимый путь в копии: '{name}'")
+    return manifest
+
+
+def _restore_file(source, target, info):
+    """Распаковывает файл копии в target, проверяя crc32 кадров, размер и sha256"""
+    import hashlib
+
+    os.makedirs(os.path.dirname(target) or '.', exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    with open(source, 'rb') as source_file, open(target, 'wb') as file:
+        try:
+            header = read_header(source_file)
+            if header is None:
+                raise ValueError("не является сжатым потоком")
+            for chunk in iter_frames(source_file, header[0]):
+                digest.update(chunk)
+                size += len(chunk)
+                file.write(chunk)
+        except ValueError as e:
+            raise ValidationError(f"Файл копии '{source}' повреждён: {e}") from None
+        file.flush()
+        os.fsync(file.fileno())
+    if size != info['size'] or digest.hexdigest() != info['sha256']:
+        raise ValidationError(
+            f"Файл копии '{source}' повреждён: не совпала контрольная сумма"
+        )
+
+
+def restore_database(metadata_file, directory):
+    """Заменяет базу резервной копией из каталога directory, возвращает манифест"""
+    manifest = _read_manifest(directory)
+    restored = []
+    with metadata_lock(metadata_file):
+        try:
+            for name, info in manifest['files'].items():
+                target = metadata_file if name == manifest['metadata'] else name
+                restored.append(target)
+                _restore_file(
+                    os.path.join(directory, name + BACKUP_SUFFIX),
+                    f"{target}.restore", info,
+                )
+        except BaseException:
+            for target in restored:
+                if os.path.exists(f"{target}.restore"):
+                    os.remove(f"{target}.restore")
+            raise
+        current = load_metadata(metadata_file).get('tables', {})
+        with ExitStack() as locks:
+            for table_name in sorted(set(current) | set(manifest['tables'])):
+                locks.enter_context(table_lock(table_name))
+            # файлы заменяются атомарно; удаляются только те, которых нет в копии
+            for table_name, table_info in current.items():
+                for filepath in _table_files(table_name, table_info):
+                    if filepath not in restored and os.path.exists(filepath):
+                        os.remove(filepath)
+            # метаданные заменяются последними: до этого читатели видят прежнюю схему
+            restored.sort(key=lambda target: target == metadata_file)
+            for target in restored:
+                os.replace(f"{target}.restore", target)
+        table_cache.clear()
+    return manifest
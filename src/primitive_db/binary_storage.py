@@ -0,0 +1,304 @@
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+from .columnar import _BYTE_BITS, ColumnarTable, constant_column
+from .transaction import atomic_write
+
+# Формат файла data/<таблица>.bin (little-endian):
+#
+#     заголовок   magic 'PDBB' | версия u16 | число столбцов u16 | число строк u64
+#     столбцы     длина имени u16 | имя utf-8 | тип u8 | смещение u64 | длина u64
+#     данные int  битовая карта NULL | значения int64 * строк
+#     данные bool битовая карта NULL | битовая карта значений
+#     данные str  коды int64 * строк | размер словаря u64 | код None i64 |
+#                 смещения u64 * (размер + 1) | куча строк utf-8
+MAGIC = b'PDBB'
+FORMAT_VERSION = 1
+TYPE_CODES = {'int': 0, 'bool': 1, 'str': 2}
+TYPE_NAMES = {code: name for name, code in TYPE_CODES.items()}
+
+_HEADER = struct.Struct('<4sHHQ')
+_COLUMN_NAME = struct.Struct('<H')
+_COLUMN_INFO = struct.Struct('<BQQ')
+_I64 = struct.Struct('<q')
+_STR_HEADER = struct.Struct('<Qq')
+
+
+def _to_little_endian(values):
+    if sys.byteorder != 'little':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _from_little_endian(buffer):
+    values = array('q')
+    values.frombytes(buffer)
+    if sys.byteorder != 'little':
+        values.byteswap()
+    return values
+
+
+def _null_bitmap(nulls, length):
+    bitmap = bytearray((length + 7) >> 3)
+    for position in nulls:
+        bitmap[position >> 3] |= 1 << (position & 7)
+    return bytes(bitmap)
+
+
+def _encode_column(column, length):
+    if column['type'] == 'int':
+        return _null_bitmap(column['nulls'], length) + _to_little_endian(
+            column['values']
+        )
+    if column['type'] == 'bool':
+        return _null_bitmap(column['nulls'], length) + bytes(column['bits'])
+    dictionary = column['dictionary']
+    none_code = -1
+    offsets = array('q', [0])
+    heap = bytearray()
+    for code, value in enumerate(dictionary):
+        if value is None:
+            none_code = code
+        else:
+            heap += str(value).encode('utf-8')
+        offsets.append(len(heap))
+    return b''.join((
+        _to_little_endian(column['codes']),
+        _STR_HEADER.pack(len(dictionary), none_code),
+        _to_little_endian(offsets),
+        bytes(heap),
+    ))
+
+
+def write_binary_table(filepath, table, columns):
+    """Записывает таблицу в бинарный файл: во временный файл, fsync, затем
+    os.replace, чтобы открытые mmap продолжали видеть прежнюю версию"""
+    if not isinstance(table, ColumnarTable):
+        table = ColumnarTable.from_records(columns, table)
+    length = len(table)
+    sections = [
+        (name, col_type, _encode_column(table._columns[name], length))
+        for name, col_type in columns
+    ]
+    encoded_names = [name.encode('utf-8') for name, _, _ in sections]
+    offset = _HEADER.size + sum(
+        _COLUMN_NAME.size + len(name) + _COLUMN_INFO.size for name in encoded_names
+    )
+    parts = [_HEADER.pack(MAGIC, FORMAT_VERSION, len(sections), length)]
+    for encoded_name, (_, col_type, payload) in zip(encoded_names, sections):
+        parts.append(_COLUMN_NAME.pack(len(encoded_name)) + encoded_name)
+        parts.append(
+            _COLUMN_INFO.pack(TYPE_CODES.get(col_type, 2), offset, len(payload))
+        )
+        offset += len(payload)
+    parts.extend(payload for _, _, payload in sections)
+
+    with atomic_write(filepath, 'wb') as file:
+        file.writelines(parts)
+
+
+class _LazyColumns(dict):
+    """Столбцы декодируются из mmap только при первом обращении"""
+
+    def __init__(self, table):
+        super().__init__()
+        self._table = table
+
+    def __missing__(self, name):
+        column = self._table._decode_column(name)
+        self[name] = column
+        return column
+
+    def get(self, name, default=None):
+        table = self._table
+        if name in self or name in table._layout or name in table._defaults:
+            return self[name]
+        return default
+
+
+class MappedTable(ColumnarTable):
+    """
+    Колоночная таблица поверх mmap бинарного файла.
+    Точечное чтение строки затрагивает по одной странице на столбец,
+    фильтр по столбцу декодирует только этот столбец.
+    filepath и signature (mtime, размер) описывают файл, пока таблица
+    в памяти с ним совпадает; после изменения filepath = None
+    """
+
+    def __init__(self, filepath):
+        with open(filepath, 'rb') as file:
+            self._buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            stat = os.fstat(file.fileno())
+        self.filepath = filepath
+        self.signature = (stat.st_mtime_ns, stat.st_size)
+        magic, version, column_count, length = _HEADER.unpack_from(self._buffer, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"файл '{filepath}' не является таблицей PDBB")
+        offset = _HEADER.size
+        columns = []
+        self._layout = {}
+        for _ in range(column_count):
+            (name_length,) = _COLUMN_NAME.unpack_from(self._buffer, offset)
+            offset += _COLUMN_NAME.size
+            name = bytes(self._buffer[offset:offset + name_length]).decode('utf-8')
+            offset += name_length
+            type_code, data_offset, data_length = _COLUMN_INFO.unpack_from(
+                self._buffer, offset
+            )
+            offset += _COLUMN_INFO.size
+            columns.append((name, TYPE_NAMES[type_code]))
+            self._layout[name] = (TYPE_NAMES[type_code], data_offset, data_length)
+        self.names = [name for name, _ in columns]
+        self.schema = columns
+        self._length = length
+        self._dictionaries = {}
+        self._defaults = {}
+        self._columns = _LazyColumns(self)
+
+    def conform(self, columns, defaults):
+        """Приводит таблицу к схеме из метаданных: столбцы, которых нет в файле
+        (добавлены alter_table), читаются как значение из defaults,
+        столбцы, которых нет в схеме, скрываются"""
+        self.schema = [tuple(column) for column in columns]
+        self.names = [name for name, _ in self.schema]
+        self._layout = {
+            name: self._layout[name] for name in self.names if name in self._layout
+        }
+        self._defaults = {
+            name: (col_type, defaults.get(name))
+            for name, col_type in self.schema if name not in self._layout
+        }
+        if self._defaults:
+            # процессы пула открывают файл сами и виртуальных столбцов не увидят
+            self.filepath = None
+        return self
+
+    def _decode_column(self, name):
+        if name in self._defaults:
+            col_type, default = self._defaults[name]
+            return constant_column(col_type, default, self._length)
+        col_type, offset, _ = self._layout[name]
+        length = self._length
+        bitmap_size = (length + 7) >> 3
+        column = {'type': col_type}
+        if col_type == 'str':
+            column['codes'] = _from_little_endian(
+                self._buffer[offset:offset + 8 * length]
+            )
+            column['dictionary'] = self._dictionary(name)
+            column['lookup'] = {
+                value: code for code, value in enumerate(column['dictionary'])
+            }
+            column['nulls'] = set()
+            return column
+        nulls = self._buffer[offset:offset + bitmap_size]
+        column['nulls'] = {
+            position for position in range(length)
+            if nulls[position >> 3] >> (position & 7) & 1
+        } if any(nulls) else set()
+        data_offset = offset + bitmap_size
+        if col_type == 'int':
+            column['values'] = _from_little_endian(
+                self._buffer[data_offset:data_offset + 8 * length]
+            )
+        else:
+            column['bits'] = bytearray(
+                self._buffer[data_offset:data_offset + bitmap_size]
+            )
+        return column
+
+    def _dictionary(self, name):
+        if name in self._dictionaries:
+            return self._dictionaries[name]
+        _, offset, _ = self._layout[name]
+        header_offset = offset + 8 * self._length
+        size, none_code = _STR_HEADER.unpack_from(self._buffer, header_offset)
+        offsets_start = header_offset + _STR_HEADER.size
+        offsets = _from_little_endian(
+            self._buffer[offsets_start:offsets_start + 8 * (size + 1)]
+        )
+        heap_start = offsets_start + 8 * (size + 1)
+        heap = bytes(self._buffer[heap_start:heap_start + offsets[-1]])
+        dictionary = [
+            sys.intern(heap[offsets[code]:offsets[code + 1]].decode('utf-8'))
+            for code in range(size)
+        ]
+        if none_code >= 0:
+            dictionary[none_code] = None
+        self._dictionaries[name] = dictionary
+        return dictionary
+
+    def value(self, name, position):
+        """Значение ячейки: из декодированного столбца или прямо из mmap"""
+        if name in self._columns:
+            return super().value(name, position)
+        if name in self._defaults:
+            return self._defaults[name][1]
+        col_type, offset, _ = self._layout[name]
+        if col_type == 'str':
+            (code,) = _I64.unpack_from(self._buffer, offset + 8 * position)
+            return self._dictionary(name)[code]
+        bitmap_size = (self._length + 7) >> 3
+        if self._buffer[offset + (position >> 3)] >> (position & 7) & 1:
+            return None
+        data_offset = offset + bitmap_size
+        if col_type == 'int':
+            return _I64.unpack_from(self._buffer, data_offset + 8 * position)[0]
+        return bool(self._buffer[data_offset + (position >> 3)] >> (position & 7) & 1)
+
+    def column_chunk(self, name, start, stop):
+        """Срез столбца прямо из mmap, без декодирования всего столбца"""
+        if name in self._columns or name in self._defaults:
+            return super().column_chunk(name, start, stop)
+        col_type, offset, _ = self._layout[name]
+        chunk = {'type': col_type, 'nulls': []}
+        if col_type == 'str':
+            chunk['codes'] = _from_little_endian(
+                self._buffer[offset + 8 * start:offset + 8 * stop]
+            )
+            chunk['dictionary'] = self._dictionary(name)
+            return chunk
+        first_byte, last_byte = start >> 3, (stop + 7) >> 3
+        nulls = self._buffer[offset + first_byte:offset + last_byte]
+        if any(nulls):
+            chunk['nulls'] = [
+                (index << 3) + bit
+                for index, byte in enumerate(nulls) for bit in _BYTE_BITS[byte]
+                if (index << 3) + bit < stop - start
+            ]
+        data_offset = offset + ((self._length + 7) >> 3)
+        if col_type == 'int':
+            chunk['values'] = _from_little_endian(
+                self._buffer[data_offset + 8 * start:data_offset + 8 * stop]
+            )
+        else:
+            chunk['bits'] = bytes(
+                self._buffer[data_offset + first_byte:data_offset + last_byte]
+            )
+        return chunk
+
+    def _materialize(self):
+        self.filepath = None
+        for name in self.names:
+            self._columns[name]
+
+    def append(self, record):
+        self._materialize()
+        super().append(record)
+
+    def update_row(self, position, set_clause):
+        self._materialize()
+        return super().update_row(position, set_clause)
+
+    def delete_positions(self, positions):
+        self._materialize()
+        return super().delete_positions(positions)
+
+
+def open_binary_table(filepath):
+    """Открывает бинарную таблицу через mmap"""
+    return MappedTable(filepath)
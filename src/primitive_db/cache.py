@@ -0,0 +1,124 @@
+import os
+import threading
+from collections import OrderedDict
+
+from .metrics import metrics
+
+TABLE_CACHE_MAX_BYTES = int(
+    os.environ.get('PRIMITIVE_DB_CACHE_MB', '256')
+) * 1024 * 1024
+
+
+def file_signature(*filepaths):
+    """Отпечаток файлов (mtime, размер) для проверки актуальности кэша"""
+    signature = []
+    for filepath in filepaths:
+        try:
+            stat = os.stat(filepath)
+        except FileNotFoundError:
+            signature.append(None)
+        else:
+            signature.append((stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+
+def signature_size(signature):
+    """Суммарный размер файлов по отпечатку — оценка памяти записи кэша"""
+    return sum(part[1] for part in signature if part is not None)
+
+
+class TableCache:
+    """
+    LRU-кэш разобранных таблиц и метаданных.
+    Запись считается актуальной, пока отпечаток файлов не изменился;
+    поколение (generation) таблицы растёт при каждой новой версии данных.
+    Общий для потоков сервера (server.py), поэтому операции идут под блокировкой
+    """
+
+    def __init__(self, max_bytes=TABLE_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._generations = {}
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.RLock()
+
+    def get(self, key, signature):
+        """Возвращает закэшированное значение или None, если его нет или устарело"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != signature:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, signature, value, size=None):
+        """Кладёт значение в кэш и вытесняет давно неиспользуемые записи"""
+        if size is None:
+            size = signature_size(signature)
+        with self._lock:
+            self.invalidate(key)
+            self._generations[key] = self._generations.get(key, 0) + 1
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (signature, value, size)
+            self.total_bytes += size
+            self._evict()
+
+    def invalidate(self, key):
+        """Удаляет запись из кэша"""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self.total_bytes -= entry[2]
+
+    def signature(self, key, value):
+        """Отпечаток, с которым в кэше лежит именно объект value, иначе None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] is not value:
+                return None
+            return entry[0]
+
+    def generation(self, key):
+        """Номер версии данных по ключу"""
+        return self._generations.get(key, 0)
+
+    def resize(self, max_bytes):
+        """Меняет лимит памяти кэша"""
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def _evict(self):
+        while self._entries and self.total_bytes > self.max_bytes:
+            _, (_, _, evicted_size) = self._entries.popitem(last=False)
+            self.total_bytes -= evicted_size
+            self.evictions += 1
+
+    def clear(self):
+        """Полностью очищает кэш"""
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+    def stats(self):
+        """Статистика попаданий и промахов"""
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'bytes': self.total_bytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+
+table_cache = TableCache()
+metrics.register('table_cache', table_cache.stats)
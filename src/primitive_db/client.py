@@ -0,0 +1,161 @@
+"""
+Клиент сетевого сервера (server.py) с пулом соединений.
+
+    with ClientPool(port=5455, size=8) as db:          # потоки
+        db.execute("select name from users where age > ?", (18,)).fetchall()
+
+    async with AsyncClientPool(port=5455, size=100) as db:   # asyncio
+        result = await db.execute("select count(*) from users")
+
+Соединения открываются по мере надобности (не больше size) и возвращаются
+в пул после ответа. Ошибки сервера поднимаются как исключения из errors.py,
+обрыв соединения — ConnectionError (запрос не повторяется: запись могла пройти).
+"""
+import asyncio
+import itertools
+import json
+import queue
+import socket
+import threading
+
+from . import errors
+from .api import Result
+from .server import DEFAULT_HOST, DEFAULT_PORT
+
+DEFAULT_POOL_SIZE = 4
+DEFAULT_TIMEOUT = 30.0
+
+
+def encode_request(request_id, sql, params=(), many=None):
+    """Строка запроса протокола; many — наборы параметров для executemany"""
+    request = {'id': request_id, 'sql': sql, 'params': list(params)}
+    if many is not None:
+        request['many'] = [list(item) for item in many]
+    return json.dumps(request, ensure_ascii=False).encode('utf-8') + b'\n'
+
+
+def decode_response(line):
+    """Ответ сервера -> Result; ошибка сервера -> исключение из errors.py"""
+    if not line:
+        raise ConnectionError("сервер закрыл соединение")
+    response = json.loads(line)
+    if not response['ok']:
+        error_class = getattr(errors, response['error'], errors.DatabaseError)
+        raise error_class(response['message'])
+    return Result(
+        [tuple(column) for column in response['columns']], response['rows'],
+        response['rowcount'], response['lastrowid'],
+    )
+
+
+class ClientPool:
+    """Пул блокирующих соединений; безопасен для использования из потоков"""
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT,
+                 size=DEFAULT_POOL_SIZE, timeout=DEFAULT_TIMEOUT):
+        self.host, self.port, self.timeout = host, port, timeout
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._ids = itertools.count(1)
+
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port), self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return sock, sock.makefile('rwb')
+
+    def execute(self, sql, params=(), many=None):
+        """Выполняет команду на сервере, возвращает Result"""
+        self._slots.acquire()
+        try:
+            try:
+                connection = self._idle.get_nowait()
+            except queue.Empty:
+                connection = self._connect()
+            sock, stream = connection
+            try:
+                stream.write(encode_request(next(self._ids), sql, params, many))
+                stream.flush()
+                line = stream.readline()
+            except OSError:
+                sock.close()
+                raise
+            if not line:
+                sock.close()
+            else:
+                self._idle.put(connection)
+            return decode_response(line)
+        finally:
+            self._slots.release()
+
+    def executemany(self, sql, seq_of_params):
+        """Выполняет команду для каждого набора параметров одним запросом"""
+        return self.execute(sql, many=seq_of_params)
+
+    def close(self):
+        """Закрывает простаивающие соединения"""
+        while True:
+            try:
+                sock, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class AsyncClientPool:
+    """Пул соединений для asyncio"""
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT,
+                 size=DEFAULT_POOL_SIZE, timeout=DEFAULT_TIMEOUT):
+        self.host, self.port, self.timeout = host, port, timeout
+        self._idle = []
+        self._slots = asyncio.Semaphore(size)
+        self._ids = itertools.count(1)
+
+    async def execute(self, sql, params=(), many=None):
+        """Выполняет команду на сервере, возвращает Result"""
+        async with self._slots:
+            if self._idle:
+                reader, writer = self._idle.pop()
+            else:
+                reader, writer = await asyncio.wait_for(
+                    asyncio.open_connection(self.host, self.port), self.timeout
+                )
+            try:
+                writer.write(encode_request(next(self._ids), sql, params, many))
+                await writer.drain()
+                line = await asyncio.wait_for(reader.readline(), self.timeout)
+            except BaseException:
+                writer.close()
+                raise
+            if not line:
+                writer.close()
+            else:
+                self._idle.append((reader, writer))
+            return decode_response(line)
+
+    async def executemany(self, sql, seq_of_params):
+        """Выполняет команду для каждого набора параметров одним запросом"""
+        return await self.execute(sql, many=seq_of_params)
+
+    async def close(self):
+        """Закрывает простаивающие соединения"""
+        idle, self._idle = self._idle, []
+        for _, writer in idle:
+            writer.close()
+        for _, writer in idle:
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
@@ -0,0 +1,314 @@
+import sys
+from array import array
+
+ENGINES = ('rows', 'columnar')
+
+# Смещения установленных битов для каждого значения байта битовой карты
+_BYTE_BITS = [
+    tuple(bit for bit in range(8) if byte >> bit & 1) for byte in range(256)
+]
+
+
+class ColumnarTable:
+    """
+    Колоночное представление таблицы в памяти.
+    int хранится в array('q'), bool — в битовой карте, str — словарным
+    кодированием (array кодов + список уникальных интернированных строк).
+    Снаружи ведёт себя как список записей: len(), итерация, table[i], append()
+    """
+
+    def __init__(self, columns):
+        self.names = [name for name, _ in columns]
+        self._columns = {}
+        for name, col_type in columns:
+            column = {'type': col_type, 'nulls': set()}
+            if col_type == 'int':
+                column['values'] = array('q')
+            elif col_type == 'bool':
+                column['bits'] = bytearray()
+            else:
+                column['codes'] = array('q')
+                column['dictionary'] = []
+                column['lookup'] = {}
+            self._columns[name] = column
+        self._length = 0
+
+    @classmethod
+    def from_records(cls, columns, records):
+        """Строит колоночную таблицу из списка словарей"""
+        table = cls(columns)
+        for record in records:
+            table.append(record)
+        return table
+
+    def to_records(self):
+        """Материализует таблицу обратно в список словарей"""
+        return list(self)
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        for position in range(self._length):
+            yield self._row(position)
+
+    def __getitem__(self, position):
+        if position < 0:
+            position += self._length
+        if not 0 <= position < self._length:
+            raise IndexError(position)
+        return self._row(position)
+
+    def _row(self, position):
+        return {name: self.value(name, position) for name in self.names}
+
+    def value(self, name, position):
+        """Значение столбца в строке с заданной позицией"""
+        column = self._columns[name]
+        if position in column['nulls']:
+            return None
+        if column['type'] == 'int':
+            return column['values'][position]
+        if column['type'] == 'bool':
+            return bool(column['bits'][position >> 3] >> (position & 7) & 1)
+        return column['dictionary'][column['codes'][position]]
+
+    def column_values(self, name):
+        """Все значения столбца (без материализации строк)"""
+        column = self._columns[name]
+        if column['type'] == 'int':
+            values = column['values'].tolist()
+        elif column['type'] == 'bool':
+            bits = column['bits']
+            values = [
+                bool(bits[position >> 3] >> (position & 7) & 1)
+                for position in range(self._length)
+            ]
+        else:
+            dictionary = column['dictionary']
+            return [dictionary[code] for code in column['codes']]
+        for position in column['nulls']:
+            values[position] = None
+        return values
+
+    def _encode(self, column, value):
+        lookup = column['lookup']
+        code = lookup.get(value)
+        if code is None:
+            code = len(column['dictionary'])
+            if isinstance(value, str):
+                value = sys.intern(value)
+            column['dictionary'].append(value)
+            lookup[value] = code
+        return code
+
+    def _store(self, name, position, value):
+        column = self._columns[name]
+        if value is None and column['type'] != 'str':
+            column['nulls'].add(position)
+            value = 0
+        else:
+            column['nulls'].discard(position)
+        if column['type'] == 'int':
+            column['values'][position] = value
+        elif column['type'] == 'bool':
+            mask = 1 << (position & 7)
+            if value:
+                column['bits'][position >> 3] |= mask
+            else:
+                column['bits'][position >> 3] &= ~mask & 0xFF
+        else:
+            column['codes'][position] = self._encode(column, value)
+
+    def append(self, record):
+        """Добавляет строку в конец таблицы"""
+        position = self._length
+        for column in self._columns.values():
+            if column['type'] == 'int':
+                column['values'].append(0)
+            elif column['type'] == 'bool':
+                if position & 7 == 0:
+                    column['bits'].append(0)
+            else:
+                column['codes'].append(0)
+        self._length += 1
+        for name in self.names:
+            self._store(name, position, record.get(name))
+
+    def update_row(self, position, set_clause):
+        """Меняет значения столбцов строки, возвращает прежние значения"""
+        old_values = {}
+        for name, value in set_clause.items():
+            if name in self._columns:
+                old_values[name] = self.value(name, position)
+                self._store(name, position, value)
+        return old_values
+
+    def delete_positions(self, positions):
+        """Удаляет строки с заданными позициями, уплотняя столбцы"""
+        doomed = set(positions)
+        kept = [
+            position for position in range(self._length) if position not in doomed
+        ]
+        rebuilt = ColumnarTable(
+            [(name, self._columns[name]['type']) for name in self.names]
+        )
+        for name in self.names:
+            column, new_column = self._columns[name], rebuilt._columns[name]
+            if column['type'] == 'int':
+                values = column['values']
+                new_column['values'] = array('q', (values[p] for p in kept))
+            elif column['type'] == 'bool':
+                bits = bytearray((len(kept) + 7) >> 3)
+                for new_position, position in enumerate(kept):
+                    if column['bits'][position >> 3] >> (position & 7) & 1:
+                        bits[new_position >> 3] |= 1 << (new_position & 7)
+                new_column['bits'] = bits
+            else:
+                codes = column['codes']
+                new_column['codes'] = array('q', (codes[p] for p in kept))
+                new_column['dictionary'] = column['dictionary']
+                new_column['lookup'] = column['lookup']
+            new_column['nulls'] = {
+                new_position for new_position, position in enumerate(kept)
+                if position in column['nulls']
+            }
+        self._columns = rebuilt._columns
+        self._length = len(kept)
+        return self
+
+    def clear(self):
+        """Удаляет все строки"""
+        self.delete_positions(range(self._length))
+
+    def column_chunk(self, name, start, stop):
+        """Срез столбца [start, stop) в компактном виде для передачи в другой
+        процесс (см. chunk_values). start должен быть кратен 8"""
+        column = self._columns[name]
+        chunk = {
+            'type': column['type'],
+            'nulls': [p - start for p in column['nulls'] if start <= p < stop],
+        }
+        if column['type'] == 'int':
+            chunk['values'] = column['values'][start:stop]
+        elif column['type'] == 'bool':
+            chunk['bits'] = bytes(column['bits'][start >> 3:(stop + 7) >> 3])
+        else:
+            codes = column['codes'][start:stop]
+            dictionary = column['dictionary']
+            chunk['codes'] = codes
+            # только строки, встречающиеся в срезе, а не весь словарь
+            chunk['dictionary'] = {code: dictionary[code] for code in set(codes)}
+        return chunk
+
+    def scan_equal(self, name, value):
+        """Векторизованный поиск позиций, где столбец равен value:
+        сканирование массива идёт в C через array.index"""
+        column = self._columns.get(name)
+        if column is None:
+            return list(range(self._length)) if value is None else []
+        if value is None:
+            if column['type'] == 'str':
+                return _scan_code(column, column['lookup'].get(None))
+            return sorted(column['nulls'])
+        if column['type'] == 'int':
+            if not isinstance(value, int):
+                return []
+            positions = _scan_array(column['values'], value)
+        elif column['type'] == 'bool':
+            # как ==: True совпадает с 1, False — с 0, прочие числа ни с чем
+            if not isinstance(value, int) or value not in (0, 1):
+                return []
+            positions = _scan_bits(column['bits'], self._length, bool(value))
+        else:
+            return _scan_code(column, column['lookup'].get(value))
+        if column['nulls']:
+            positions = [p for p in positions if p not in column['nulls']]
+        return positions
+
+    def matching_positions(self, where_clause):
+        """Позиции строк, удовлетворяющих всем условиям равенства WHERE"""
+        positions = None
+        for name, value in where_clause.items():
+            if positions is None:
+                positions = self.scan_equal(name, value)
+            else:
+                positions = [p for p in positions if self.value(name, p) == value]
+            if not positions:
+                return []
+        return positions if positions is not None else list(range(self._length))
+
+
+def constant_column(col_type, value, length):
+    """Столбец из length одинаковых значений (столбец, добавленный alter_table,
+    которого ещё нет в файле таблицы)"""
+    column = {'type': col_type, 'nulls': set()}
+    if col_type != 'str' and value is None:
+        column['nulls'] = set(range(length))
+        value = 0
+    if col_type == 'int':
+        column['values'] = array('q', [value]) * length
+    elif col_type == 'bool':
+        column['bits'] = bytearray([0xFF if value else 0]) * ((length + 7) >> 3)
+    else:
+        column['codes'] = array('q', [0]) * length
+        column['dictionary'] = [value]
+        column['lookup'] = {value: 0}
+    return column
+
+
+def chunk_values(chunk, length):
+    """Значения среза столбца (см. ColumnarTable.column_chunk) списком"""
+    if chunk['type'] == 'int':
+        values = chunk['values'].tolist()
+    elif chunk['type'] == 'bool':
+        bits = chunk['bits']
+        values = [
+            bool(bits[position >> 3] >> (position & 7) & 1)
+            for position in range(length)
+        ]
+    else:
+        dictionary = chunk['dictionary']
+        return [dictionary[code] for code in chunk['codes']]
+    for position in chunk['nulls']:
+        values[position] = None
+    return values
+
+
+def column_reader(table_data, column):
+    """Функция position -> значение столбца; для колоночной таблицы
+    читает один столбец, не собирая строки"""
+    if isinstance(table_data, ColumnarTable):
+        return table_data.column_values(column).__getitem__
+    return lambda position: table_data[position].get(column)
+
+
+def _scan_array(values, target):
+    positions = []
+    start = 0
+    try:
+        while True:
+            start = values.index(target, start)
+            positions.append(start)
+            start += 1
+    except ValueError:
+        return positions
+
+
+def _scan_code(column, code):
+    if code is None:
+        return []
+    return _scan_array(column['codes'], code)
+
+
+def _scan_bits(bits, length, target):
+    positions = []
+    for byte_index, byte in enumerate(bits):
+        if not target:
+            byte = ~byte & 0xFF
+        if byte:
+            base = byte_index << 3
+            positions.extend(base + bit for bit in _BYTE_BITS[byte])
+    while positions and positions[-1] >= length:
+        positions.pop()
+    return positions
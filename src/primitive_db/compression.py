@@ -0,0 +1,130 @@
+import json
+import struct
+import zlib
+from itertools import islice
+
+# Сжатый поток (снимок таблицы data/<таблица>.json и файлы резервной копии):
+#
+#     заголовок  magic 'PDBZ' | версия u8 | кодек u8 | резерв u16 |
+#                исходный размер u64
+#     кадр       исходный размер u32 | сжатый размер u32 | crc32 исходных u32 |
+#                сжатые данные
+#
+# Кадры сжимаются независимо: поток читается и проверяется по кадру,
+# без распаковки файла целиком. В снимке таблицы кадр — JSON-массив
+# из CHUNK_ROWS записей; в резервной копии — CHUNK_BYTES байт файла
+MAGIC = b'PDBZ'
+FORMAT_VERSION = 1
+CODECS = ('none', 'zlib', 'lzma')
+CHUNK_ROWS = 10000
+CHUNK_BYTES = 1024 * 1024
+
+_HEADER = struct.Struct('<4sBBHQ')
+_FRAME = struct.Struct('<III')
+
+
+def _compressor(codec):
+    # lzma импортируется только для таблиц с этим кодеком
+    if codec == 'lzma':
+        import lzma
+
+        return lzma.compress, lzma.decompress, lzma.LZMAError
+    if codec == 'zlib':
+        return zlib.compress, zlib.decompress, zlib.error
+    raise ValueError(f"неизвестный кодек сжатия '{codec}'")
+
+
+def write_frames(file, chunks, codec):
+    """Пишет куски байтов chunks кадрами в двоичный файл (с начала файла),
+    возвращает исходный размер. Файл должен поддерживать seek: исходный
+    размер записывается в заголовок после всех кадров"""
+    compress, _, _ = _compressor(codec)
+    file.write(_HEADER.pack(MAGIC, FORMAT_VERSION, CODECS.index(codec), 0, 0))
+    total = 0
+    for chunk in chunks:
+        if not chunk:
+            continue
+        payload = compress(chunk)
+        file.write(_FRAME.pack(len(chunk), len(payload), zlib.crc32(chunk)))
+        file.write(payload)
+        total += len(chunk)
+    end = file.tell()
+    file.seek(0)
+    file.write(_HEADER.pack(MAGIC, FORMAT_VERSION, CODECS.index(codec), 0, total))
+    file.seek(end)
+    return total
+
+
+def read_header(file):
+    """(кодек, исходный размер) сжатого потока или None, если файл не сжат.
+    После None позиция файла возвращается в начало"""
+    header = file.read(_HEADER.size)
+    if len(header) < _HEADER.size or not header.startswith(MAGIC):
+        file.seek(0)
+        return None
+    _, version, codec_code, _, total = _HEADER.unpack(header)
+    if version != FORMAT_VERSION or codec_code >= len(CODECS):
+        raise ValueError(f"неподдерживаемый сжатый поток: версия {version}")
+    return CODECS[codec_code], total
+
+
+def iter_frames(file, codec):
+    """Распакованные кадры потока после заголовка (см. read_header);
+    ValueError, если кадр обрезан или не сходится контрольная сумма"""
+    _, decompress, error = _compressor(codec)
+    while True:
+        frame = file.read(_FRAME.size)
+        if not frame:
+            return
+        if len(frame) < _FRAME.size:
+            raise ValueError("сжатый поток обрезан")
+        raw_size, payload_size, checksum = _FRAME.unpack(frame)
+        payload = file.read(payload_size)
+        if len(payload) < payload_size:
+            raise ValueError("сжатый поток обрезан")
+        try:
+            chunk = decompress(payload)
+        except error as e:
+            raise ValueError(f"кадр не распаковывается: {e}") from None
+        if len(chunk) != raw_size or zlib.crc32(chunk) != checksum:
+            raise ValueError("контрольная сумма кадра не совпала")
+        yield chunk
+
+
+def record_chunks(records, rows=CHUNK_ROWS):
+    """Записи таблицы кусками JSON-массивов по rows записей"""
+    iterator = iter(records)
+    while True:
+        batch = list(islice(iterator, rows))
+        if not batch:
+            return
+        yield json.dumps(
+            batch, ensure_ascii=False, separators=(',', ':')
+        ).encode('utf-8')
+
+
+def write_records(file, records, codec):
+    """Пишет записи таблицы сжатым потоком"""
+    return write_frames(file, record_chunks(records), codec)
+
+
+def iter_records(file, codec):
+    """Записи сжатого снимка по одной: кадр распаковывается и разбирается,
+    только когда чтение до него дошло"""
+    for chunk in iter_frames(file, codec):
+        yield from json.loads(chunk)
+
+
+def read_records(file, codec, limit=None):
+    """Записи сжатого снимка (первые limit, если задан); после limit-й записи
+    следующие кадры не читаются"""
+    return list(islice(iter_records(file, codec), limit))
+
+
+def file_chunks(file, size=CHUNK_BYTES):
+    """Содержимое двоичного файла кусками по size байт"""
+    while True:
+        chunk = file.read(size)
+        if not chunk:
+            return
+        yield chunk
@@ -1,76 +1,618 @@
+import heapq
+import json
 import os
+import time
+from itertools import islice
 
 from ..decorators import confirm_action, create_cacher, handle_db_errors, log_time
-from .utils import load_table_data, save_table_data
+from .aggregates import answer_from_indexes, hash_aggregate, parse_aggregate
+from .backup import backup_database, restore_database
+from .columnar import ENGINES, ColumnarTable, column_reader
+from .compression import CODECS
+from .errors import (
+    ColumnNotFoundError,
+    QuerySyntaxError,
+    TableNotFoundError,
+    ValidationError,
+)
+from .indexes import (
+    INDEX_KINDS,
+    add_to_indexes,
+    build_index,
+    find_candidates,
+    load_table_indexes,
+    remove_from_indexes,
+    remove_index_files,
+    save_index,
+    save_table_indexes,
+    update_in_indexes,
+)
+from .join import join_pairs, resolve_field, split_condition
+from .metrics import metrics
+from .parallel import parallel_positions
+from .planner import analyze_table, plan_indexes, plan_order, plan_query
+from .utils import (
+    STORAGE_MODES,
+    allocate_ids,
+    compact_table,
+    get_compression,
+    get_engine,
+    get_storage,
+    iter_import_rows,
+    list_tables,  # noqa: F401 — часть API core
+    load_table_data,
+    remove_sequence,
+    remove_table_files,
+    save_table_data,
+    table_filepath,
+    table_generation,
+    table_lock,
+)
+from .where import (
+    compile_columnar_where,
+    compile_where,
+    condition_fields,
+    equality_terms,
+    to_condition,
+)
 
 select_cacher = create_cacher()
+metrics.register('select_cache', select_cacher.stats)
+
+BULK_BATCH_SIZE = 10000
+# Результат select больше этого числа строк не кэшируется и не собирается
+# в список: он выводится потоково (см. iter_cached_select)
+SELECT_CACHE_MAX_ROWS = 10000
+MAX_REPORTED_ERRORS = 5
+
+def require_table(metadata, table_name):
+    """Описание таблицы из метаданных; TableNotFoundError, если её нет"""
+    table_info = (metadata or {}).get('tables', {}).get(table_name)
+    if table_info is None:
+        raise TableNotFoundError(f"Таблица '{table_name}' не существует")
+    return table_info
+
+def _matching_positions(table_data, where_clause, indexes=None):
+    """Позиции записей, подходящих под WHERE; по индексу, если он есть.
+    Условие компилируется в один предикат на запрос; полный просмотр
+    большой колоночной таблицы идёт параллельно (parallel.py)"""
+    positions, scanned = _scan_positions(table_data, where_clause, indexes)
+    if metrics.enabled:
+        metrics.add('rows_scanned', scanned)
+        metrics.add('rows_returned', len(positions))
+    return positions
+
+def _scan_positions(table_data, where_clause, indexes):
+    """Пара (позиции под условием, число просмотренных строк)"""
+    condition = to_condition(where_clause)
+    if condition is None:
+        return range(len(table_data)), len(table_data)
+    candidates = find_candidates(indexes, condition)
+    columnar = isinstance(table_data, ColumnarTable)
+    if candidates is None and columnar:
+        terms = equality_terms(condition)
+        if terms is not None:
+            return table_data.matching_positions(terms), len(table_data)
+        positions = parallel_positions(table_data, condition)
+        if positions is not None:
+            return positions, len(table_data)
+        fields, factory = compile_columnar_where(condition)
+        predicate = factory(*(table_data.column_values(field) for field in fields))
+        return [
+            position for position in range(len(table_data)) if predicate(position)
+        ], len(table_data)
+    predicate = compile_where(condition)
+    if candidates is None:
+        return [
+            position for position, record in enumerate(table_data)
+            if predicate(record)
+        ], len(table_data)
+    return [
+        position for position in candidates if predicate(table_data[position])
+    ], len(candidates)
 
 @handle_db_errors
 @log_time
-def select(table_data, where_clause=None):
-    """Выбирает записи из табличных данных с возможностью фильтрации"""
-    cache_key = f"select_{len(table_data)}_{str(where_clause)}"
+def select(table_data, where_clause=None, indexes=None, table_name=None, plan=None):
+    """Выбирает записи из табличных данных с возможностью фильтрации.
+    Результаты с WHERE кэшируются по имени таблицы и версии её данных.
+    plan (см. planner.plan_query) задаёт, какие индексы использовать"""
+    if where_clause is None:
+        return table_data
+    access_indexes = plan_indexes(plan, indexes)
     def perform_select():
-        if where_clause is None:
-            return table_data
-        filtered_data = []
-        for record in table_data:
-            match = True
-            for key, value in where_clause.items():
-                if record.get(key) != value:
-                    match = False
-                    break
-            if match:
-                filtered_data.append(record)
-    
-        return filtered_data
+        return [
+            table_data[position]
+            for position in _matching_positions(
+                table_data, where_clause, access_indexes
+            )
+        ]
+    if table_name is None:
+        return perform_select()
+    cache_key = (table_name, table_generation(table_name), to_condition(where_clause))
     return select_cacher(cache_key, perform_select)
 
+def iter_cached_select(table_data, where_clause, indexes=None, table_name=None,
+                       plan=None):
+    """Потоковый select с WHERE через кэш результатов: повторный запрос отдаётся
+    из кэша, новый — по мере просмотра (как iter_select) и попадает в кэш, только
+    если в нём не больше SELECT_CACHE_MAX_ROWS строк"""
+    cache_key = (table_name, table_generation(table_name), to_condition(where_clause))
+    cached = select_cacher.get(cache_key)
+    if cached is not None:
+        yield from cached
+        return
+    rows = []
+    for record in iter_select(table_data, where_clause, indexes, plan):
+        if rows is not None:
+            rows.append(record)
+            if len(rows) > SELECT_CACHE_MAX_ROWS:
+                rows = None
+        yield record
+    if rows is not None:
+        select_cacher.put(cache_key, rows)
+
+def _position_predicate(table_data, condition):
+    """Предикат position -> bool; для колоночной таблицы читает только
+    столбцы, упомянутые в условии"""
+    if isinstance(table_data, ColumnarTable):
+        fields, factory = compile_columnar_where(condition)
+        return factory(*(table_data.column_values(field) for field in fields))
+    predicate = compile_where(condition)
+    return lambda position: predicate(table_data[position])
+
+def _projector(table_data, columns):
+    """Функция position -> запись, содержащая только столбцы columns.
+    Для колоночной таблицы остальные столбцы не читаются вовсе"""
+    if columns is None:
+        return table_data.__getitem__
+    if isinstance(table_data, ColumnarTable):
+        value = table_data.value
+        return lambda position: {name: value(name, position) for name in columns}
+    return lambda position: {
+        name: table_data[position].get(name) for name in columns
+    }
+
+def _sort_key(table_data, column, descending):
+    """Ключ сортировки позиций по столбцу; NULL всегда в конце"""
+    if isinstance(table_data, ColumnarTable):
+        values = table_data.column_values(column)
+        value = values.__getitem__
+    else:
+        def value(position):
+            return table_data[position].get(column)
+    if descending:
+        return lambda position: ((_v := value(position)) is not None, _v)
+    return lambda position: ((_v := value(position)) is None, _v)
+
+def _ordered_positions(table_data, condition, indexes, plan, stop):
+    """Позиции результата в порядке ORDER BY: обход sorted-индекса,
+    top-k через кучу (O(n log k)) или полная сортировка"""
+    column, descending = plan['order_by']
+    if plan['order'] == 'index':
+        positions = indexes[column]['positions']
+        positions = reversed(positions) if descending else iter(positions)
+        if condition is None:
+            return positions
+        predicate = _position_predicate(table_data, condition)
+        return (position for position in positions if predicate(position))
+    matches = _matching_positions(
+        table_data, condition, plan_indexes(plan, indexes)
+    )
+    key = _sort_key(table_data, column, descending)
+    if plan['order'] == 'top_k':
+        pick = heapq.nlargest if descending else heapq.nsmallest
+        return iter(pick(stop, matches, key=key))
+    return iter(sorted(matches, key=key, reverse=descending))
+
+def iter_select(
+    table_data, where_clause=None, indexes=None, plan=None, limit=None, offset=0,
+    columns=None, order_by=None,
+):
+    """Лениво отдаёт записи, удовлетворяющие WHERE, с учётом OFFSET и LIMIT.
+    Полный результат не материализуется: чтение останавливается после limit строк.
+    columns — список выводимых столбцов (остальные не читаются),
+    order_by — пара (столбец, по убыванию)"""
+    condition = to_condition(where_clause)
+    stop = None if limit is None else offset + limit
+    project = _projector(table_data, columns)
+    if order_by is not None:
+        if plan is None:
+            plan = plan_query(condition, indexes, None, len(table_data))
+        plan = plan_order(plan, order_by, indexes, limit)
+        positions = _ordered_positions(table_data, condition, indexes, plan, stop)
+        return map(project, islice(positions, offset, stop))
+    # строки считаются по мере чтения: LIMIT останавливает просмотр раньше
+    if condition is None:
+        positions = metrics.counted(
+            range(len(table_data)), 'rows_scanned', 'rows_returned'
+        )
+    else:
+        candidates = find_candidates(plan_indexes(plan, indexes), condition)
+        if candidates is None and isinstance(table_data, ColumnarTable):
+            positions = iter(_matching_positions(table_data, condition))
+        elif candidates is None:
+            predicate = _position_predicate(table_data, condition)
+            positions = metrics.counted((
+                position for position in metrics.counted(
+                    range(len(table_data)), 'rows_scanned'
+                )
+                if predicate(position)
+            ), 'rows_returned')
+        else:
+            predicate = compile_where(condition)
+            positions = metrics.counted((
+                position for position in metrics.counted(candidates, 'rows_scanned')
+                if predicate(table_data[position])
+            ), 'rows_returned')
+    return map(project, islice(positions, offset, stop))
+
+def _order_records(records, order_by=None, limit=None, offset=0):
+    """ORDER BY, OFFSET и LIMIT над готовыми записями результата;
+    при LIMIT — top-k через кучу вместо полной сортировки"""
+    stop = None if limit is None else offset + limit
+    if order_by is None:
+        return list(islice(records, offset, stop))
+    column, descending = order_by
+    # NULL в конце при любом направлении сортировки
+    def key(record):
+        return (record[column] is None) != descending, record[column]
+    if stop is not None:
+        pick = heapq.nlargest if descending else heapq.nsmallest
+        records = pick(stop, records, key=key)
+    else:
+        records = sorted(records, key=key, reverse=descending)
+    return records[offset:]
+
+def join_rows(
+    metadata, left_name, right_name, on, where_clause=None, columns=None,
+    order_by=None, limit=None, offset=0,
+):
+    """Соединение двух таблиц по равенству on = ('a.x', 'b.y') хэш-джойном.
+    Части WHERE, относящиеся к одной таблице, проверяются до соединения.
+    Записи результата имеют ключи вида 'таблица.столбец'"""
+    if left_name == right_name:
+        raise QuerySyntaxError("соединение таблицы с самой собой не поддерживается")
+    for table_name in (left_name, right_name):
+        require_table(metadata, table_name)
+    tables = {
+        name: [col_name for col_name, _ in metadata['tables'][name]['columns']]
+        for name in (left_name, right_name)
+    }
+    keys = dict(resolve_field(field, tables) for field in on)
+    if set(keys) != {left_name, right_name}:
+        raise QuerySyntaxError("условие ON должно связывать столбцы двух таблиц")
+    pushed, residual = split_condition(to_condition(where_clause), tables)
+
+    sides = {}
+    for name in (left_name, right_name):
+        table_info = metadata['tables'][name]
+        table_data = load_table_data(name, table_info)
+        indexes = load_table_indexes(name, table_info, table_data)
+        positions = None
+        if name in pushed:
+            plan = plan_query(
+                pushed[name], indexes, table_info.get('stats'), len(table_data)
+            )
+            positions = _matching_positions(
+                table_data, pushed[name], plan_indexes(plan, indexes)
+            )
+        sides[name] = {
+            'data': table_data,
+            'key': keys[name],
+            'positions': positions,
+            'index': indexes.get(keys[name]),
+        }
+
+    if columns is None:
+        output = [(name, column) for name in tables for column in tables[name]]
+    else:
+        output = [resolve_field(field, tables) for field in columns]
+    needed = list(output)
+    for field in condition_fields(residual) if residual is not None else []:
+        needed.append(tuple(field.split('.', 1)))
+    if order_by is not None:
+        needed.append(resolve_field(order_by[0], tables))
+        order_by = ('.'.join(needed[-1]), order_by[1])
+    readers = {
+        '.'.join(field): (field[0] == left_name, column_reader(
+            sides[field[0]]['data'], field[1]
+        ))
+        for field in dict.fromkeys(needed)
+    }
+
+    def records():
+        predicate = compile_where(residual) if residual is not None else None
+        for left_position, right_position in join_pairs(
+            sides[left_name], sides[right_name]
+        ):
+            record = {
+                name: read(left_position if is_left else right_position)
+                for name, (is_left, read) in readers.items()
+            }
+            if predicate is None or predicate(record):
+                yield record
+
+    names = ['.'.join(field) for field in output]
+    return [
+        {name: record[name] for name in names}
+        for record in _order_records(records(), order_by, limit, offset)
+    ]
+
 @handle_db_errors
-def update(table_data, set_clause, where_clause):
-    """Обновляет записи в табличных данных"""
+@log_time
+def join_select(
+    metadata, left_name, right_name, on, where_clause=None, columns=None,
+    order_by=None, limit=None, offset=0,
+):
+    """Соединение двух таблиц (см. join_rows) с выводом ошибок и времени"""
+    return join_rows(
+        metadata, left_name, right_name, on, where_clause, columns,
+        order_by, limit, offset,
+    )
+
+def compute_aggregate(
+    table_data, select_items, where_clause=None, group_by=None, indexes=None,
+    plan=None, order_by=None, limit=None, offset=0,
+):
+    """Агрегатный запрос: count/sum/min/max/avg с необязательным GROUP BY.
+    select_items — элементы списка select ('city', 'count(*)', 'avg(age)').
+    Считается за один проход хэш-агрегацией; count(*) и min/max
+    по возможности берутся прямо из индексов. Возвращает список записей"""
+    group_by = list(group_by or [])
+    names = [item.strip() for item in select_items]
+    aggregates, slots = [], []
+    for name in names:
+        parsed = parse_aggregate(name)
+        if parsed is None:
+            if name not in group_by:
+                raise QuerySyntaxError(
+                    f"столбец '{name}' должен входить в GROUP BY"
+                )
+            slots.append(('group', group_by.index(name)))
+        else:
+            slots.append(('aggregate', len(aggregates)))
+            aggregates.append(parsed)
+    if order_by is not None and order_by[0] not in names:
+        raise QuerySyntaxError(
+            f"ORDER BY {order_by[0]}: столбца нет в списке select"
+        )
+
+    condition = to_condition(where_clause)
+    groups = answer_from_indexes(
+        table_data, condition, group_by, aggregates, indexes
+    )
+    if groups is None:
+        positions = _matching_positions(
+            table_data, condition, plan_indexes(plan, indexes)
+        )
+        groups = hash_aggregate(table_data, positions, group_by, aggregates)
+    result = [
+        {
+            name: key[slot] if source == 'group' else values[slot]
+            for name, (source, slot) in zip(names, slots)
+        }
+        for key, values in groups.items()
+    ]
+    return _order_records(result, order_by, limit, offset)
+
+@handle_db_errors
+@log_time
+def aggregate(
+    table_data, select_items, where_clause=None, group_by=None, indexes=None,
+    plan=None, order_by=None, limit=None, offset=0,
+):
+    """Агрегатный запрос (см. compute_aggregate) с выводом ошибок и времени"""
+    return compute_aggregate(
+        table_data, select_items, where_clause, group_by, indexes, plan,
+        order_by, limit, offset,
+    )
+
+def apply_update(
+    table_data, set_clause, where_clause, indexes=None, journal=None, plan=None
+):
+    """Обновляет записи в табличных данных, возвращает их число.
+    Если передан journal, в него добавляются записи об изменённых строках"""
     updated_count = 0
-    for record in table_data:
-        match = True
-        for key, value in where_clause.items():
-            if record.get(key) != value:
-                match = False
-                break
-        
-        if match:
+    columnar = isinstance(table_data, ColumnarTable)
+    positions = _matching_positions(
+        table_data, where_clause, plan_indexes(plan, indexes)
+    )
+    for position in positions:
+        if columnar:
+            old_values = table_data.update_row(position, set_clause)
+            record = table_data[position]
+        else:
+            record = table_data[position]
+            old_values = {key: record.get(key) for key in set_clause}
             for key, value in set_clause.items():
                 record[key] = value
-            updated_count += 1
-    
+        update_in_indexes(indexes, position, old_values, record)
+        if journal is not None:
+            journal.append({'op': 'put', 'row': record})
+        updated_count += 1
+    return updated_count
+
+@handle_db_errors
+def update(
+    table_data, set_clause, where_clause, indexes=None, journal=None, plan=None
+):
+    """Обновляет записи в табличных данных.
+    Если передан journal, в него добавляются записи об изменённых строках"""
+    updated_count = apply_update(
+        table_data, set_clause, where_clause, indexes, journal, plan
+    )
     print(f"Обновлено записей: {updated_count}")
     return table_data
 
-@handle_db_errors
-@confirm_action("удаление данных")
-def delete(table_data, where_clause):
-    """Удаляет записи из табличных данных"""
+def apply_delete(table_data, where_clause, indexes=None, journal=None, plan=None):
+    """Удаляет записи из табличных данных.
+    Возвращает (новые данные таблицы, число удалённых записей).
+    Если передан journal, в него добавляются записи об удалённых строках"""
+    initial_count = len(table_data)
     if where_clause is None:
-        deleted_count = len(table_data)
+        doomed = range(initial_count)
         table_data.clear()
+        if journal is not None:
+            journal.append({'op': 'clear'})
     else:
-        initial_count = len(table_data)
-        table_data = [record for record in table_data if not all(
-            record.get(key) == value for key, value in where_clause.items()
-        )]
-        deleted_count = initial_count - len(table_data)
-    
+        doomed = set(_matching_positions(
+            table_data, where_clause, plan_indexes(plan, indexes)
+        ))
+        if journal is not None:
+            journal.extend(
+                {'op': 'del', 'id': table_data[position].get('id')}
+                for position in sorted(doomed)
+            )
+        if isinstance(table_data, ColumnarTable):
+            table_data = table_data.delete_positions(doomed)
+        else:
+            table_data = [
+                record for position, record in enumerate(table_data)
+                if position not in doomed
+            ]
+    deleted_count = initial_count - len(table_data)
+    if deleted_count:
+        remove_from_indexes(indexes, doomed, initial_count)
+    return table_data, deleted_count
+
+@handle_db_errors
+@confirm_action("удаление данных")
+def delete(table_data, where_clause, indexes=None, journal=None, plan=None):
+    """Удаляет записи из табличных данных.
+    Если передан journal, в него добавляются записи об удалённых строках"""
+    table_data, deleted_count = apply_delete(
+        table_data, where_clause, indexes, journal, plan
+    )
     print(f"Удалено записей: {deleted_count}")
     return table_data
 
+_BOOL_VALUES = {
+    'true': True, '1': True, 'yes': True, 'да': True,
+    'false': False, '0': False, 'no': False, 'нет': False,
+}
+
+def _convert_value(col_name, col_type, value):
+    """Приводит значение к типу столбца; ValidationError с описанием при ошибке"""
+    if col_type == 'bool':
+        if isinstance(value, str):
+            flag = _BOOL_VALUES.get(value.lower())
+            if flag is None:
+                raise ValidationError(
+                    f"Столбец '{col_name}': неверное булево значение '{value}'"
+                )
+            return flag
+        return bool(value)
+    converter = {'int': int, 'str': str}.get(col_type)
+    if converter is None:
+        raise ValidationError(f"Столбец '{col_name}': неизвестный тип '{col_type}'")
+    try:
+        return converter(value)
+    except (ValueError, TypeError):
+        raise ValidationError(
+            f"Столбец '{col_name}': ожидается тип '{col_type}', получено '{value}'"
+        ) from None
+
+def convert_set_clause(table_name, table_info, set_clause):
+    """Проверяет столбцы SET и приводит значения к их типам.
+    ColumnNotFoundError для неизвестного столбца, ValidationError для значения"""
+    column_types = dict(table_info['columns'])
+    unknown = [name for name in set_clause if name not in column_types]
+    if unknown:
+        raise ColumnNotFoundError(
+            f"Столбцы {unknown} не существуют в таблице '{table_name}'"
+        )
+    return {
+        name: _convert_value(name, column_types[name], value)
+        for name, value in set_clause.items()
+    }
+
+@handle_db_errors
+def prepare_update(metadata, table_name, set_clause):
+    """Проверенный SET для update (см. convert_set_clause) или None с выводом
+    ошибки"""
+    return convert_set_clause(
+        table_name, require_table(metadata, table_name), set_clause
+    )
+
+def _validate_values(columns, values):
+    """Проверяет значения одной строки (без id), возвращает (запись, ошибки)"""
+    record = {}
+    errors = []
+    for (col_name, col_type), value in zip(columns[1:], values):
+        try:
+            record[col_name] = _convert_value(col_name, col_type, value)
+        except ValueError as e:
+            errors.append(str(e))
+    return record, errors
+
+def _validate_batch(columns, rows):
+    """Проверяет пачку строк по столбцам: один конвертер на столбец.
+    Возвращает (корректные записи без id, [(номер строки, ошибка), ...])"""
+    errors = {}
+    expected = len(columns) - 1
+    for number, row in enumerate(rows):
+        if len(row) != expected:
+            errors[number] = f"Ожидается {expected} значений, получено {len(row)}"
+    converted = []
+    for offset, (col_name, col_type) in enumerate(columns[1:]):
+        column = []
+        for number, row in enumerate(rows):
+            if number in errors:
+                column.append(None)
+                continue
+            try:
+                column.append(_convert_value(col_name, col_type, row[offset]))
+            except ValueError as e:
+                errors[number] = str(e)
+                column.append(None)
+        converted.append(column)
+    names = [col_name for col_name, _ in columns[1:]]
+    records = [
+        {name: column[number] for name, column in zip(names, converted)}
+        for number in range(len(rows))
+        if number not in errors
+    ]
+    return records, sorted(errors.items())
+
+def append_records(table_name, table_info, records):
+    """Дописывает в таблицу проверенные записи без id под блокировкой таблицы.
+    Возвращает id первой добавленной записи"""
+    with table_lock(table_name):
+        table_data = load_table_data(table_name, table_info)
+        indexes = load_table_indexes(table_name, table_info, table_data)
+        first_id = _allocate_ids(table_name, table_info, table_data, len(records))
+        start = len(table_data)
+        records = [
+            {'id': first_id + offset, **record}
+            for offset, record in enumerate(records)
+        ]
+        for record in records:
+            table_data.append(record)
+        add_to_indexes(indexes, records, start)
+        journal = [{'op': 'put', 'row': record} for record in records]
+        save_table_data(table_name, table_data, table_info, journal)
+        save_table_indexes(table_name, indexes)
+    select_cacher.invalidate(table_name)
+    return first_id
+
+def _allocate_ids(table_name, table_info, table_data, count):
+    """Выделяет count идентификаторов из счётчика таблицы (см. allocate_ids).
+    Счётчик инициализируется по next_id из старых метаданных
+    или по максимальному id при первом обращении"""
+    def initial():
+        if isinstance(table_data, ColumnarTable):
+            max_id = max(table_data.column_values('id'), default=0)
+        else:
+            max_id = max((record.get('id', 0) for record in table_data), default=0)
+        return max(max_id + 1, table_info.get('next_id', 0))
+    return allocate_ids(table_name, count, initial)
+
 @handle_db_errors
 @log_time
 def insert(metadata, table_name, values):
     """Добавляет новую запись в таблицу"""
-    if 'tables' not in metadata or table_name not in metadata['tables']:
-        print(f"Ошибка: Таблица '{table_name}' не существует")
-        return None
-    
-    table_info = metadata['tables'][table_name]
+    table_info = require_table(metadata, table_name)
     columns = table_info['columns']
     
     expected_values_count = len(columns) - 1 
@@ -81,112 +623,395 @@ def insert(metadata, table_name, values):
         )
         return None
     
-    table_data = load_table_data(table_name)
-    
-    if table_data:
-        max_id = max(record.get('id', 0) for record in table_data)
-        new_id = max_id + 1
-    else:
-        new_id = 1
-    
-    new_record = {'id': new_id}
-    validation_errors = []
-    
-    for i, (col_name, col_type) in enumerate(columns[1:], start=0): 
-        value = values[i]
-        
-        try:
-            if col_type == 'int':
-                validated_value = int(value)
-            elif col_type == 'str':
-                validated_value = str(value)
-            elif col_type == 'bool':
-                if isinstance(value, bool):
-                    validated_value = value
-                elif isinstance(value, str):
-                    if value.lower() in ('true', '1', 'yes', 'да'):
-                        validated_value = True
-                    elif value.lower() in ('false', '0', 'no', 'нет'):
-                        validated_value = False
-                    else:
-                        validation_errors.append(
-                            f"Столбец '{col_name}': неверное булево значение '{value}'"
-                        )
-                        continue
-                else:
-                    validated_value = bool(value)
-            else:
-                validation_errors.append(
-                    f"Столбец '{col_name}': неизвестный тип '{col_type}'"
-                )
-                continue
-                
-            new_record[col_name] = validated_value
-            
-        except (ValueError, TypeError):
-            validation_errors.append(
-                f"Столбец '{col_name}': ожидается тип '{col_type}', получено '{value}'"
-            )
-    
+    new_record, validation_errors = _validate_values(columns, values)
     if validation_errors:
         print("Ошибки валидации данных:")
         for error in validation_errors:
             print(f"  - {error}")
         return None
     
-    table_data.append(new_record)
-    
-    save_table_data(table_name, table_data)
-    
+    new_id = append_records(table_name, table_info, [new_record])
     print(f"Запись успешно добавлена в таблицу '{table_name}' с ID={new_id}")
-    return table_data
+    return new_id
 
 @handle_db_errors
-def create_table(metadata, table_name, columns):
-    """Создает новую таблицу в метаданных"""
+def bulk_insert(metadata, table_name, rows, batch_size=BULK_BATCH_SIZE):
+    """Добавляет в таблицу поток строк пачками: проверка типов по столбцам,
+    id из счётчика таблицы, одна запись на диск на пачку.
+    Таблица заблокирована для других писателей на всё время загрузки.
+    Строка — список значений без id или словарь {столбец: значение}"""
+    table_info = require_table(metadata, table_name)
+    columns = table_info['columns']
+    names = [col_name for col_name, _ in columns[1:]]
+    started = time.perf_counter()
+    with table_lock(table_name):
+        table_data = load_table_data(table_name, table_info)
+        indexes = load_table_indexes(table_name, table_info, table_data)
+
+        inserted = rejected = 0
+        batch = []
+        rows = iter(rows)
+        while True:
+            batch.clear()
+            for row in rows:
+                if isinstance(row, dict):
+                    row = [row.get(name) for name in names]
+                batch.append(row)
+                if len(batch) >= batch_size:
+                    break
+            if not batch:
+                break
+            records, errors = _validate_batch(columns, batch)
+            for number, error in errors[:MAX_REPORTED_ERRORS]:
+                print(f"  - строка {inserted + rejected + number + 1}: {error}")
+            rejected += len(errors)
+            if not records:
+                continue
+            first_id = _allocate_ids(
+                table_name, table_info, table_data, len(records)
+            )
+            start = len(table_data)
+            records = [
+                {'id': first_id + offset, **record}
+                for offset, record in enumerate(records)
+            ]
+            for record in records:
+                table_data.append(record)
+            add_to_indexes(indexes, records, start)
+            journal = [{'op': 'put', 'row': record} for record in records]
+            save_table_data(table_name, table_data, table_info, journal)
+            inserted += len(records)
+
+        save_table_indexes(table_name, indexes)
+    select_cacher.invalidate(table_name)
+    elapsed = time.perf_counter() - started
+    rate = inserted / elapsed if elapsed else float(inserted)
+    print(
+        f"В таблицу '{table_name}' добавлено {inserted} записей "
+        f"(отклонено {rejected}) за {elapsed:.3f} с, {rate:.0f} строк/с"
+    )
+    return inserted
+
+@handle_db_errors
+def import_rows(metadata, table_name, filepath):
+    """Импортирует строки из CSV или JSONL файла потоково через bulk_insert"""
+    columns = require_table(metadata, table_name)['columns']
+    names = [col_name for col_name, _ in columns[1:]]
+    return bulk_insert(metadata, table_name, iter_import_rows(filepath, names))
+
+def define_table(metadata, table_name, columns):
+    """Добавляет описание новой таблицы в метаданные"""
     if 'tables' not in metadata:
         metadata['tables'] = {}
     if table_name in metadata['tables']:
-        print(f"Ошибка: Таблица '{table_name}' уже существует")
-        return metadata
-   
+        raise ValidationError(f"Таблица '{table_name}' уже существует")
+
     columns_with_id = [('id', 'int')]
     allowed_types = ['int', 'str', 'bool']
     for col_name, col_type in columns:
         if col_type not in allowed_types:
-            print(
-                f"Ошибка: Недопустимый тип '{col_type}' для столбца '{col_name}'. "
+            raise ValidationError(
+                f"Недопустимый тип '{col_type}' для столбца '{col_name}'. "
                 f"Разрешены: {allowed_types}"
             )
-            return metadata
         columns_with_id.append((col_name, col_type))
     metadata['tables'][table_name] = {
         'columns': columns_with_id
     }
+    return metadata
+
+@handle_db_errors
+def create_table(metadata, table_name, columns):
+    """Создает новую таблицу в метаданных"""
+    metadata = define_table(metadata, table_name, columns)
     print(f"Таблица '{table_name}' успешно создана")
     return metadata
 
+def remove_table(metadata, table_name):
+    """Удаляет таблицу из метаданных вместе с её файлами"""
+    table_info = require_table(metadata, table_name)
+    with table_lock(table_name):
+        remove_index_files(table_name, table_info.get('indexes', {}))
+        del metadata['tables'][table_name]
+        remove_table_files(table_name)
+    select_cacher.invalidate(table_name)
+    return metadata
+
 @handle_db_errors
 @confirm_action("удаление таблицы")
 def drop_table(metadata, table_name):
     """Удаляет таблицу из метаданных"""
-    if 'tables' not in metadata or table_name not in metadata['tables']:
-        print(f"Ошибка: Таблица '{table_name}' не существует")
-        return metadata
-    del metadata['tables'][table_name]
-    filepath = f"data/{table_name}.json"
-    if os.path.exists(filepath):
-        os.remove(filepath)
+    metadata = remove_table(metadata, table_name)
     print(f"Таблица '{table_name}' успешно удалена")
     return metadata
 
-def list_tables(metadata):
-    """Возвращает список всех таблиц"""
-    if not isinstance(metadata, dict):
-        return []
-    
-    tables = metadata.get('tables', {})
-    if not isinstance(tables, dict):
-        return []
-    
-    return list(tables.keys())
+def add_index(metadata, table_name, column, kind='hash'):
+    """Строит и сохраняет индекс по столбцу, отмечает его в метаданных"""
+    table_info = require_table(metadata, table_name)
+    column_types = dict(table_info['columns'])
+    if column not in column_types:
+        raise ColumnNotFoundError(
+            f"Столбец '{column}' не существует в таблице '{table_name}'"
+        )
+    if kind not in INDEX_KINDS:
+        raise ValidationError(
+            f"Недопустимый тип индекса '{kind}'. Разрешены: {INDEX_KINDS}"
+        )
+    if kind == 'sorted' and column_types[column] != 'int':
+        raise ValidationError("Сортированный индекс поддерживается только для int")
+
+    with table_lock(table_name):
+        table_data = load_table_data(table_name, table_info)
+        save_index(table_name, column, build_index(table_data, column, kind))
+    table_info.setdefault('indexes', {})[column] = kind
+    return metadata
+
+@handle_db_errors
+def create_index(metadata, table_name, column, kind='hash'):
+    """Создает персистентный индекс по столбцу таблицы"""
+    metadata = add_index(metadata, table_name, column, kind)
+    print(f"Индекс '{kind}' по столбцу '{column}' таблицы '{table_name}' создан")
+    return metadata
+
+def alter_columns(metadata, table_name, action, column, default=None):
+    """Добавляет (action='add', column=(имя, тип)) или удаляет (action='drop',
+    column=имя) столбец, меняя только метаданные — O(1) по числу строк.
+    Строки приводятся к новой схеме при чтении, файлы переписывает compact"""
+    table_info = require_table(metadata, table_name)
+    names = [col_name for col_name, _ in table_info['columns']]
+    pending = table_info.get('pending') or {'add': {}, 'drop': []}
+    if action == 'add':
+        col_name, col_type = column
+        allowed_types = ['int', 'str', 'bool']
+        if col_type not in allowed_types:
+            raise ValidationError(
+                f"Недопустимый тип '{col_type}' для столбца '{col_name}'. "
+                f"Разрешены: {allowed_types}"
+            )
+        if col_name in names:
+            raise ValidationError(
+                f"Столбец '{col_name}' уже существует в таблице '{table_name}'"
+            )
+        if col_name in pending['drop']:
+            raise ValidationError(
+                f"Удалённый столбец '{col_name}' ещё хранится в файлах таблицы: "
+                f"выполните compact {table_name}"
+            )
+        if default is not None:
+            default = _convert_value(col_name, col_type, default)
+    elif action == 'drop':
+        col_name = column
+        if col_name == 'id':
+            raise ValidationError("Столбец 'id' удалить нельзя")
+        if col_name not in names:
+            raise ColumnNotFoundError(
+                f"Столбец '{col_name}' не существует в таблице '{table_name}'"
+            )
+    else:
+        raise QuerySyntaxError(
+            f"Неизвестное действие '{action}': ожидается add или drop"
+        )
+
+    with table_lock(table_name):
+        if action == 'add':
+            table_info['columns'].append([col_name, col_type])
+            pending['add'][col_name] = default
+        else:
+            table_info['columns'] = [
+                item for item in table_info['columns'] if item[0] != col_name
+            ]
+            # столбец мог попасть в файлы при записи после add — убирается всегда
+            pending['add'].pop(col_name, None)
+            pending['drop'].append(col_name)
+            if col_name in table_info.get('indexes', {}):
+                remove_index_files(table_name, [col_name])
+                del table_info['indexes'][col_name]
+            table_info.get('stats', {}).get('columns', {}).pop(col_name, None)
+        table_info['pending'] = pending
+        table_info['schema_version'] = table_info.get('schema_version', 0) + 1
+    select_cacher.invalidate(table_name)
+    return metadata
+
+@handle_db_errors
+def alter_table(metadata, table_name, action, column, default=None):
+    """Добавляет или удаляет столбец таблицы без перезаписи её файлов"""
+    metadata = alter_columns(metadata, table_name, action, column, default)
+    if action == 'add':
+        print(f"Столбец '{column[0]}' добавлен в таблицу '{table_name}'")
+    else:
+        print(f"Столбец '{column}' удалён из таблицы '{table_name}'")
+    return metadata
+
+def rewrite_table(metadata, table_name):
+    """Переписывает файлы таблицы в текущей схеме и снимает отложенные
+    изменения alter_table; возвращает число записей"""
+    table_info = require_table(metadata, table_name)
+    with table_lock(table_name):
+        table_data = load_table_data(table_name, table_info)
+        if get_storage(table_info) == 'log':
+            compact_table(table_name, table_data, table_info)
+        else:
+            save_table_data(table_name, table_data, table_info)
+        table_info.pop('pending', None)
+    select_cacher.invalidate(table_name)
+    return len(table_data)
+
+@handle_db_errors
+def compact(metadata, table_name):
+    """Физически применяет изменения схемы и сжимает журнал таблицы"""
+    rows = rewrite_table(metadata, table_name)
+    print(f"Таблица '{table_name}' переписана: {rows} записей")
+    return metadata
+
+@handle_db_errors
+def analyze(metadata, table_name):
+    """Собирает статистику столбцов таблицы для планировщика запросов"""
+    table_info = require_table(metadata, table_name)
+    table_data = load_table_data(table_name, table_info)
+    table_info['stats'] = analyze_table(table_data, table_info['columns'])
+    print(
+        f"Статистика таблицы '{table_name}' обновлена: "
+        f"{table_info['stats']['rows']} записей"
+    )
+    return metadata
+
+@handle_db_errors
+def set_storage(metadata, table_name, storage):
+    """Переключает режим хранения таблицы: полный JSON или журнал + снимок"""
+    require_table(metadata, table_name)
+    if storage not in STORAGE_MODES:
+        print(
+            f"Ошибка: Недопустимый режим хранения '{storage}'. "
+            f"Разрешены: {STORAGE_MODES}"
+        )
+        return metadata
+    table_info = metadata['tables'][table_name]
+    with table_lock(table_name):
+        table_data = load_table_data(table_name, table_info)
+        remove_table_files(table_name, keep_sequence=True)
+        table_info['storage'] = storage
+        if storage == 'log':
+            compact_table(table_name, table_data, table_info)
+        else:
+            save_table_data(table_name, table_data, table_info)
+    select_cacher.invalidate(table_name)
+    print(f"Таблица '{table_name}' хранится в режиме '{get_storage(table_info)}'")
+    return metadata
+
+@handle_db_errors
+def set_engine(metadata, table_name, engine):
+    """Переключает представление таблицы в памяти: строки или колонки"""
+    require_table(metadata, table_name)
+    if engine not in ENGINES:
+        print(f"Ошибка: Недопустимый движок '{engine}'. Разрешены: {ENGINES}")
+        return metadata
+    table_info = metadata['tables'][table_name]
+    with table_lock(table_name):
+        table_data = load_table_data(table_name, table_info)
+        table_info['engine'] = engine
+        if engine == 'columnar':
+            table_data = ColumnarTable.from_records(table_info['columns'], table_data)
+        elif isinstance(table_data, ColumnarTable):
+            table_data = table_data.to_records()
+        save_table_data(table_name, table_data, table_info)
+    select_cacher.invalidate(table_name)
+    print(f"Таблица '{table_name}' использует движок '{get_engine(table_info)}'")
+    return metadata
+
+@handle_db_errors
+def set_compression(metadata, table_name, codec):
+    """Переключает сжатие снимка таблицы: без сжатия, zlib или lzma"""
+    table_info = require_table(metadata, table_name)
+    if codec not in CODECS:
+        print(f"Ошибка: Недопустимый кодек '{codec}'. Разрешены: {CODECS}")
+        return metadata
+    if get_storage(table_info) == 'binary':
+        raise ValidationError(
+            "Таблицы в режиме 'binary' читаются через mmap и не сжимаются"
+        )
+    filepath = table_filepath(table_name)
+    with table_lock(table_name):
+        table_data = load_table_data(table_name, table_info)
+        before = os.path.getsize(filepath) if os.path.exists(filepath) else 0
+        table_info['compression'] = codec
+        if get_storage(table_info) == 'log':
+            compact_table(table_name, table_data, table_info)
+        else:
+            save_table_data(table_name, table_data, table_info)
+        after = os.path.getsize(filepath)
+    print(
+        f"Таблица '{table_name}' хранится со сжатием "
+        f"'{get_compression(table_info)}': {before} -> {after} байт"
+    )
+    return metadata
+
+@handle_db_errors
+def backup(metadata_file, directory, codec='zlib'):
+    """Записывает резервную копию базы в каталог"""
+    started = time.perf_counter()
+    manifest = backup_database(metadata_file, directory, codec)
+    files = manifest['files'].values()
+    print(
+        f"Резервная копия записана в '{directory}': таблиц "
+        f"{len(manifest['tables'])}, файлов {len(files)}, "
+        f"{sum(info['size'] for info in files)} -> "
+        f"{sum(info['stored'] for info in files)} байт "
+        f"за {time.perf_counter() - started:.3f} с"
+    )
+    return manifest
+
+@handle_db_errors
+@confirm_action("восстановление базы из копии")
+def restore(metadata_file, directory):
+    """Заменяет базу резервной копией из каталога"""
+    manifest = restore_database(metadata_file, directory)
+    select_cacher.invalidate()
+    print(
+        f"База восстановлена из '{directory}' (копия от {manifest['created']}): "
+        f"таблиц {len(manifest['tables'])}, файлов {len(manifest['files'])}"
+    )
+    return manifest
+
+@handle_db_errors
+def export_json(metadata, table_name, filepath):
+    """Выгружает таблицу в JSON-файл (для миграции между режимами хранения)"""
+    table_data = load_table_data(table_name, require_table(metadata, table_name))
+    with open(filepath, 'w', encoding='utf-8') as file:
+        json.dump(list(table_data), file, ensure_ascii=False, indent=2)
+    print(f"Таблица '{table_name}' выгружена в '{filepath}': {len(table_data)} записей")
+    return filepath
+
+@handle_db_errors
+def import_json(metadata, table_name, filepath):
+    """Заменяет содержимое таблицы записями из JSON-файла"""
+    table_info = require_table(metadata, table_name)
+    with open(filepath, 'r', encoding='utf-8') as file:
+        records = json.load(file)
+    column_names = [name for name, _ in table_info['columns']]
+    for record in records:
+        missing = [name for name in column_names if name not in record]
+        if missing:
+            raise ValidationError(f"в записи {record} нет столбцов {missing}")
+    # типы проверяются как при bulk_insert; id в файле свой, поэтому
+    # проверяется вместе с остальными столбцами (первый элемент пропускается)
+    records, errors = _validate_batch(
+        [None, *table_info['columns']],
+        [[record[name] for name in column_names] for record in records],
+    )
+    if errors:
+        details = "; ".join(
+            f"запись {number + 1}: {error}"
+            for number, error in errors[:MAX_REPORTED_ERRORS]
+        )
+        raise ValidationError(
+            f"Файл '{filepath}' не загружен, ошибок: {len(errors)} ({details})"
+        )
+    if get_engine(table_info) == 'columnar':
+        records = ColumnarTable.from_records(table_info['columns'], records)
+    with table_lock(table_name):
+        save_table_data(table_name, records, table_info)
+        remove_index_files(table_name, table_info.get('indexes', {}))
+        remove_sequence(table_name)
+    select_cacher.invalidate(table_name)
+    print(f"В таблицу '{table_name}' загружено {len(records)} записей из '{filepath}'")
+    return records
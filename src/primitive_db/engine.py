@@ -1,20 +1,48 @@
-import shlex
+import time
+from contextlib import ExitStack
 
-from prettytable import PrettyTable
-
-from src.primitive_db.core import (
-    create_table,
-    delete,
-    drop_table,
-    insert,
+from .aggregates import parse_aggregate
+from .cache import table_cache
+from .indexes import load_table_indexes, save_table_indexes
+from .metrics import metrics
+from .parallel import configure_parallelism
+from .parser import clause_text, parse_limit_offset, parse_select
+from .planner import format_plan, plan_order, plan_query
+from .transaction import (
+    begin_transaction,
+    commit_transaction,
+    current_transaction,
+    rollback_transaction,
+)
+from .utils import (
+    METADATA_FILE,
     list_tables,
-    select,
-    update,
+    load_metadata,
+    load_table_data,
+    load_table_head,
+    metadata_lock,
+    save_metadata,
+    save_table_data,
+    table_lock,
 )
+from .where import parse_where, to_condition
 
-from .utils import load_metadata, load_table_data, save_metadata, save_table_data
-
-METADATA_FILE = "db_meta.json"
+PAGE_SIZE = 100
+# Команды, которые читают, меняют и сохраняют метаданные
+METADATA_COMMANDS = (
+    "create_table", "drop_table", "create_index", "analyze", "set_engine",
+    "set_storage", "alter_table", "compact", "set_compression", "backup", "restore",
+)
+# Команды, которые сразу меняют файлы на диске и не откатываются
+NON_TRANSACTIONAL_COMMANDS = (
+    "drop_table", "set_storage", "set_engine", "import_json", "alter_table",
+    "compact", "set_compression", "backup", "restore",
+)
+# Команды, которым не нужен core: он тянет за собой движки хранения,
+# соединения и агрегаты и импортируется при первой команде с таблицами
+CORE_FREE_COMMANDS = ("exit", "help", "begin", "commit", "list_tables")
+# Символы, при которых команду разбирает shlex; без них хватает str.split
+SHELL_QUOTES = frozenset("'\"\\")
 
 def parse_columns(column_args):
     """Парсит аргументы столбцов в формат [(name, type), ...]"""
@@ -30,37 +58,16 @@ def parse_columns(column_args):
 
 def parse_where_condition(where_str):
     """
-    Парсит условие WHERE в словарь
-    Пример: "age = 28" -> {'age': 28}, "name = 'John'" -> {'name': 'John'}
+    Парсит условие WHERE в дерево условия (см. where.py)
+    Пример: "age >= 18 AND name LIKE 'A%'",
+    "status IN ('new', 'open') OR NOT active = true"
     """
     if not where_str:
         return None
     
     try:
-        parts = where_str.split('=', 1)
-        if len(parts) != 2:
-            print("Ошибка: Неверный формат условия WHERE. Используйте: поле = значение")
-            return None
-        
-        field = parts[0].strip()
-        value = parts[1].strip()
-        
-        if (
-            (value.startswith("'") and value.endswith("'")) or 
-            (value.startswith('"') and value.endswith('"'))
-        ):
-
-            value = value[1:-1]  
-        else:
-            try:
-                value = int(value)
-            except ValueError:
-                if value.lower() in ('true', 'false'):
-                    value = value.lower() == 'true'
-        
-        return {field: value}
-    
-    except Exception as e:
+        return parse_where(where_str)
+    except ValueError as e:
         print(f"Ошибка парсинга условия WHERE: {e}")
         return None
 
@@ -105,22 +112,568 @@ def parse_set_clause(set_str):
         print(f"Ошибка парсинга SET clause: {e}")
         return None
 
-def display_table_data(data, table_name):
-    """Выводит данные таблицы в красивом формате с помощью PrettyTable"""
-    if not data:
+def store_metadata(metadata):
+    """Сохраняет метаданные после команды. None означает, что команда отменена
+    (например, не подтверждено удаление) или завершилась ошибкой"""
+    if metadata is not None:
+        save_metadata(METADATA_FILE, metadata)
+
+def get_table_info(metadata, table_name):
+    """Возвращает описание таблицы из метаданных или пустой словарь"""
+    return (metadata or {}).get('tables', {}).get(table_name, {})
+
+def display_metrics(snapshot):
+    """Выводит гистограммы задержек, счётчики и статистику кэшей"""
+    from prettytable import PrettyTable
+
+    if not snapshot['enabled']:
+        print("Метрики выключены (stats on — включить)")
+    table = PrettyTable()
+    table.field_names = ["метрика", "имя", "число", "p50, мс", "p95, мс", "p99, мс",
+                         "всего, с"]
+    for family, labels in snapshot['histograms'].items():
+        for label, data in labels.items():
+            table.add_row([
+                family, label, data['count'],
+                *(f"{data[key] * 1000:.3f}" for key in ('p50', 'p95', 'p99')),
+                f"{data['sum']:.3f}",
+            ])
+    if table.rows:
+        print(table)
+    counters = snapshot['counters']
+    print(
+        f"Строк просмотрено: {counters['rows_scanned']}, "
+        f"отобрано: {counters['rows_returned']}; "
+        f"прочитано байт: {counters['bytes_read']}, "
+        f"записано: {counters['bytes_written']}"
+    )
+    display_cache_stats(
+        snapshot['sources']['table_cache'], snapshot['sources']['select_cache']
+    )
+    profile = snapshot['profile']
+    if profile['rate']:
+        print(
+            f"Профилирование: доля {profile['rate']:g}, "
+            f"команд в профиле: {profile['statements']}"
+        )
+
+def stats_command(args):
+    """stats [reset | on | off | dump <файл> | profile <доля> | profile save <файл>]"""
+    action = args[0].lower() if args else None
+    if action is None:
+        display_metrics(metrics.snapshot())
+    elif action == "reset":
+        metrics.reset()
+        print("Метрики сброшены")
+    elif action in ("on", "off"):
+        metrics.enabled = action == "on"
+        print(f"Метрики {'включены' if metrics.enabled else 'выключены'}")
+    elif action == "dump" and len(args) == 2:
+        metrics.dump(args[1])
+        print(f"Метрики записаны в '{args[1]}'")
+    elif action == "profile" and len(args) == 3 and args[1].lower() == "save":
+        report = metrics.save_profile(args[2])
+        if report is None:
+            print("Профиль пуст: задайте долю командой stats profile <доля>")
+        else:
+            print(report)
+            print(f"Профиль записан в '{args[2]}'")
+    elif action == "profile" and len(args) == 2:
+        rate = float(args[1])
+        if not 0 <= rate <= 1:
+            raise ValueError("доля профилируемых команд — от 0 до 1")
+        metrics.profile_rate = rate
+        print(f"Профилируется доля команд: {rate:g}")
+    else:
+        print("Ошибка: Использование: stats [reset | on | off | dump <файл> | "
+              "profile <доля> | profile save <файл>]")
+
+def display_cache_stats(stats, query_stats):
+    """Выводит статистику кэша таблиц и кэша результатов select"""
+    print(
+        f"Кэш таблиц: записей {stats['entries']}, "
+        f"{stats['bytes'] / 1024 / 1024:.1f} из "
+        f"{stats['max_bytes'] / 1024 / 1024:.1f} МБ"
+    )
+    print(
+        f"Попаданий: {stats['hits']}, промахов: {stats['misses']}, "
+        f"вытеснений: {stats['evictions']}, hit rate: {stats['hit_rate']:.1%}"
+    )
+    print(
+        f"Кэш select: записей {query_stats['entries']}, "
+        f"попаданий: {query_stats['hits']}, промахов: {query_stats['misses']}, "
+        f"вытеснений: {query_stats['evictions']}, "
+        f"hit rate: {query_stats['hit_rate']:.1%}"
+    )
+
+def display_table_data(rows, table_name, page_size=PAGE_SIZE):
+    """Выводит данные таблицы в красивом формате с помощью PrettyTable
+    страницами по page_size строк: первая страница
+    появляется сразу, в памяти одновременно не больше одной страницы"""
+    # prettytable нужен только для вывода — не замедляет запуск CLI
+    from prettytable import PrettyTable
+
+    total = 0
+    page = []
+    rows = iter(rows)
+    while True:
+        page.clear()
+        for row in rows:
+            page.append(row)
+            if len(page) >= page_size:
+                break
+        if not page:
+            break
+        table = PrettyTable()
+        table.field_names = list(page[0].keys())
+        for row in page:
+            table.add_row([row.get(field) for field in table.field_names])
+        if total == 0:
+            print(f"\nТаблица: {table_name}")
+        print(table)
+        total += len(page)
+    if total == 0:
         print(f"Таблица '{table_name}' пуста")
         return
-    
-    table = PrettyTable()
-    
-    table.field_names = list(data[0].keys())
-    
-    for row in data:
-        table.add_row([row[field] for field in table.field_names])
-    
-    print(f"\nТаблица: {table_name}")
-    print(table)
-    print(f"Всего записей: {len(data)}")
+    print(f"Всего записей: {total}")
+
+def display_explain(plan, actual_rows, started):
+    """Выводит план запроса и фактический результат выполнения"""
+    elapsed = time.perf_counter() - started
+    print(format_plan(plan))
+    print(f"Фактически: строк {actual_rows}, время {elapsed * 1000:.3f} мс")
+
+def discard_transaction():
+    """Отменяет незавершённую транзакцию при выходе из программы"""
+    if current_transaction() is not None:
+        rollback_transaction()
+        print("Незавершённая транзакция отменена")
+
+def execute_statement(user_input):
+     """Выполняет одну команду; возвращает False, если нужно завершить работу.
+     Время команды попадает в метрики (и, выборочно, в профиль cProfile)"""
+     with metrics.statement(user_input.split(None, 1)[0].lower()):
+         return _execute_statement(user_input)
+
+def split_statement(user_input):
+    """Разбивает команду на аргументы; кавычки и экранирование — как в shell"""
+    if SHELL_QUOTES.isdisjoint(user_input):
+        return user_input.split()
+    import shlex
+    return shlex.split(user_input)
+
+def _execute_statement(user_input):
+     metadata = load_metadata(METADATA_FILE)
+
+     args = split_statement(user_input)
+     command = args[0].lower()
+     explain = command == "explain" and len(args) > 1
+     if explain:
+         user_input = user_input[len(args[0]):].strip()
+         args = args[1:]
+         command = args[0].lower()
+     if command not in CORE_FREE_COMMANDS:
+         from src.primitive_db import core
+     locks = ExitStack()
+     try:     
+         if command in METADATA_COMMANDS:
+             # изменение метаданных: берём блокировку и перечитываем их,
+             # чтобы не затереть изменения других процессов
+             locks.enter_context(metadata_lock(METADATA_FILE))
+             metadata = load_metadata(METADATA_FILE)
+         if command == "exit": 
+             discard_transaction()
+             print("Выход из программы...")
+             return False
+         elif command == "help":
+             print_help()
+         elif command == "begin":
+             begin_transaction()
+             print("Транзакция начата")
+         elif command == "commit":
+             written, elapsed = commit_transaction()
+             print(f"Транзакция зафиксирована: записано файлов {written} "
+                   f"за {elapsed:.3f} с")
+         elif command == "rollback":
+             rollback_transaction()
+             core.select_cacher.invalidate()
+             print("Транзакция отменена")
+         elif (
+             command in NON_TRANSACTIONAL_COMMANDS
+             and current_transaction() is not None
+         ):
+             print(f"Ошибка: команда {command} недоступна внутри транзакции")
+         elif command == "list_tables":               
+             tables = list_tables(metadata)
+             if tables:
+                 print("Таблицы в базе данных:")
+                 for table in tables:
+                     print(f"  - {table}")
+             else:
+                  print("В базе данных нет таблиц")    
+
+         elif command == "create_table":
+             if len(args) < 3:
+                 print("Ошибка: Использование: create_table <имя_таблицы>"
+                       "<столбец1:тип> [столбец2:тип ...]")
+             else:
+                 table_name = args[1]
+                 columns = parse_columns(args[2:])
+                 if columns:
+                     metadata = core.create_table(metadata, table_name, columns)
+                     store_metadata(metadata)
+         elif command == "drop_table":
+             if len(args) < 2:
+                 print("Ошибка: Использование: drop_table <имя_таблицы>")
+             else:
+                 table_name = args[1]
+                 metadata = core.drop_table(metadata, table_name)
+                 store_metadata(metadata)
+         elif command == "create_index":
+             if len(args) < 3:
+                 print("Ошибка: Использование: create_index <имя_таблицы>"
+                       " <столбец> [hash|sorted]")
+             else:
+                 kind = args[3].lower() if len(args) > 3 else 'hash'
+                 metadata = core.create_index(metadata, args[1], args[2], kind)
+                 store_metadata(metadata)
+         elif command == "alter_table":
+             action = args[2].lower() if len(args) > 3 else None
+             if action == "add" and len(args) in (4, 6) and (
+                 len(args) == 4 or args[4].lower() == "default"
+             ):
+                 column = parse_columns([args[3]])
+                 if column:
+                     default = args[5] if len(args) == 6 else None
+                     metadata = core.alter_table(
+                         metadata, args[1], action, column[0], default
+                     )
+                     store_metadata(metadata)
+             elif action == "drop" and len(args) == 4:
+                 metadata = core.alter_table(metadata, args[1], action, args[3])
+                 store_metadata(metadata)
+             else:
+                 print("Ошибка: Использование: alter_table <имя_таблицы> "
+                       "add <столбец:тип> [default <значение>] | "
+                       "drop <столбец>")
+         elif command == "compact":
+             if len(args) < 2:
+                 print("Ошибка: Использование: compact <имя_таблицы>")
+             else:
+                 metadata = core.compact(metadata, args[1])
+                 store_metadata(metadata)
+         elif command == "cache":
+             if len(args) > 2 and args[1].lower() == "limit":
+                 table_cache.resize(int(args[2]) * 1024 * 1024)
+             display_cache_stats(table_cache.stats(), core.select_cacher.stats())
+         elif command == "stats":
+             stats_command(args[1:])
+         elif command == "parallel":
+             if len(args) > 1:
+                 settings = configure_parallelism(
+                     int(args[1]), int(args[2]) if len(args) > 2 else None
+                 )
+             else:
+                 settings = configure_parallelism()
+             print(
+                 f"Параллельный просмотр: процессов {settings['workers']}, "
+                 f"от {settings['min_rows']} строк"
+             )
+         elif command in ("export_json", "import_json"):
+             if len(args) < 3:
+                 print(f"Ошибка: Использование: {command} <имя_таблицы> <файл>")
+             elif command == "export_json":
+                 core.export_json(metadata, args[1], args[2])
+             else:
+                 core.import_json(metadata, args[1], args[2])
+         elif command == "analyze":
+             if len(args) < 2:
+                 print("Ошибка: Использование: analyze <имя_таблицы>")
+             else:
+                 metadata = core.analyze(metadata, args[1])
+                 store_metadata(metadata)
+         elif command == "set_engine":
+             if len(args) < 3:
+                 print("Ошибка: Использование: set_engine <имя_таблицы> "
+                       "rows|columnar")
+             else:
+                 metadata = core.set_engine(metadata, args[1], args[2].lower())
+                 store_metadata(metadata)
+         elif command == "set_compression":
+             if len(args) < 3:
+                 print("Ошибка: Использование: set_compression <имя_таблицы> "
+                       "none|zlib|lzma")
+             else:
+                 metadata = core.set_compression(metadata, args[1], args[2].lower())
+                 store_metadata(metadata)
+         elif command == "backup":
+             if len(args) < 2:
+                 print("Ошибка: Использование: backup <каталог> [zlib|lzma]")
+             else:
+                 codec = args[2].lower() if len(args) > 2 else 'zlib'
+                 core.backup(METADATA_FILE, args[1], codec)
+         elif command == "restore":
+             # метаданные заменяет сама restore — store_metadata не нужен
+             if len(args) < 2:
+                 print("Ошибка: Использование: restore <каталог>")
+             else:
+                 core.restore(METADATA_FILE, args[1])
+         elif command == "set_storage":
+             if len(args) < 3:
+                 print("Ошибка: Использование: set_storage <имя_таблицы> "
+                       "json|log|binary")
+             else:
+                 metadata = core.set_storage(metadata, args[1], args[2].lower())
+                 store_metadata(metadata)
+
+
+         elif command == "insert":
+            if len(args) < 3:
+                print("Использование: insert <таблица> <значение> ...")
+            else:
+                table_name = args[1]
+                values = args[2:]
+                core.insert(metadata, table_name, values)
+         elif command == "import":
+            if len(args) < 3:
+                print("Использование: import <таблица> <файл.csv|файл.jsonl>")
+            else:
+                core.import_rows(metadata, args[1], args[2])
+         elif command == "select":
+            if len(args) < 2:
+                print("Использование: select [<столбцы> from] <таблица> "
+                      "[WHERE условие] [ORDER BY столбец [DESC]] "
+                      "[LIMIT n] [OFFSET m]")
+            else:
+                query = parse_select(user_input)
+                table_name = query['table']
+                columns, order_by = query['columns'], query['order_by']
+                where_clause = None
+                limit, offset = parse_limit_offset(user_input)
+                
+                if query['where'] is not None:
+                    where_clause = parse_where_condition(query['where'])
+                    if where_clause is None:
+                        print("Ошибка в WHERE")
+                        return True
+                
+                if query['join'] is not None:
+                    join_table, on = query['join']
+                    result = core.join_select(
+                        metadata, table_name, join_table, on, where_clause,
+                        columns, order_by, limit, offset
+                    )
+                    if result is not None:
+                        display_table_data(
+                            result, f"{table_name} JOIN {join_table}"
+                        )
+                    return True
+                group_by = query['group_by']
+                aggregates = [
+                    parse_aggregate(item) for item in columns or []
+                ]
+                aggregated = bool(group_by) or any(aggregates)
+                table_info = get_table_info(metadata, table_name)
+                known = [name for name, _ in table_info.get('columns', [])]
+                if aggregated:
+                    requested = group_by + [
+                        column for _, column in filter(None, aggregates)
+                        if column is not None
+                    ]
+                else:
+                    requested = list(columns or [])
+                    if order_by is not None:
+                        requested.append(order_by[0])
+                unknown = [name for name in requested if name not in known]
+                if table_info and unknown:
+                    print(f"Ошибка: Столбцы {unknown} не существуют "
+                          f"в таблице '{table_name}'")
+                    return True
+                if (
+                    limit is not None and where_clause is None
+                    and order_by is None and not aggregated and not explain
+                ):
+                    table_data = load_table_head(
+                        table_name, table_info, offset + limit
+                    )
+                    if table_data is not None:
+                        display_table_data(
+                            core.iter_select(
+                                table_data, limit=limit, offset=offset,
+                                columns=columns,
+                            ),
+                            table_name,
+                        )
+                    return True
+                table_data = load_table_data(table_name, table_info)
+                if table_data is not None:
+                    indexes = load_table_indexes(
+                        table_name, table_info, table_data
+                    )
+                    plan = plan_order(
+                        plan_query(
+                            to_condition(where_clause), indexes,
+                            table_info.get('stats'), len(table_data)
+                        ),
+                        order_by, indexes, limit,
+                    )
+                    plain = (
+                        columns is None and order_by is None
+                        and limit is None and not offset
+                    )
+                    started = time.perf_counter()
+                    if aggregated:
+                        result = core.aggregate(
+                            table_data, columns or group_by, where_clause,
+                            group_by, indexes, plan, order_by, limit, offset
+                        )
+                        if explain:
+                            display_explain(plan, len(result or []), started)
+                        elif result is not None:
+                            display_table_data(result, table_name)
+                    elif explain and plain:
+                        result = core.select(
+                            table_data, where_clause, indexes, table_name, plan
+                        )
+                        display_explain(plan, len(result or []), started)
+                    elif explain:
+                        rows = core.iter_select(
+                            table_data, where_clause, indexes, plan,
+                            limit, offset, columns, order_by
+                        )
+                        display_explain(plan, sum(1 for _ in rows), started)
+                    elif plain and where_clause is not None:
+                        display_table_data(
+                            core.iter_cached_select(
+                                table_data, where_clause, indexes, table_name,
+                                plan,
+                            ),
+                            table_name,
+                        )
+                    else:
+                        display_table_data(
+                            core.iter_select(
+                                table_data, where_clause, indexes, plan,
+                                limit, offset, columns, order_by
+                            ),
+                            table_name,
+                        )
+         elif command == "update":
+            if len(args) < 4:
+                print("Использование: update <таблица> SET"
+                      "<поле=значение> [WHERE условие]")
+            else:
+                table_name = args[1]
+                
+                set_index = -1
+                where_index = -1
+                
+                for i, arg in enumerate(args):
+                    if arg.upper() == "SET":
+                        set_index = i
+                    elif arg.upper() == "WHERE":
+                        where_index = i
+                
+                if set_index == -1:
+                    print("Ошибка: нет SET")
+                    return True
+                
+                set_str = clause_text(user_input, "set", "where")
+                where_str = (
+                    clause_text(user_input, "where")
+                    if where_index != -1 
+                    else None
+                )
+                set_clause = parse_set_clause(set_str)
+                where_clause = (
+                   parse_where_condition(where_str)
+                   if where_str 
+                   else None
+                )
+                if set_clause is None:
+                    print("Ошибка в SET")
+                    return True
+                if where_index != -1 and where_clause is None:
+                    print("Ошибка в WHERE")
+                    return True
+                set_clause = core.prepare_update(metadata, table_name, set_clause)
+                if set_clause is None:
+                    return True
+                
+                locks.enter_context(table_lock(table_name))
+                table_info = get_table_info(metadata, table_name)
+                table_data = load_table_data(table_name, table_info)
+                if table_data is not None:
+                    indexes = load_table_indexes(
+                        table_name, table_info, table_data
+                    )
+                    plan = plan_query(
+                        to_condition(where_clause), indexes,
+                        table_info.get('stats'), len(table_data)
+                    )
+                    started = time.perf_counter()
+                    journal = []
+                    result = core.update(
+                        table_data, set_clause, where_clause, indexes, journal,
+                        plan
+                    )
+                    if explain:
+                        display_explain(plan, len(journal), started)
+                    if result is not None:
+                        save_table_data(table_name, result, table_info, journal)
+                        save_table_indexes(table_name, indexes)
+                        core.select_cacher.invalidate(table_name)
+
+         elif command == "delete":
+            if len(args) < 2:
+                print("Использование: delete <таблица> [WHERE условие]")
+            else:
+                table_name = args[1]
+                where_clause = None
+                
+                if len(args) > 2:
+                    if args[2].lower() == "where" and len(args) > 3:
+                        where_str = clause_text(user_input, "where")
+                        where_clause = parse_where_condition(where_str)
+                    if where_clause is None:
+                        print("Ошибка в WHERE")
+                        return True
+                
+                locks.enter_context(table_lock(table_name))
+                table_info = get_table_info(metadata, table_name)
+                table_data = load_table_data(table_name, table_info)
+                if table_data is not None:
+                    indexes = load_table_indexes(
+                        table_name, table_info, table_data
+                    )
+                    plan = plan_query(
+                        to_condition(where_clause), indexes,
+                        table_info.get('stats'), len(table_data)
+                    )
+                    initial_count = len(table_data)
+                    started = time.perf_counter()
+                    journal = []
+                    result = core.delete(
+                        table_data, where_clause, indexes, journal, plan
+                    )
+                    if explain and result is not None:
+                        display_explain(plan, initial_count - len(result), started)
+                    if result is not None:
+                        save_table_data(table_name, result, table_info, journal)
+                        save_table_indexes(table_name, indexes)
+                        core.select_cacher.invalidate(table_name)
+
+
+
+
+         else:
+             print(f"Функции {command} нет. Попробуйте снова.")       
+     except ValueError as e:
+         print(f"Некорректное значение: {e}. Попробуйте снова.")
+     finally:
+         locks.close()
+     return True
+
 
 def run():
      """Главная функция с основным циклом программы"""
@@ -128,155 +681,79 @@ def run():
      print("Для справки введите 'help'")
 
      while True:
-         metadata = load_metadata(METADATA_FILE)
-
          try:
              user_input = input("db> ").strip()
          except (EOFError, KeyboardInterrupt):
+             discard_transaction()
              print("\nВыход из программы...")
              break
          if not user_input:
              continue
 
-         args = shlex.split(user_input)
-         command = args[0].lower()
-         try:     
-             if command == "exit": 
-                 print("Выход из программы...")
-                 break
-             elif command == "help":
-                 print_help()
-             elif command == "list_tables":               
-                 tables = list_tables(metadata)
-                 if tables:
-                     print("Таблицы в базе данных:")
-                     for table in tables:
-                         print(f"  - {table}")
-                 else:
-                      print("В базе данных нет таблиц")    
-
-             elif command == "create_table":
-                 if len(args) < 3:
-                     print("Ошибка: Использование: create_table <имя_таблицы>"
-                           "<столбец1:тип> [столбец2:тип ...]")
-                 else:
-                     table_name = args[1]
-                     columns = parse_columns(args[2:])
-                     if columns:
-                         metadata = create_table(metadata, table_name, columns)
-                         save_metadata(METADATA_FILE, metadata)
-             elif command == "drop_table":
-                 if len(args) < 2:
-                     print("Ошибка: Использование: drop_table <имя_таблицы>")
-                 else:
-                     table_name = args[1]
-                     metadata = drop_table(metadata, table_name)
-                     save_metadata(METADATA_FILE, metadata)
-
-
-             elif command == "insert":
-                if len(args) < 3:
-                    print("Использование: insert <таблица> <значение> ...")
-                else:
-                    table_name = args[1]
-                    values = args[2:]
-                    table_data = load_table_data(table_name)
-                    if table_data is not None:
-                        result = insert(metadata, table_name, values)
-                        if result:
-                            save_table_data(table_name, result)
-             elif command == "select":
-                if len(args) < 2:
-                    print("Использование: select <таблица> [WHERE условие]")
-                else:
-                    table_name = args[1]
-                    where_clause = None
-                    
-                    if len(args) > 2:
-                        if args[2].lower() == "where" and len(args) > 3:
-                            where_str = ' '.join(args[3:])
-                            where_clause = parse_where_condition(where_str)
-                        else:
-                            print("Ошибка в WHERE")
-                            continue
-                    
-                    table_data = load_table_data(table_name)
-                    if table_data is not None:
-                        result = select(table_data, where_clause)
-                        display_table_data(result, table_name) 
-             elif command == "update":
-                if len(args) < 4:
-                    print("Использование: update <таблица> SET"
-                          "<поле=значение> [WHERE условие]")
-                else:
-                    table_name = args[1]
-                    
-                    set_index = -1
-                    where_index = -1
-                    
-                    for i, arg in enumerate(args):
-                        if arg.upper() == "SET":
-                            set_index = i
-                        elif arg.upper() == "WHERE":
-                            where_index = i
-                    
-                    if set_index == -1:
-                        print("Ошибка: нет SET")
-                        continue
-                    
-                    set_str = ' '.join(
-                        args[set_index+1:where_index] 
-                        if where_index != -1 
-                        else args[set_index+1:]
-                    )
-                    where_str =(
-                        ' '.join(args[where_index+1:]) 
-                        if where_index != -1 
-                        else None
-                    )
-                    set_clause = parse_set_clause(set_str)
-                    where_clause = (
-                       parse_where_condition(where_str)
-                       if where_str 
-                       else None
-                    )
-                    if set_clause is None:
-                        print("Ошибка в SET")
-                        continue
-                    
-                    table_data = load_table_data(table_name)
-                    if table_data is not None:
-                        result = update(table_data, set_clause, where_clause)
-                        if result is not None:
-                            save_table_data(table_name, result)
-
-             elif command == "delete":
-                if len(args) < 2:
-                    print("Использование: delete <таблица> [WHERE условие]")
-                else:
-                    table_name = args[1]
-                    where_clause = None
-                    
-                    if len(args) > 2:
-                        if args[2].lower() == "where" and len(args) > 3:
-                            where_str = ' '.join(args[3:])
-                            where_clause = parse_where_condition(where_str)
-                        else:
-                            print("Ошибка в WHERE")
-                            continue
-                    
-                    table_data = load_table_data(table_name)
-                    if table_data is not None:
-                        result = delete(table_data, where_clause)
-                        save_table_data(table_name, result)
-
+         if not execute_statement(user_input):
+             break
 
+def run_statements(statements):
+    """Режим database -c: выполняет команды по очереди без приветствия
+    и справки; незавершённая транзакция в конце отменяется"""
+    for statement in statements:
+        statement = statement.strip().rstrip(';').strip()
+        if statement and not execute_statement(statement):
+            return
+    discard_transaction()
 
+def read_statements(lines):
+    """Команды скрипта с номерами строк: по одной команде на строку,
+    пустые строки и комментарии (-- или #) пропускаются, ';' в конце отбрасывается"""
+    for number, line in enumerate(lines, start=1):
+        statement = line.strip().rstrip(';').strip()
+        if statement and not statement.startswith(('--', '#')):
+            yield number, statement
 
-             else:
-                 print(f"Функции {command} нет. Попробуйте снова.")       
-         except ValueError as e:
-             print(f"Некорректное значение: {e}. Попробуйте снова.")
+def run_script(lines):
+    """
+    Выполняет команды скрипта без интерактивного ввода.
+    Все изменения копятся в одной транзакции: таблицы загружаются один раз
+    и пишутся на диск в конце (commit в скрипте фиксирует накопленное раньше,
+    rollback отменяет его). После каждой команды выводится её время
+    """
+    started = time.perf_counter()
+    executed = written = 0
+    begin_transaction()
+    try:
+        for number, statement in read_statements(lines):
+            command = statement.split(None, 1)[0].lower()
+            if command == "exit":
+                break
+            statement_started = time.perf_counter()
+            if command == "begin":
+                pass
+            elif command == "commit":
+                written += commit_transaction()[0]
+                begin_transaction()
+            elif command == "rollback":
+                from src.primitive_db.core import select_cacher
+                rollback_transaction()
+                select_cacher.invalidate()
+                begin_transaction()
+            elif command in NON_TRANSACTIONAL_COMMANDS:
+                written += commit_transaction()[0]
+                execute_statement(statement)
+                begin_transaction()
+            else:
+                execute_statement(statement)
+            executed += 1
+            elapsed = time.perf_counter() - statement_started
+            print(f"[{number}] {elapsed * 1000:.3f} мс: {statement}")
+    except BaseException:
+        if current_transaction() is not None:
+            rollback_transaction()
+        raise
+    written += commit_transaction()[0]
+    print(
+        f"Скрипт выполнен: команд {executed} за "
+        f"{time.perf_counter() - started:.3f} с, записано файлов {written}"
+    )
 
 def print_help():
     """Prints the help message for the current mode."""
@@ -286,13 +763,46 @@ def print_help():
     print("<command> create_table <имя_таблицы> <столбец1:тип> .. - создать таблицу")
     print("<command> list_tables - показать список всех таблиц")
     print("<command> drop_table <имя_таблицы> - удалить таблицу")
+    print("<command> create_index <имя_таблицы> <столбец> [hash|sorted] "
+          "- создать индекс")
+    print("<command> alter_table <имя_таблицы> add <столбец:тип> "
+          "[default <значение>] | drop <столбец> - изменить столбцы")
+    print("<command> compact <имя_таблицы> - переписать файлы таблицы "
+          "в текущей схеме")
+    print("<command> analyze <имя_таблицы> - собрать статистику для планировщика")
+    print("<command> explain <select|update|delete ...> - план и время запроса")
+    print("<command> cache [limit <МБ>] - статистика и лимит памяти кэша таблиц")
+    print("<command> stats [reset|on|off|dump <файл>|profile <доля>|"
+          "profile save <файл>] - метрики и профилирование")
+    print("<command> parallel [<процессов> [<мин_строк>]] - параллельный "
+          "просмотр колоночных таблиц")
+    print("<command> set_engine <имя_таблицы> rows|columnar - представление в памяти")
+    print("<command> set_storage <имя_таблицы> json|log|binary - режим хранения")
+    print("<command> set_compression <имя_таблицы> none|zlib|lzma - сжатие "
+          "снимка таблицы")
+    print("<command> backup <каталог> [zlib|lzma] | restore <каталог> - "
+          "резервная копия базы с контрольными суммами")
+    print("<command> export_json|import_json <имя_таблицы> <файл> - миграция данных")
+    print("<command> begin | commit | rollback - транзакция: изменения копятся "
+          "в памяти и пишутся на диск одним разом при commit")
     
+    print("\nЗапуск без диалога: database --script <файл> [--yes] "
+          "(или команды через stdin); --yes подтверждает опасные операции")
+    print("Сетевой сервер: database serve [--host H] [--port P] [--workers N]")
     print("\nОбщие команды:")
     print("<command> exit - выход из программы")
     print("<command> help - справочная информация\n")
  
     print("\n***CRUD операции***")
     print("insert <таблица> <значение> ...")
-    print("select <таблица> [WHERE условие]")
+    print("import <таблица> <файл.csv|файл.jsonl> - массовая загрузка")
+    print("select [<столбцы> from] <таблица> [WHERE условие] "
+          "[ORDER BY столбец [DESC]] [LIMIT n] [OFFSET m]")
+    print("select count(*), sum(с), min(с), max(с), avg(с) from <таблица> "
+          "[WHERE условие] [GROUP BY столбцы] - агрегаты")
+    print("select <столбцы> from <a> JOIN <b> ON a.x = b.y [WHERE условие] "
+          "- соединение таблиц")
     print("update <таблица> SET поле=значение [WHERE условие]")
     print("delete <таблица> [WHERE условие]")
+    print("Условие: = != < <= > >=, IN (...), BETWEEN a AND b, LIKE 'abc%', "
+          "AND/OR/NOT, скобки")
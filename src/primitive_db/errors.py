@@ -0,0 +1,30 @@
+class DatabaseError(ValueError):
+    """
+    Базовая ошибка базы данных. Наследуется от ValueError, поэтому
+    обработчики REPL (handle_db_errors, цикл команд) ловят её как раньше,
+    а встраиваемый API (api.py) отдаёт вызывающему коду
+    """
+
+
+class QuerySyntaxError(DatabaseError):
+    """Команда или условие WHERE не разобраны"""
+
+
+class TableNotFoundError(DatabaseError):
+    """Обращение к несуществующей таблице"""
+
+
+class ColumnNotFoundError(DatabaseError):
+    """Обращение к несуществующему столбцу"""
+
+
+class ValidationError(DatabaseError):
+    """Значения не подходят под схему таблицы"""
+
+
+class TransactionError(DatabaseError):
+    """Неверная последовательность begin/commit/rollback"""
+
+
+class LockTimeoutError(DatabaseError):
+    """Блокировка занята другим процессом дольше допустимого"""
@@ -0,0 +1,382 @@
+import bisect
+import json
+import os
+
+from .cache import file_signature, table_cache
+from .locks import is_locked
+from .transaction import atomic_write, current_transaction
+from .utils import table_lock_filepath, table_log_filepath, table_version
+from .where import RANGE_OPERATORS, to_condition
+
+INDEX_KINDS = ('hash', 'sorted')
+# С какой пачки новых строк sorted-индекс сливается сортировкой, а не вставкой
+# каждого ключа (list.insert сдвигает хвост списка — O(n) на ключ)
+SORTED_MERGE_MIN = 100
+
+
+def index_key(value):
+    """Ключ хэш-индекса — JSON-форма значения. bool приводится к int: в WHERE
+    и в хэш-соединении значения сравниваются через ==, а True == 1, поэтому
+    `ok = 1` по индексу должно находить те же строки, что и полный просмотр"""
+    if isinstance(value, bool):
+        value = int(value)
+    return json.dumps(value, ensure_ascii=False)
+
+
+def index_filepath(table_name, column):
+    """Путь к файлу индекса столбца в директории data/"""
+    return f"data/{table_name}.{column}.idx.json"
+
+
+def build_index(table_data, column, kind='hash'):
+    """Строит индекс столбца: хэш значение -> позиции, для sorted ещё и
+    отсортированные пары (значение, позиция)"""
+    hash_map = {}
+    for position, record in enumerate(table_data):
+        hash_map.setdefault(index_key(record.get(column)), []).append(position)
+    index = {'kind': kind, 'column': column, 'rows': len(table_data),
+             'hash': hash_map}
+    if kind == 'sorted':
+        pairs = sorted(
+            (record[column], position)
+            for position, record in enumerate(table_data)
+            if isinstance(record.get(column), int)
+        )
+        index['keys'] = [value for value, _ in pairs]
+        index['positions'] = [position for _, position in pairs]
+    return index
+
+
+def load_index(table_name, column):
+    """Загружает индекс из файла (или из кэша), None если файла нет"""
+    filepath = index_filepath(table_name, column)
+    key = ('index', table_name, column)
+    transaction = current_transaction()
+    if transaction is not None and transaction.get(key) is not None:
+        return transaction.get(key)
+    signature = file_signature(filepath)
+    index = table_cache.get(key, signature)
+    if index is not None:
+        return index
+    try:
+        with open(filepath, 'r', encoding='utf-8') as file:
+            index = json.load(file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    table_cache.put(key, signature, index)
+    return index
+
+
+def save_index(table_name, column, index, lazy=False):
+    """Сохраняет индекс в компактном JSON (внутри транзакции — при commit).
+    lazy: пока у таблицы режима log есть несжатый журнал, файл не переписывается,
+    индекс новой версии остаётся только в кэше процесса"""
+    transaction = current_transaction()
+    if transaction is not None:
+        transaction.stage(
+            ('index', table_name, column), index,
+            lambda: _write_index(table_name, column, index, lazy),
+        )
+        return
+    _write_index(table_name, column, index, lazy)
+
+
+def _write_index(table_name, column, index, lazy=False):
+    os.makedirs("data", exist_ok=True)
+    filepath = index_filepath(table_name, column)
+    key = ('index', table_name, column)
+    table_cache.invalidate(key)
+    # пишется после файлов таблицы и под её блокировкой: версия на диске —
+    # та, которой соответствует индекс
+    index['table'] = table_version(table_name)
+    if lazy and os.path.exists(table_log_filepath(table_name)):
+        # другие процессы дочитают добавленные строки из журнала (_replay_appends);
+        # файл переписывается при сжатии журнала в снимок
+        table_cache.put(key, file_signature(filepath), index)
+        return
+    # json.dumps целиком идёт через C-кодировщик, json.dump в файл — нет
+    text = json.dumps(index, ensure_ascii=False, separators=(',', ':'))
+    with atomic_write(filepath) as file:
+        file.write(text)
+    table_cache.put(key, file_signature(filepath), index)
+
+
+def remove_index_files(table_name, columns):
+    """Удаляет файлы индексов таблицы"""
+    for column in columns:
+        table_cache.invalidate(('index', table_name, column))
+        filepath = index_filepath(table_name, column)
+        if os.path.exists(filepath):
+            os.remove(filepath)
+
+
+def _replay_appends(table_name, table_data, index, version):
+    """Доводит индекс до версии таблицы version, если с его версии в журнал
+    только дописывались новые строки: строка журнала с новым id идёт в конец
+    таблицы, поэтому её позиция известна. False — если журнал с тех пор сжат
+    или в нём есть изменения и удаления строк (индекс надо перестроить)"""
+    written = index.get('table')
+    if not written or version is None or version[1] is None:
+        return False
+    if written[0] != version[0] or written[2] != version[2]:
+        return False
+    start = written[1][1] if written[1] is not None else 0
+    end = version[1][1]
+    try:
+        with open(table_log_filepath(table_name), 'rb') as file:
+            file.seek(start)
+            tail = file.read(end - start)
+    except (FileNotFoundError, ValueError):
+        return False
+    if len(tail) != end - start:
+        return False
+    records = []
+    position = index['rows']
+    for line in tail.splitlines():
+        try:
+            entry = json.loads(line)
+        except json.JSONDecodeError:
+            return False
+        if (
+            entry.get('op') != 'put'
+            or position + len(records) >= len(table_data)
+            or table_data[position + len(records)].get('id') != entry['row'].get('id')
+        ):
+            return False
+        records.append(table_data[position + len(records)])
+    if position + len(records) != len(table_data):
+        return False
+    add_to_indexes({index['column']: index}, records, position)
+    index['table'] = version
+    return True
+
+
+def load_table_indexes(table_name, table_info, table_data):
+    """Загружает все индексы таблицы; устаревшие или отсутствующие перестраивает.
+    Индекс актуален, если записан для той же версии файлов таблицы, из которой
+    прочитаны table_data (см. table_version): число строк не меняется при
+    update, а таблица и индексы записываются на диск не одновременно.
+    Строки, с тех пор только дописанные в журнал, добавляются в индекс без
+    перестройки. Перестроенный индекс записывается на диск, только если процесс
+    держит блокировку таблицы (писатель); читатель строит его лишь в памяти"""
+    owner = is_locked(table_lock_filepath(table_name))
+    version = table_version(table_name, table_data)
+    transaction = current_transaction()
+    indexes = {}
+    for column, kind in (table_info or {}).get('indexes', {}).items():
+        key = ('index', table_name, column)
+        if transaction is not None and transaction.get(key) is not None:
+            # изменён в этой же транзакции вместе с таблицей
+            indexes[column] = transaction.get(key)
+            continue
+        index = load_index(table_name, column)
+        if index is not None and version is not None and index.get('table') == version:
+            indexes[column] = index
+            continue
+        signature = file_signature(index_filepath(table_name, column))
+        if index is not None and _replay_appends(
+            table_name, table_data, index, version
+        ):
+            table_cache.put(key, signature, index)
+        else:
+            index = build_index(table_data, column, kind)
+            if owner:
+                save_index(table_name, column, index)
+            elif version is not None:
+                index['table'] = version
+                table_cache.put(key, signature, index)
+        indexes[column] = index
+    return indexes
+
+
+def save_table_indexes(table_name, indexes):
+    """Сохраняет индексы таблицы после записи её данных: каждый индекс,
+    даже не изменённый, получает новую версию таблицы. В режиме log, пока
+    журнал не сжат в снимок, файлы индексов не переписываются (см. save_index)"""
+    for column, index in (indexes or {}).items():
+        save_index(table_name, column, index, lazy=True)
+
+
+def remove_from_indexes(indexes, positions, row_count):
+    """Убирает из индексов удалённые строки и сдвигает позиции остальных на месте,
+    не читая записи таблицы и не сортируя ключи заново: сдвиг монотонный,
+    поэтому порядок sorted-индекса сохраняется. row_count — число строк до удаления"""
+    doomed = set(positions)
+    if not indexes or not doomed:
+        return
+    first = min(doomed)
+    # новые позиции строк от first до конца; None — строка удалена
+    mapping = []
+    shift = 0
+    for position in range(first, row_count):
+        if position in doomed:
+            shift += 1
+            mapping.append(None)
+        else:
+            mapping.append(position - shift)
+
+    for index in indexes.values():
+        index.pop('table', None)
+        hash_map = index['hash']
+        emptied = []
+        # списки позиций меняются на месте; у уникальных значений они
+        # из одного элемента — без создания нового списка
+        for key, bucket in hash_map.items():
+            if len(bucket) == 1:
+                if bucket[0] >= first:
+                    position = mapping[bucket[0] - first]
+                    if position is None:
+                        emptied.append(key)
+                    else:
+                        bucket[0] = position
+                continue
+            bucket[:] = [
+                position if position < first else mapping[position - first]
+                for position in bucket
+            ]
+            if None in bucket:
+                bucket[:] = [position for position in bucket if position is not None]
+                if not bucket:
+                    emptied.append(key)
+        for key in emptied:
+            del hash_map[key]
+        if index['kind'] == 'sorted':
+            pairs = [
+                (value, position if position < first else mapping[position - first])
+                for value, position in zip(index['keys'], index['positions'])
+            ]
+            index['keys'] = [value for value, new in pairs if new is not None]
+            index['positions'] = [new for _, new in pairs if new is not None]
+        index['rows'] = row_count - len(doomed)
+
+
+def lookup(index, value):
+    """Позиции строк с заданным значением столбца за O(1)"""
+    return index['hash'].get(index_key(value), [])
+
+
+def range_lookup(index, low=None, high=None, include_low=True, include_high=True):
+    """Позиции строк с low <= значение <= high по sorted-индексу за O(log n + k)"""
+    keys = index['keys']
+    if low is None:
+        start = 0
+    elif include_low:
+        start = bisect.bisect_left(keys, low)
+    else:
+        start = bisect.bisect_right(keys, low)
+    if high is None:
+        end = len(keys)
+    elif include_high:
+        end = bisect.bisect_right(keys, high)
+    else:
+        end = bisect.bisect_left(keys, high)
+    return index['positions'][start:end]
+
+
+def _add_entry(index, value, position):
+    index['hash'].setdefault(index_key(value), []).append(position)
+    if index['kind'] == 'sorted' and isinstance(value, int):
+        slot = bisect.bisect_right(index['keys'], value)
+        index['keys'].insert(slot, value)
+        index['positions'].insert(slot, position)
+
+
+def _remove_entry(index, value, position):
+    key = index_key(value)
+    positions = index['hash'].get(key, [])
+    if position in positions:
+        positions.remove(position)
+        if not positions:
+            del index['hash'][key]
+    if index['kind'] == 'sorted' and isinstance(value, int):
+        start = bisect.bisect_left(index['keys'], value)
+        end = bisect.bisect_right(index['keys'], value)
+        for slot in range(start, end):
+            if index['positions'][slot] == position:
+                del index['keys'][slot]
+                del index['positions'][slot]
+                break
+
+
+def add_to_indexes(indexes, records, start):
+    """Добавляет во все индексы новые строки records с позиций start, start + 1...
+    Большую пачку sorted-индекс вливает одной сортировкой: timsort сливает
+    два упорядоченных куска за O(n)"""
+    for column, index in (indexes or {}).items():
+        # изменённый индекс не соответствует ни одной версии таблицы на диске,
+        # пока не сохранён (save_table_indexes)
+        index.pop('table', None)
+        if index['kind'] != 'sorted' or len(records) < SORTED_MERGE_MIN:
+            for offset, record in enumerate(records):
+                _add_entry(index, record.get(column), start + offset)
+        else:
+            hash_map = index['hash']
+            pairs = list(zip(index['keys'], index['positions']))
+            for position, record in enumerate(records, start):
+                value = record.get(column)
+                hash_map.setdefault(index_key(value), []).append(position)
+                if isinstance(value, int):
+                    pairs.append((value, position))
+            pairs.sort()
+            index['keys'] = [value for value, _ in pairs]
+            index['positions'] = [position for _, position in pairs]
+        index['rows'] += len(records)
+
+
+def update_in_indexes(indexes, position, old_values, record):
+    """Переносит строку в индексах после изменения значений столбцов"""
+    for column, index in (indexes or {}).items():
+        if column in old_values and old_values[column] != record.get(column):
+            index.pop('table', None)
+            _remove_entry(index, old_values[column], position)
+            _add_entry(index, record.get(column), position)
+
+
+def _node_candidates(indexes, node):
+    kind = node[0]
+    if kind == 'and':
+        best = None
+        for child in node[1]:
+            positions = _node_candidates(indexes, child)
+            if positions is not None and (best is None or len(positions) < len(best)):
+                best = positions
+        return best
+    if kind == 'or':
+        union = set()
+        for child in node[1]:
+            positions = _node_candidates(indexes, child)
+            if positions is None:
+                return None
+            union.update(positions)
+        return list(union)
+    if kind == 'not':
+        return None
+    field = node[2] if kind == 'cmp' else node[1]
+    index = indexes.get(field)
+    if index is None:
+        return None
+    if kind == 'cmp' and node[1] == '=':
+        return lookup(index, node[3])
+    if kind == 'in':
+        return [position for value in node[2] for position in lookup(index, value)]
+    if index['kind'] != 'sorted':
+        return None
+    if kind == 'between' and isinstance(node[2], int) and isinstance(node[3], int):
+        return range_lookup(index, node[2], node[3])
+    if kind == 'cmp' and node[1] in RANGE_OPERATORS and isinstance(node[3], int):
+        op, value = node[1], node[3]
+        if op in ('<', '<='):
+            return range_lookup(index, high=value, include_high=op == '<=')
+        return range_lookup(index, low=value, include_low=op == '>=')
+    return None
+
+
+def find_candidates(indexes, where_clause):
+    """Возвращает позиции-кандидаты по индексам для условия WHERE
+    (равенства и IN — по хэш-индексу, диапазоны — по sorted-индексу)
+    или None, если подходящего индекса нет"""
+    condition = to_condition(where_clause)
+    if not indexes or condition is None:
+        return None
+    positions = _node_candidates(indexes, condition)
+    return None if positions is None else sorted(set(positions))
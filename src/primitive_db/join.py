@@ -0,0 +1,124 @@
+from .columnar import column_reader
+from .errors import ColumnNotFoundError
+from .indexes import lookup
+from .where import condition_fields, rename_fields
+
+
+def resolve_field(field, tables):
+    """
+    Находит таблицу столбца: 'users.age' -> ('users', 'age'); имя без
+    таблицы допускается, если столбец есть только в одной из таблиц.
+    tables — словарь {таблица: [столбцы]}
+    """
+    if '.' in field:
+        table_name, column = field.split('.', 1)
+        if column in tables.get(table_name, ()):
+            return table_name, column
+        raise ColumnNotFoundError(f"столбец '{field}' не существует")
+    owners = [name for name, columns in tables.items() if field in columns]
+    if len(owners) != 1:
+        problem = "неоднозначен" if owners else "не существует"
+        raise ColumnNotFoundError(f"столбец '{field}' {problem}")
+    return owners[0], field
+
+
+def split_condition(condition, tables):
+    """
+    Разбивает WHERE соединения на части, которые можно проверить до
+    соединения (по одной на таблицу, с именами столбцов без таблицы),
+    и остаток, проверяемый на соединённых строках ('таблица.столбец').
+    Возвращает ({таблица: условие}, остаток или None)
+    """
+    if condition is None:
+        return {}, None
+    terms = condition[1] if condition[0] == 'and' else (condition,)
+    pushed = {}
+    residual = []
+    for term in terms:
+        owners = {
+            resolve_field(field, tables)[0] for field in condition_fields(term)
+        }
+        if len(owners) == 1:
+            owner = owners.pop()
+            pushed.setdefault(owner, []).append(
+                rename_fields(term, lambda field: resolve_field(field, tables)[1])
+            )
+        else:
+            residual.append(rename_fields(
+                term, lambda field: '.'.join(resolve_field(field, tables))
+            ))
+
+    def combine(nodes):
+        return nodes[0] if len(nodes) == 1 else ('and', tuple(nodes))
+
+    return (
+        {owner: combine(nodes) for owner, nodes in pushed.items()},
+        combine(residual) if residual else None,
+    )
+
+
+def _probe_index(probe_data, probe_positions, probe_key, index, allowed):
+    """Пары (позиция probe, позиция в индексированной таблице)"""
+    read = column_reader(probe_data, probe_key)
+    for position in probe_positions:
+        value = read(position)
+        if value is None:
+            continue
+        for match in lookup(index, value):
+            if allowed is None or match in allowed:
+                yield position, match
+
+
+def _probe_table(probe_data, probe_positions, probe_key, build):
+    read = column_reader(probe_data, probe_key)
+    for position in probe_positions:
+        value = read(position)
+        if value is None:
+            continue
+        for match in build.get(value, ()):
+            yield position, match
+
+
+def join_pairs(left, right):
+    """
+    Хэш-соединение по равенству ключей. left и right — словари
+    {'data', 'key', 'positions', 'index'}: positions — позиции строк после
+    фильтра WHERE (None — все строки), index — хэш-индекс по ключу или None.
+    Если у одной из сторон есть индекс по ключу, он служит готовой
+    хэш-таблицей; иначе хэш-таблица строится по меньшей стороне. Ключи
+    в обоих случаях сравниваются как == (True == 1): ключ индекса приводит
+    bool к int (index_key).
+    Возвращает итератор пар (позиция слева, позиция справа)
+    """
+    def size(side):
+        positions = side['positions']
+        return len(side['data']) if positions is None else len(positions)
+
+    def all_positions(side):
+        positions = side['positions']
+        return range(len(side['data'])) if positions is None else positions
+
+    indexed = [side for side in (left, right) if side['index'] is not None]
+    if indexed:
+        build = min(indexed, key=size)
+    else:
+        build = min((left, right), key=size)
+    probe = right if build is left else left
+
+    if build['index'] is not None:
+        allowed = None if build['positions'] is None else set(build['positions'])
+        pairs = _probe_index(
+            probe['data'], all_positions(probe), probe['key'], build['index'],
+            allowed,
+        )
+    else:
+        table = {}
+        read = column_reader(build['data'], build['key'])
+        for position in all_positions(build):
+            value = read(position)
+            if value is not None:
+                table.setdefault(value, []).append(position)
+        pairs = _probe_table(probe['data'], all_positions(probe), probe['key'], table)
+    if probe is left:
+        return pairs
+    return ((left_position, right_position) for right_position, left_position in pairs)
@@ -0,0 +1,54 @@
+import fcntl
+import os
+import time
+
+from .errors import LockTimeoutError
+
+LOCK_TIMEOUT = float(os.environ.get('PRIMITIVE_DB_LOCK_TIMEOUT', '10'))
+LOCK_POLL_INTERVAL = 0.005
+
+# Блокировки, удерживаемые процессом: путь -> [дескриптор, счётчик входов]
+_held = {}
+
+
+def acquire_lock(lock_path, timeout=LOCK_TIMEOUT):
+    """
+    Берёт монопольную межпроцессную блокировку (fcntl.flock) на файл lock_path.
+    Повторный вход в том же процессе только увеличивает счётчик.
+    Если блокировку не удалось получить за timeout секунд — LockTimeoutError
+    (так же разрешаются взаимные ожидания двух транзакций)
+    """
+    entry = _held.get(lock_path)
+    if entry is not None:
+        entry[1] += 1
+        return
+    os.makedirs(os.path.dirname(lock_path) or '.', exist_ok=True)
+    descriptor = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            fcntl.flock(descriptor, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            break
+        except BlockingIOError:
+            if time.monotonic() >= deadline:
+                os.close(descriptor)
+                raise LockTimeoutError(
+                    f"'{lock_path}' занят другим процессом дольше {timeout:g} с"
+                ) from None
+            time.sleep(LOCK_POLL_INTERVAL)
+    _held[lock_path] = [descriptor, 1]
+
+
+def release_lock(lock_path):
+    """Снимает блокировку, когда из неё вышли столько же раз, сколько вошли"""
+    entry = _held[lock_path]
+    entry[1] -= 1
+    if entry[1] == 0:
+        del _held[lock_path]
+        fcntl.flock(entry[0], fcntl.LOCK_UN)
+        os.close(entry[0])
+
+
+def is_locked(lock_path):
+    """Удерживает ли текущий процесс блокировку"""
+    return lock_path in _held
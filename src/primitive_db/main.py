@@ -1,10 +1,86 @@
 #!/usr/bin/env python3
-from src.primitive_db.engine import run
+import argparse
+import sys
+
+# engine, server и замеры импортируются по необходимости: запуск
+# `database -c ...` не платит за asyncio, prettytable и пул процессов
+
+
+def parse_args(argv=None):
+    """Аргументы командной строки"""
+    parser = argparse.ArgumentParser(prog="database", description="Primitive DB")
+    parser.add_argument(
+        "command", nargs="?", choices=("serve", "bench"),
+        help="serve — запустить сетевой сервер вместо диалога; "
+             "bench — замеры CRUD-операций (database bench -h)",
+    )
+    parser.add_argument(
+        "-c", dest="statements", action="append", metavar="КОМАНДА",
+        help="выполнить команду и выйти (можно указать несколько раз)",
+    )
+    parser.add_argument("--host", help="адрес сервера (по умолчанию 127.0.0.1)")
+    parser.add_argument("--port", type=int, help="порт сервера (по умолчанию 5455)")
+    parser.add_argument(
+        "--workers", type=int,
+        help="потоков для чтения и записи файлов на сервере",
+    )
+    parser.add_argument(
+        "--script", metavar="ФАЙЛ",
+        help="выполнить команды из файла ('-' — из stdin) без диалога",
+    )
+    parser.add_argument(
+        "--yes", "-y", action="store_true",
+        help="подтверждать опасные операции (drop_table, delete) без вопроса",
+    )
+    return parser.parse_args(argv)
+
+
+def serve(args):
+    from src.primitive_db.server import (
+        DEFAULT_HOST,
+        DEFAULT_PORT,
+        DEFAULT_WORKERS,
+        run_server,
+    )
+
+    run_server(
+        args.host or DEFAULT_HOST,
+        DEFAULT_PORT if args.port is None else args.port,
+        args.workers or DEFAULT_WORKERS,
+    )
 
 
 def main():
     """Основная функция, запускающая приложение"""
-    run()
-        
+    if sys.argv[1:2] == ["bench"]:
+        # у замеров свои аргументы, разбираются в benchmarks/crud.py
+        from benchmarks.crud import main as bench
+        bench(sys.argv[2:])
+        return
+    args = parse_args()
+    if args.command == "serve":
+        serve(args)
+        return
+
+    from src.decorators import confirm_action
+    from src.primitive_db.engine import run, run_script, run_statements
+
+    if args.yes:
+        confirm_action.answer = True
+    if args.statements:
+        if confirm_action.answer is None and not sys.stdin.isatty():
+            confirm_action.answer = False
+        run_statements(args.statements)
+    elif args.script is None and sys.stdin.isatty():
+        run()
+    elif args.script in (None, '-'):
+        if confirm_action.answer is None:
+            # stdin занят командами — спросить подтверждение не у кого
+            confirm_action.answer = False
+        run_script(sys.stdin)
+    else:
+        with open(args.script, 'r', encoding='utf-8') as file:
+            run_script(file)
+
 if __name__ == "__main__":
    main()
@@ -0,0 +1,293 @@
+"""
+Метрики производительности: гистограммы задержек, счётчики строк и байтов.
+
+    statement   время команды (REPL, скрипт, api.Connection, сервер)
+    operation   время функций core под @log_time (select, insert, ...)
+    json_decode чтение и разбор JSON-файлов таблицы
+    rows_scanned / rows_returned   строки, просмотренные и отобранные условием
+    bytes_read / bytes_written     объём прочитанных и записанных файлов таблиц
+
+Гистограммы — с фиксированными корзинами, как в Prometheus: запись значения —
+поиск корзины и два сложения. По умолчанию метрики выключены, и все вызовы
+сводятся к проверке флага enabled; включаются PRIMITIVE_DB_METRICS=1 или stats on.
+Статистика кэшей не дублируется: её отдают зарегистрированные источники.
+Выборочный cProfile: доля команд PRIMITIVE_DB_PROFILE_RATE (0 — выключен)
+выполняется под профилировщиком, профили суммируются. cProfile, pstats
+и random импортируются только при включённом профилировании.
+"""
+import io
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Верхние границы корзин гистограмм, секунды
+BUCKETS = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+    0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+# Семейство гистограмм -> имя метки в формате Prometheus
+HISTOGRAMS = {'statement': 'command', 'operation': 'operation', 'json_decode': 'table'}
+COUNTERS = ('rows_scanned', 'rows_returned', 'bytes_read', 'bytes_written')
+PREFIX = 'primitive_db'
+
+
+class Histogram:
+    """Распределение значений по корзинам BUCKETS (последняя — +Inf)"""
+
+    __slots__ = ('buckets', 'count', 'total')
+
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value):
+        self.buckets[bisect_left(BUCKETS, value)] += 1
+        self.count += 1
+        self.total += value
+
+    def quantile(self, fraction):
+        """Оценка квантиля: линейная интерполяция внутри корзины"""
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for index, amount in enumerate(self.buckets):
+            if amount and seen + amount >= rank:
+                lower = BUCKETS[index - 1] if index else 0.0
+                if index == len(BUCKETS):
+                    return lower
+                return lower + (BUCKETS[index] - lower) * (rank - seen) / amount
+            seen += amount
+        return BUCKETS[-1]
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'sum': self.total,
+            'p50': self.quantile(0.5),
+            'p95': self.quantile(0.95),
+            'p99': self.quantile(0.99),
+        }
+
+
+class _Counted:
+    """Итератор-обёртка: число выданных элементов добавляется к счётчикам
+    при исчерпании или при сборке мусора (LIMIT останавливает чтение раньше)"""
+
+    __slots__ = ('_iterator', '_names', '_metrics', '_seen')
+
+    def __init__(self, iterable, names, metrics):
+        self._iterator = iter(iterable)
+        self._names = names
+        self._metrics = metrics
+        self._seen = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            item = next(self._iterator)
+        except StopIteration:
+            self._flush()
+            raise
+        self._seen += 1
+        return item
+
+    def _flush(self):
+        for name in self._names:
+            self._metrics.add(name, self._seen)
+        self._seen = 0
+
+    def __del__(self):
+        if self._seen:
+            self._flush()
+
+
+class Metrics:
+    """Реестр метрик процесса; потокобезопасен (сервер пишет из пула потоков)"""
+
+    def __init__(self, enabled=False, profile_rate=0.0):
+        self.enabled = enabled
+        self.profile_rate = profile_rate
+        self._lock = threading.Lock()
+        self._profiling = threading.Lock()
+        self._sources = {}
+        self.reset()
+
+    def reset(self):
+        """Обнуляет гистограммы, счётчики и накопленный профиль"""
+        with self._lock:
+            self.histograms = {}
+            self.counters = dict.fromkeys(COUNTERS, 0)
+            self.profile = None
+            self.profiled = 0
+            self.started = time.time()
+
+    def register(self, name, stats):
+        """Источник готовой статистики (например, кэша): stats() -> dict"""
+        self._sources[name] = stats
+
+    def observe(self, family, label, seconds):
+        """Добавляет значение в гистограмму семейства family с меткой label"""
+        if not self.enabled:
+            return
+        key = (family, label)
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    def add(self, name, amount=1):
+        """Увеличивает счётчик name"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def counted(self, iterable, *names):
+        """Итератор, считающий выданные элементы в счётчики names"""
+        if not self.enabled:
+            return iterable
+        return _Counted(iterable, names, self)
+
+    @contextmanager
+    def timer(self, family, label):
+        """Замер блока кода в гистограмму"""
+        if not self.enabled:
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(family, label, time.perf_counter() - started)
+
+    @contextmanager
+    def statement(self, command):
+        """Замер одной команды; с вероятностью profile_rate — под cProfile.
+        Одновременно профилируется только одна команда (профилировщик
+        процесса один), остальные в это время выполняются без него"""
+        if not self.enabled and not self.profile_rate:
+            yield
+            return
+        profiler = None
+        if self.profile_rate and self._sampled() and self._profiling.acquire(
+            blocking=False
+        ):
+            import cProfile
+
+            profiler = cProfile.Profile()
+            profiler.enable()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            if profiler is not None:
+                profiler.disable()
+                self._profiling.release()
+                self._add_profile(profiler)
+            self.observe('statement', command, elapsed)
+
+    def _sampled(self):
+        import random
+
+        return random.random() < self.profile_rate
+
+    def _add_profile(self, profiler):
+        import pstats
+
+        with self._lock:
+            if self.profile is None:
+                self.profile = pstats.Stats(profiler)
+            else:
+                self.profile.add(profiler)
+            self.profiled += 1
+
+    def snapshot(self):
+        """Все метрики одним словарём (для stats и выгрузки в JSON)"""
+        with self._lock:
+            histograms = {}
+            for (family, label), histogram in sorted(self.histograms.items()):
+                histograms.setdefault(family, {})[label] = {
+                    **histogram.summary(),
+                    'buckets': dict(zip(
+                        [*map(str, BUCKETS), '+Inf'], histogram.buckets
+                    )),
+                }
+            counters = dict(self.counters)
+            profiled = self.profiled
+        return {
+            'enabled': self.enabled,
+            'uptime': time.time() - self.started,
+            'histograms': histograms,
+            'counters': counters,
+            'sources': {name: stats() for name, stats in self._sources.items()},
+            'profile': {'rate': self.profile_rate, 'statements': profiled},
+        }
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), ensure_ascii=False, indent=2)
+
+    def to_prometheus(self):
+        """Метрики в текстовом формате Prometheus"""
+        snapshot = self.snapshot()
+        lines = []
+        for family, labels in snapshot['histograms'].items():
+            name = f"{PREFIX}_{family}_seconds"
+            label_name = HISTOGRAMS.get(family, 'label')
+            lines.append(f"# TYPE {name} histogram")
+            for label, data in labels.items():
+                label_text = f'{label_name}="{_escape(label)}"'
+                cumulative = 0
+                for bound, amount in data['buckets'].items():
+                    cumulative += amount
+                    lines.append(
+                        f'{name}_bucket{{{label_text},le="{bound}"}} {cumulative}'
+                    )
+                lines.append(f"{name}_sum{{{label_text}}} {data['sum']}")
+                lines.append(f"{name}_count{{{label_text}}} {data['count']}")
+        for counter, value in snapshot['counters'].items():
+            lines.append(f"# TYPE {PREFIX}_{counter}_total counter")
+            lines.append(f"{PREFIX}_{counter}_total {value}")
+        for source, stats in snapshot['sources'].items():
+            for key, value in stats.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    lines.append(f"# TYPE {PREFIX}_{source}_{key} gauge")
+                    lines.append(f"{PREFIX}_{source}_{key} {value}")
+        return '\n'.join(lines) + '\n'
+
+    def dump(self, filepath):
+        """Записывает метрики в файл: .json — JSON, иначе формат Prometheus"""
+        text = self.to_json() if filepath.endswith('.json') else self.to_prometheus()
+        with open(filepath, 'w', encoding='utf-8') as file:
+            file.write(text)
+
+    def save_profile(self, filepath, top=15):
+        """Сохраняет суммарный профиль (для pstats/snakeviz) и возвращает
+        текст с top функций по суммарному времени; None — профиля нет"""
+        with self._lock:
+            profile = self.profile
+            if profile is None:
+                return None
+            profile.dump_stats(filepath)
+            stream = io.StringIO()
+            profile.stream = stream
+            profile.sort_stats('cumulative').print_stats(top)
+        return stream.getvalue()
+
+
+def _escape(label):
+    return str(label).replace('\\', '\\\\').replace('"', '\\"')
+
+
+metrics = Metrics(
+    enabled=os.environ.get('PRIMITIVE_DB_METRICS', '0') != '0',
+    profile_rate=float(os.environ.get('PRIMITIVE_DB_PROFILE_RATE', '0')),
+)
@@ -0,0 +1,153 @@
+"""
+Параллельный полный просмотр колоночных таблиц.
+
+Таблица делится на части по строкам, условие WHERE проверяется в пуле
+процессов (ProcessPoolExecutor), позиции частей склеиваются по порядку.
+Бинарную таблицу, совпадающую с файлом, процессы сами открывают через mmap —
+передаются только путь и границы части; для остальных колоночных таблиц
+передаются срезы нужных столбцов (int — array, bool — биты, str — коды).
+Таблицы меньше PARALLEL_MIN_ROWS и таблицы rows просматриваются в одном потоке.
+"""
+import os
+import threading
+
+from .binary_storage import MappedTable, open_binary_table
+from .columnar import ColumnarTable, chunk_values
+from .where import compile_columnar_where
+
+PARALLEL_WORKERS = int(
+    os.environ.get('PRIMITIVE_DB_PARALLEL_WORKERS', os.cpu_count() or 1)
+)
+PARALLEL_MIN_ROWS = int(os.environ.get('PRIMITIVE_DB_PARALLEL_MIN_ROWS', '200000'))
+# Частей больше, чем процессов: быстрые процессы забирают оставшиеся части
+CHUNKS_PER_WORKER = 4
+
+_settings = {'workers': PARALLEL_WORKERS, 'min_rows': PARALLEL_MIN_ROWS}
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+# Открытые бинарные таблицы в процессе пула: путь -> MappedTable
+_opened = {}
+
+
+def configure_parallelism(workers=None, min_rows=None):
+    """Меняет число процессов (1 — без параллельности) и порог в строках"""
+    if workers is not None:
+        if workers < 1:
+            raise ValueError("число процессов должно быть положительным")
+        _settings['workers'] = workers
+    if min_rows is not None:
+        if min_rows < 0:
+            raise ValueError("порог строк не может быть отрицательным")
+        _settings['min_rows'] = min_rows
+    return parallelism()
+
+
+def parallelism():
+    """Текущие настройки: {'workers': ..., 'min_rows': ...}"""
+    return dict(_settings)
+
+
+def _get_pool():
+    # multiprocessing импортируется при первом параллельном просмотре:
+    # запуск CLI и мелкие запросы за него не платят
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != _settings['workers']:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            # spawn: процесс сервера многопоточный, fork из него небезопасен
+            _pool = ProcessPoolExecutor(
+                _settings['workers'],
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+            _pool_workers = _settings['workers']
+        return _pool
+
+
+def _reset_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False)
+        _pool = None
+
+
+def _chunk_bounds(length, parts):
+    """Границы частей [start, stop); start кратен 8 ради битовых карт"""
+    size = max(8, (length // parts + 7) & ~7)
+    return [(start, min(start + size, length)) for start in range(0, length, size)]
+
+
+def _open_table(filepath, signature):
+    table = _opened.get(filepath)
+    if table is None or table.signature != signature:
+        try:
+            table = open_binary_table(filepath)
+        except (OSError, ValueError):
+            return None
+        if table.signature != signature:
+            return None
+        _opened[filepath] = table
+    return table
+
+
+def _scan_chunk(task):
+    """Выполняется в процессе пула: позиции части, подходящие под условие.
+    None — файл таблицы уже заменён, просмотр нужно повторить в одном потоке"""
+    source, condition, start, stop = task
+    fields, factory = compile_columnar_where(condition)
+    if source[0] == 'file':
+        table = _open_table(source[1], source[2])
+        if table is None:
+            return None
+        chunks = [table.column_chunk(field, start, stop) for field in fields]
+    else:
+        chunks = [source[1][field] for field in fields]
+    length = stop - start
+    predicate = factory(*(chunk_values(chunk, length) for chunk in chunks))
+    return [start + position for position in range(length) if predicate(position)]
+
+
+def _tasks(table_data, condition, fields, bounds):
+    if isinstance(table_data, MappedTable) and table_data.filepath is not None:
+        source = ('file', os.path.abspath(table_data.filepath), table_data.signature)
+        return [(source, condition, start, stop) for start, stop in bounds]
+    return [
+        (
+            ('data', {
+                field: table_data.column_chunk(field, start, stop)
+                for field in fields
+            }),
+            condition, start, stop,
+        )
+        for start, stop in bounds
+    ]
+
+
+def parallel_positions(table_data, condition):
+    """Позиции колоночной таблицы под условием, вычисленные в пуле процессов.
+    None — таблица мала, не колоночная, параллельность выключена
+    или пул недоступен: тогда просмотр идёт в одном потоке"""
+    workers, min_rows = _settings['workers'], _settings['min_rows']
+    length = len(table_data)
+    if workers < 2 or length < max(min_rows, 1) or not isinstance(
+        table_data, ColumnarTable
+    ):
+        return None
+    from concurrent.futures.process import BrokenProcessPool
+
+    fields, _ = compile_columnar_where(condition)
+    bounds = _chunk_bounds(length, workers * CHUNKS_PER_WORKER)
+    tasks = _tasks(table_data, condition, fields, bounds)
+    try:
+        results = list(_get_pool().map(_scan_chunk, tasks))
+    except (BrokenProcessPool, OSError):
+        _reset_pool()
+        return None
+    if any(part is None for part in results):
+        return None
+    return [position for part in results for position in part]
@@ -0,0 +1,118 @@
+from .errors import QuerySyntaxError
+
+
+def find_keyword(text, keyword, start=0):
+    """Позиция ключевого слова в исходной строке вне кавычек или -1"""
+    quote = None
+    length = len(keyword)
+    for i in range(start, len(text)):
+        char = text[i]
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in ("'", '"'):
+            quote = char
+        elif (
+            (i == 0 or text[i - 1].isspace())
+            and text[i:i + length].lower() == keyword
+            and (i + length == len(text) or text[i + length].isspace())
+        ):
+            return i
+    return -1
+
+
+def clause_text(user_input, keyword, *end_keywords):
+    """Текст между ключевым словом и ближайшим из end_keywords
+    (или концом строки), с сохранёнными кавычками"""
+    start = find_keyword(user_input, keyword)
+    if start == -1:
+        return None
+    start += len(keyword)
+    ends = [find_keyword(user_input, end, start) for end in end_keywords]
+    ends = [end for end in ends if end != -1]
+    return user_input[start:min(ends) if ends else None].strip()
+
+
+def parse_limit_offset(user_input):
+    """Достаёт LIMIT n и OFFSET m из запроса; (None, 0), если их нет"""
+    limit_str = clause_text(user_input, "limit", "offset")
+    offset_str = clause_text(user_input, "offset", "limit")
+    try:
+        limit = int(limit_str) if limit_str is not None else None
+        offset = int(offset_str) if offset_str is not None else 0
+    except ValueError:
+        raise QuerySyntaxError("LIMIT и OFFSET должны быть целыми числами") from None
+    if (limit is not None and limit < 0) or offset < 0:
+        raise QuerySyntaxError("LIMIT и OFFSET должны быть неотрицательными")
+    return limit, offset
+
+
+def parse_select(user_input):
+    """
+    Разбирает select [<столбцы> from] <таблица> [where ...] [group by столбцы]
+    [order by столбец [asc|desc]] [limit n] [offset m] в словарь: table,
+    columns (None — все), where (текст условия или None), group_by (список),
+    order_by ((столбец, по убыванию) или None), join ((таблица, (поле, поле))
+    для <таблица> JOIN <таблица> ON a.x = b.y или None)
+    """
+    clause_keywords = ("where", "group", "order", "limit", "offset")
+    starts = [find_keyword(user_input, keyword) for keyword in clause_keywords]
+    starts = [start for start in starts if start != -1]
+    head = user_input[len("select"):min(starts) if starts else None]
+    from_position = find_keyword(head, "from")
+    columns = None
+    if from_position != -1:
+        columns_text = head[:from_position].strip()
+        head = head[from_position + len("from"):]
+        if columns_text and columns_text != '*':
+            columns = [name.strip() for name in columns_text.split(',')]
+            if not all(columns):
+                raise QuerySyntaxError(f"неверный список столбцов '{columns_text}'")
+    join = None
+    join_position = find_keyword(head, "join")
+    if join_position != -1:
+        right = head[join_position + len("join"):]
+        on_position = find_keyword(right, "on")
+        fields = right[on_position + len("on"):].split('=')
+        if on_position == -1 or len(fields) != 2 or not all(map(str.strip, fields)):
+            raise QuerySyntaxError(
+                "ожидается JOIN <таблица> ON <a.столбец> = <b.столбец>"
+            )
+        join = (right[:on_position].strip(), tuple(map(str.strip, fields)))
+        head = head[:join_position]
+    table_name = head.strip()
+    if not table_name or len(table_name.split()) != 1:
+        raise QuerySyntaxError("ожидается имя таблицы после select/from")
+
+    order_by = None
+    order_text = clause_text(user_input, "order", "limit", "offset")
+    if order_text is not None:
+        words = order_text.split()
+        valid = (
+            2 <= len(words) <= 3
+            and words[0].lower() == "by"
+            and (len(words) == 2 or words[2].lower() in ("asc", "desc"))
+        )
+        if not valid:
+            raise QuerySyntaxError("ожидается ORDER BY <столбец> [ASC|DESC]")
+        order_by = (words[1], len(words) == 3 and words[2].lower() == "desc")
+
+    group_by = []
+    group_text = clause_text(user_input, "group", "order", "limit", "offset")
+    if group_text is not None:
+        words = group_text.split(None, 1)
+        if len(words) != 2 or words[0].lower() != "by":
+            raise QuerySyntaxError("ожидается GROUP BY <столбец>[, <столбец> ...]")
+        group_by = [name.strip() for name in words[1].split(',')]
+        if not all(group_by):
+            raise QuerySyntaxError(f"неверный список GROUP BY '{words[1]}'")
+    return {
+        'table': table_name,
+        'columns': columns,
+        'where': clause_text(
+            user_input, "where", "group", "order", "limit", "offset"
+        ),
+        'group_by': group_by,
+        'order_by': order_by,
+        'join': join,
+    }
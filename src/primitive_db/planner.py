@@ -0,0 +1,239 @@
+import math
+
+from .columnar import ColumnarTable
+from .where import RANGE_OPERATORS
+
+DEFAULT_EQUALITY_SELECTIVITY = 0.1
+DEFAULT_RANGE_SELECTIVITY = 1 / 3
+DEFAULT_LIKE_SELECTIVITY = 0.1
+# Выборка строки по позиции из индекса дороже последовательного чтения
+INDEX_ROW_COST = 2.0
+
+ACCESS_NAMES = {
+    'full_scan': 'полный просмотр',
+    'index_lookup': 'поиск по индексу',
+    'index_range': 'диапазон по индексу',
+}
+ORDER_NAMES = {
+    'index': 'обход sorted-индекса',
+    'top_k': 'top-k через кучу',
+    'sort': 'полная сортировка',
+}
+
+
+def analyze_table(table_data, columns):
+    """Собирает статистику таблицы: число строк, число различных значений,
+    минимум и максимум каждого столбца"""
+    if isinstance(table_data, ColumnarTable):
+        values = {name: set(table_data.column_values(name)) for name, _ in columns}
+    else:
+        values = {name: set() for name, _ in columns}
+        for record in table_data:
+            for name, seen in values.items():
+                seen.add(record.get(name))
+    statistics = {'rows': len(table_data), 'columns': {}}
+    for name, seen in values.items():
+        comparable = [value for value in seen if value is not None]
+        column_stats = {'distinct': len(seen)}
+        try:
+            column_stats['min'] = min(comparable, default=None)
+            column_stats['max'] = max(comparable, default=None)
+        except TypeError:
+            pass
+        statistics['columns'][name] = column_stats
+    return statistics
+
+
+def _column_stats(column, indexes, statistics):
+    """Статистика столбца: точная по индексу, если он есть, иначе из метаданных"""
+    column_stats = dict((statistics or {}).get('columns', {}).get(column, {}))
+    index = (indexes or {}).get(column)
+    if index is not None:
+        column_stats['distinct'] = max(len(index['hash']), 1)
+        if index['kind'] == 'sorted' and index['keys']:
+            column_stats['min'] = index['keys'][0]
+            column_stats['max'] = index['keys'][-1]
+    return column_stats
+
+
+def _equality_selectivity(column, indexes, statistics):
+    distinct = _column_stats(column, indexes, statistics).get('distinct')
+    return 1 / distinct if distinct else DEFAULT_EQUALITY_SELECTIVITY
+
+
+def _range_selectivity(column, low, high, indexes, statistics):
+    column_stats = _column_stats(column, indexes, statistics)
+    minimum, maximum = column_stats.get('min'), column_stats.get('max')
+    numeric = all(
+        isinstance(value, int) for value in (minimum, maximum)
+    ) and all(isinstance(value, int) for value in (low, high) if value is not None)
+    if not numeric:
+        return DEFAULT_RANGE_SELECTIVITY
+    if maximum == minimum:
+        inside = (low is None or low <= minimum) and (high is None or minimum <= high)
+        return 1.0 if inside else 0.0
+    low = minimum if low is None else max(low, minimum)
+    high = maximum if high is None else min(high, maximum)
+    if high < low:
+        return 0.0
+    return min(1.0, (high - low + 1) / (maximum - minimum + 1))
+
+
+def estimate_selectivity(node, indexes=None, statistics=None):
+    """Оценка доли строк, удовлетворяющих условию (предполагается независимость)"""
+    kind = node[0]
+    if kind == 'and':
+        selectivity = 1.0
+        for child in node[1]:
+            selectivity *= estimate_selectivity(child, indexes, statistics)
+        return selectivity
+    if kind == 'or':
+        missed = 1.0
+        for child in node[1]:
+            missed *= 1 - estimate_selectivity(child, indexes, statistics)
+        return 1 - missed
+    if kind == 'not':
+        return 1 - estimate_selectivity(node[1], indexes, statistics)
+    if kind == 'cmp':
+        _, op, column, value = node
+        if op == '=':
+            return _equality_selectivity(column, indexes, statistics)
+        if op == '!=':
+            return 1 - _equality_selectivity(column, indexes, statistics)
+        if op in ('<', '<='):
+            return _range_selectivity(column, None, value, indexes, statistics)
+        return _range_selectivity(column, value, None, indexes, statistics)
+    if kind == 'in':
+        selectivity = _equality_selectivity(node[1], indexes, statistics)
+        return min(1.0, selectivity * len(node[2]))
+    if kind == 'between':
+        return _range_selectivity(node[1], node[2], node[3], indexes, statistics)
+    return DEFAULT_LIKE_SELECTIVITY
+
+
+def _access_paths(node, indexes, statistics):
+    """Варианты доступа через индексы: список (тип, столбцы, доля строк)"""
+    kind = node[0]
+    if kind == 'and':
+        paths = []
+        for child in node[1]:
+            paths.extend(_access_paths(child, indexes, statistics))
+        return paths
+    if kind == 'or':
+        columns, selectivity = [], 0.0
+        access = 'index_lookup'
+        for child in node[1]:
+            child_paths = _access_paths(child, indexes, statistics)
+            if not child_paths:
+                return []
+            best = min(child_paths, key=lambda path: path[2])
+            columns.extend(column for column in best[1] if column not in columns)
+            selectivity += best[2]
+            if best[0] == 'index_range':
+                access = 'index_range'
+        return [(access, columns, min(1.0, selectivity))]
+    if kind not in ('cmp', 'in', 'between'):
+        return []
+    column = node[2] if kind == 'cmp' else node[1]
+    index = (indexes or {}).get(column)
+    if index is None:
+        return []
+    selectivity = estimate_selectivity(node, indexes, statistics)
+    if kind == 'in' or (kind == 'cmp' and node[1] == '='):
+        return [('index_lookup', [column], selectivity)]
+    if index['kind'] != 'sorted':
+        return []
+    if kind == 'between' or node[1] in RANGE_OPERATORS:
+        return [('index_range', [column], selectivity)]
+    return []
+
+
+def plan_query(condition, indexes, statistics, row_count):
+    """
+    Выбирает способ доступа к строкам: полный просмотр, поиск по индексу
+    или диапазон по индексу — по оценке стоимости на основе статистики.
+    Возвращает словарь плана; plan['columns'] — индексы, которые стоит использовать
+    """
+    plan = {
+        'access': 'full_scan',
+        'columns': [],
+        'row_count': row_count,
+        'cost': float(row_count),
+        'estimated_rows': row_count,
+    }
+    if condition is None:
+        return plan
+    plan['estimated_rows'] = round(
+        row_count * estimate_selectivity(condition, indexes, statistics)
+    )
+    lookup_cost = math.log2(row_count + 1)
+    for access, columns, selectivity in _access_paths(condition, indexes, statistics):
+        cost = lookup_cost * len(columns) + INDEX_ROW_COST * selectivity * row_count
+        if cost < plan['cost']:
+            plan.update(access=access, columns=columns, cost=cost)
+    return plan
+
+
+def plan_parameters(condition):
+    """Значения условия, от которых зависит оценка стоимости: границы
+    диапазонов. Равенства и IN оцениваются по числу различных значений
+    столбца, поэтому их значения на выбор плана не влияют"""
+    if condition is None:
+        return ()
+    kind = condition[0]
+    if kind in ('and', 'or'):
+        return tuple(plan_parameters(node) for node in condition[1])
+    if kind == 'not':
+        return plan_parameters(condition[1])
+    if kind == 'between':
+        return (condition[2], condition[3])
+    if kind == 'cmp' and condition[1] in RANGE_OPERATORS:
+        return (condition[3],)
+    return ()
+
+
+def plan_indexes(plan, indexes):
+    """Индексы, выбранные планом (пустой словарь для полного просмотра)"""
+    if plan is None:
+        return indexes
+    indexes = indexes or {}
+    return {column: indexes[column] for column in plan['columns'] if column in indexes}
+
+
+def plan_order(plan, order_by, indexes, limit=None):
+    """
+    Выбирает способ выполнения ORDER BY (order_by — пара (столбец, по убыванию)):
+    обход sorted-индекса, если WHERE не сужает выборку через индекс,
+    top-k через кучу при LIMIT или полная сортировка результата
+    """
+    if order_by is None:
+        return plan
+    index = (indexes or {}).get(order_by[0])
+    covering = (
+        index is not None
+        and index['kind'] == 'sorted'
+        and len(index['keys']) == plan['row_count']
+    )
+    if covering and plan['access'] == 'full_scan':
+        order = 'index'
+    elif limit is not None:
+        order = 'top_k'
+    else:
+        order = 'sort'
+    return {**plan, 'order': order, 'order_by': order_by}
+
+
+def format_plan(plan):
+    """Текстовое описание плана для EXPLAIN"""
+    access = ACCESS_NAMES[plan['access']]
+    if plan['columns']:
+        access += f" ({', '.join(plan['columns'])})"
+    text = (
+        f"План: {access}; строк в таблице: {plan['row_count']}, "
+        f"оценка результата: {plan['estimated_rows']}, стоимость: {plan['cost']:.1f}"
+    )
+    if 'order' in plan:
+        column, descending = plan['order_by']
+        direction = ' DESC' if descending else ''
+        text += f"; сортировка {column}{direction}: {ORDER_NAMES[plan['order']]}"
+    return text
@@ -0,0 +1,259 @@
+"""
+Сетевой сервер базы: database serve [--host H] [--port P] [--workers N].
+
+Протокол — строки JSON в UTF-8, по одной на запрос и ответ:
+    -> {"id": 1, "sql": "select name from users where age > ?", "params": [18]}
+    <- {"id": 1, "ok": true, "columns": [["name", "str"]], "rows": [{...}],
+        "rowcount": -1, "lastrowid": null}
+    <- {"id": 1, "ok": false, "error": "TableNotFoundError", "message": "..."}
+Вместо "params" можно передать "many": [[...], [...]] — команда выполнится
+для каждого набора (insert — одной пачкой с одной записью на диск).
+Строка, не начинающаяся с '{', считается командой без параметров
+(удобно для nc/telnet). Грамматика команд — как у api.Connection.
+
+Запросы одного соединения выполняются по порядку, разных соединений —
+параллельно. Разобранные команды, планы и кэш таблиц общие для всех
+клиентов; блокирующее чтение и запись файлов идут в ограниченном пуле
+потоков. Чтения таблицы выполняются одновременно, запись в таблицу —
+монопольно, изменения схемы — монопольно для всей базы.
+Транзакции по сети недоступны: транзакция одна на процесс.
+"""
+import asyncio
+import json
+import os
+import resource
+import signal
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import AsyncExitStack, asynccontextmanager
+
+from .api import (
+    SCHEMA_COMMANDS,
+    TRANSACTION_COMMANDS,
+    WRITE_COMMANDS,
+    Connection,
+)
+from .errors import DatabaseError, QuerySyntaxError, TransactionError
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 5455
+DEFAULT_WORKERS = min(32, (os.cpu_count() or 1) + 4)
+MAX_REQUEST_BYTES = 1024 * 1024
+LISTEN_BACKLOG = 4096
+# Ключ блокировки схемы: create_table/drop_table/create_index берут её монопольно
+_SCHEMA = object()
+
+
+class _Gate:
+    """Доступ к таблице: чтения идут параллельно, запись — монопольно.
+    Ожидающий писатель пропускается вперёд новых читателей"""
+
+    def __init__(self):
+        self._readers = 0
+        self._writer = False
+        self._waiting_writers = 0
+        self._changed = asyncio.Condition()
+
+    @asynccontextmanager
+    async def read(self):
+        async with self._changed:
+            await self._changed.wait_for(
+                lambda: not self._writer and not self._waiting_writers
+            )
+            self._readers += 1
+        try:
+            yield
+        finally:
+            async with self._changed:
+                self._readers -= 1
+                self._changed.notify_all()
+
+    @asynccontextmanager
+    async def write(self):
+        async with self._changed:
+            self._waiting_writers += 1
+            try:
+                await self._changed.wait_for(
+                    lambda: not self._writer and not self._readers
+                )
+            finally:
+                self._waiting_writers -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            async with self._changed:
+                self._writer = False
+                self._changed.notify_all()
+
+
+def _run_statement(statement, params, many):
+    """Выполняется в потоке пула: строки результата читаются целиком,
+    пока таблица защищена от записи"""
+    if many is not None:
+        result = statement.executemany(many)
+    else:
+        result = statement.execute(params)
+    return {
+        'ok': True,
+        'columns': result.columns,
+        'rows': result.fetchall(),
+        'rowcount': result.rowcount,
+        'lastrowid': result.lastrowid,
+    }
+
+
+def _error(error):
+    name = type(error).__name__ if isinstance(error, DatabaseError) else 'DatabaseError'
+    return {'ok': False, 'error': name, 'message': str(error)}
+
+
+def parse_request(line):
+    """Строка запроса -> (id, sql, params, many)"""
+    text = line.decode('utf-8').strip()
+    if not text.startswith('{'):
+        return None, text, (), None
+    try:
+        request = json.loads(text)
+    except json.JSONDecodeError as e:
+        raise QuerySyntaxError(f"неверный JSON запроса: {e}") from None
+    if not isinstance(request, dict) or not isinstance(request.get('sql'), str):
+        raise QuerySyntaxError("запрос должен содержать строку 'sql'")
+    params = request.get('params') or []
+    many = request.get('many')
+    if not isinstance(params, list) or not (
+        many is None or all(isinstance(item, list) for item in many)
+    ):
+        raise QuerySyntaxError("'params' и элементы 'many' должны быть списками")
+    return request.get('id'), request['sql'], params, many
+
+
+class DatabaseServer:
+    """Асинхронный сервер: одно соединение с базой на всех клиентов"""
+
+    def __init__(self, workers=DEFAULT_WORKERS):
+        self.connection = Connection()
+        self.pool = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix='primitive-db'
+        )
+        self.clients = 0
+        self.requests = 0
+        self._gates = {}
+        self._client_tasks = set()
+
+    def _gate(self, key):
+        gate = self._gates.get(key)
+        if gate is None:
+            gate = self._gates[key] = _Gate()
+        return gate
+
+    async def _access(self, statement, stack):
+        """Берёт блокировки команды: схема, затем таблицы по имени —
+        всегда в одном порядке, чтобы запросы не ждали друг друга по кругу"""
+        if statement.command in SCHEMA_COMMANDS:
+            await stack.enter_async_context(self._gate(_SCHEMA).write())
+            return
+        await stack.enter_async_context(self._gate(_SCHEMA).read())
+        write = statement.command in WRITE_COMMANDS
+        for table_name in sorted(set(statement.tables)):
+            gate = self._gate(table_name)
+            await stack.enter_async_context(gate.write() if write else gate.read())
+
+    async def execute(self, sql, params=(), many=None):
+        """Выполняет команду, возвращает словарь ответа"""
+        self.requests += 1
+        try:
+            statement = self.connection.prepare(sql)
+            if statement.command in TRANSACTION_COMMANDS:
+                raise TransactionError("транзакции по сети недоступны")
+            async with AsyncExitStack() as stack:
+                await self._access(statement, stack)
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(
+                    self.pool, _run_statement, statement, tuple(params), many
+                )
+        except Exception as e:
+            return _error(e)
+
+    async def handle_client(self, reader, writer):
+        """Читает запросы клиента построчно и отвечает в том же порядке"""
+        self.clients += 1
+        task = asyncio.current_task()
+        self._client_tasks.add(task)
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ValueError, ConnectionError):
+                    break
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                try:
+                    request_id, sql, params, many = parse_request(line)
+                except (DatabaseError, UnicodeDecodeError) as e:
+                    request_id, response = None, _error(e)
+                else:
+                    response = await self.execute(sql, params, many)
+                response['id'] = request_id
+                writer.write(json.dumps(response, ensure_ascii=False).encode() + b'\n')
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            # отмена — остановка сервера (см. _close_clients): задача завершается
+            # обычным образом, иначе asyncio выводит трассировку отменённой задачи
+            pass
+        finally:
+            self.clients -= 1
+            self._client_tasks.discard(task)
+            writer.close()
+
+    async def _close_clients(self):
+        """Отменяет задачи подключённых клиентов и дожидается их завершения"""
+        tasks = list(self._client_tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT, ready=None):
+        """Принимает соединения до отмены задачи. ready(host, port)
+        вызывается, когда сервер начал слушать (port=0 — любой свободный)"""
+        server = await asyncio.start_server(
+            self.handle_client, host, port,
+            limit=MAX_REQUEST_BYTES, backlog=LISTEN_BACKLOG,
+        )
+        address = server.sockets[0].getsockname()
+        if ready is not None:
+            ready(address[0], address[1])
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            await self._close_clients()
+            self.pool.shutdown(wait=True)
+            self.connection.close()
+
+
+def raise_open_files_limit():
+    """Поднимает мягкий лимит открытых файлов до жёсткого:
+    каждому клиенту нужен свой сокет"""
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if hard == resource.RLIM_INFINITY:
+        hard = 65536
+    if soft != resource.RLIM_INFINITY and soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+def run_server(host=DEFAULT_HOST, port=DEFAULT_PORT, workers=DEFAULT_WORKERS):
+    """Запускает сервер до Ctrl+C или SIGTERM"""
+    raise_open_files_limit()
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    server = DatabaseServer(workers)
+
+    def ready(bound_host, bound_port):
+        print(f"Сервер слушает {bound_host}:{bound_port} "
+              f"(потоков ввода-вывода: {workers})", flush=True)
+
+    try:
+        asyncio.run(server.serve(host, port, ready))
+    except KeyboardInterrupt:
+        print("\nСервер остановлен")
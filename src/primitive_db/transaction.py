@@ -0,0 +1,171 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from .cache import table_cache
+from .errors import TransactionError
+from .locks import acquire_lock, is_locked, release_lock
+from .metrics import metrics
+
+# Порядок записи при commit: данные таблиц, затем индексы, метаданные последними
+_WRITE_ORDER = {'seq': 0, 'table': 0, 'index': 1, 'meta': 2}
+
+_active = None
+
+
+def _fsync_directory(directory):
+    """Сбрасывает на диск запись каталога (переименование файла)"""
+    try:
+        descriptor = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(descriptor)
+    except OSError:
+        pass
+    finally:
+        os.close(descriptor)
+
+
+@contextmanager
+def atomic_write(filepath, mode='w'):
+    """
+    Запись файла целиком через временный файл: после записи — fsync
+    и os.replace, поэтому при сбое на диске остаётся либо старая,
+    либо новая версия, но не обрезанный файл.
+    Временный файл свой у каждого процесса и потока: одновременные записи
+    одного файла не мешают друг другу, побеждает последний os.replace
+    """
+    tmp_filepath = f"{filepath}.{os.getpid()}.{threading.get_ident()}.tmp"
+    encoding = None if 'b' in mode else 'utf-8'
+    try:
+        with open(tmp_filepath, mode, encoding=encoding) as file:
+            yield file
+            file.flush()
+            os.fsync(file.fileno())
+            metrics.add('bytes_written', os.fstat(file.fileno()).st_size)
+        os.replace(tmp_filepath, filepath)
+    except BaseException:
+        if os.path.exists(tmp_filepath):
+            os.remove(tmp_filepath)
+        raise
+    _fsync_directory(os.path.dirname(filepath) or '.')
+
+
+def durable_append(filepath, lines):
+    """Дописывает строки в конец файла и сбрасывает их на диск"""
+    with open(filepath, 'a', encoding='utf-8') as file:
+        start = file.tell()
+        file.writelines(lines)
+        file.flush()
+        os.fsync(file.fileno())
+        metrics.add('bytes_written', file.tell() - start)
+
+
+class Transaction:
+    """
+    Изменения между begin и commit: последние версии таблиц, индексов
+    и метаданных в памяти и функции их записи на диск.
+    Каждый файл пишется при commit один раз, сколько бы команд его ни меняло
+    """
+
+    def __init__(self):
+        self._staged = {}
+        self._journals = {}
+        self.locks = []
+
+    def get(self, key):
+        """Версия объекта внутри транзакции или None"""
+        entry = self._staged.get(key)
+        return None if entry is None else entry[0]
+
+    def stage(self, key, value, write):
+        """Запоминает новую версию объекта и функцию её записи"""
+        self._staged[key] = (value, write)
+
+    def journal(self, table_name, entries):
+        """Накапливает журнал изменений таблицы за транзакцию.
+        None — таблицу при commit нужно записать целиком"""
+        if entries is None or self._journals.get(table_name, []) is None:
+            self._journals[table_name] = None
+            return None
+        journal = self._journals.setdefault(table_name, [])
+        journal.extend(entries)
+        return journal
+
+    def flush(self):
+        """Записывает накопленные изменения на диск, возвращает число файлов"""
+        keys = sorted(self._staged, key=lambda key: _WRITE_ORDER.get(key[0], 0))
+        for key in keys:
+            self._staged[key][1]()
+        return len(keys)
+
+
+def current_transaction():
+    """Активная транзакция или None"""
+    return _active
+
+
+def begin_transaction():
+    """Начинает транзакцию: дальнейшие записи копятся в памяти"""
+    global _active
+    if _active is not None:
+        raise TransactionError("транзакция уже начата")
+    _active = Transaction()
+    return _active
+
+
+def commit_transaction():
+    """Фиксирует транзакцию одной пачкой записей.
+    Возвращает (число записанных файлов, время в секундах)"""
+    global _active
+    transaction = _active
+    if transaction is None:
+        raise TransactionError("нет активной транзакции")
+    _active = None
+    started = time.perf_counter()
+    try:
+        written = transaction.flush()
+    finally:
+        _release_locks(transaction)
+    return written, time.perf_counter() - started
+
+
+def rollback_transaction():
+    """Отменяет транзакцию. Объекты в кэше могли измениться на месте,
+    поэтому кэш сбрасывается и данные перечитываются с диска"""
+    global _active
+    if _active is None:
+        raise TransactionError("нет активной транзакции")
+    transaction, _active = _active, None
+    _release_locks(transaction)
+    table_cache.clear()
+
+
+def _release_locks(transaction):
+    for lock_path in reversed(transaction.locks):
+        release_lock(lock_path)
+    transaction.locks.clear()
+
+
+@contextmanager
+def write_lock(lock_path):
+    """
+    Монопольная блокировка на время записи. Внутри транзакции блокировка
+    удерживается до commit/rollback, чтобы другой процесс не перезаписал
+    изменения, прочитанные и ещё не зафиксированные этой транзакцией
+    """
+    held = is_locked(lock_path)
+    acquire_lock(lock_path)
+    if _active is not None:
+        if held:
+            release_lock(lock_path)
+        else:
+            _active.locks.append(lock_path)
+        yield
+        return
+    try:
+        yield
+    finally:
+        release_lock(lock_path)
@@ -1,39 +1,495 @@
+import csv
 import json
+import marshal
 import os
+import threading
 
 from ..decorators import handle_db_errors
+from .binary_storage import MappedTable, open_binary_table, write_binary_table
+from .cache import file_signature, signature_size, table_cache
+from .columnar import ColumnarTable
+from .compression import read_header, read_records, write_records
+from .locks import is_locked
+from .metrics import metrics
+from .transaction import (
+    atomic_write,
+    current_transaction,
+    durable_append,
+    write_lock,
+)
+
+METADATA_FILE = "db_meta.json"
+STORAGE_MODES = ('json', 'log', 'binary')
+LOG_COMPACT_MIN_BYTES = 1024 * 1024
+# Сколько раз читатель перечитывает таблицу, если её изменили во время чтения
+SNAPSHOT_READ_RETRIES = 20
 
 
 @handle_db_errors
 def load_metadata(filepath):
-    """Загружает данные из JSON-файла. Если файл не найден, возвращает пустой словарь"""
+    """Загружает данные из JSON-файла. Если файл не найден, возвращает пустой словарь.
+    Повторные загрузки неизменённого файла берутся из кэша"""
+    key = ('meta', filepath)
+    transaction = current_transaction()
+    if transaction is not None and transaction.get(key) is not None:
+        return transaction.get(key)
+    signature = file_signature(filepath)
+    metadata = table_cache.get(key, signature)
+    if metadata is not None:
+        return metadata
     try:
-        with open(filepath, 'r', encoding='utf-8') as file:
-            return json.load(file)
+        metadata = _read_metadata(filepath, signature)
     except FileNotFoundError:
-        return {}
+        metadata = {}
+    table_cache.put(key, signature, metadata)
+    return metadata
+
+def list_tables(metadata):
+    """Возвращает список всех таблиц"""
+    if not isinstance(metadata, dict):
+        return []
+
+    tables = metadata.get('tables', {})
+    if not isinstance(tables, dict):
+        return []
+
+    return list(tables.keys())
+
+def metadata_snapshot_filepath(filepath):
+    """Снимок разобранных метаданных в формате marshal"""
+    return f"{filepath}.snapshot"
+
+def _read_metadata(filepath, signature):
+    """Метаданные из снимка, если он записан для этой же версии файла
+    (тот же отпечаток), иначе разбор JSON и новый снимок. Снимок — только
+    ускорение запуска: при любой ошибке чтения он просто не используется"""
+    try:
+        with open(metadata_snapshot_filepath(filepath), 'rb') as file:
+            snapshot_signature, metadata = marshal.load(file)
+        if snapshot_signature == signature:
+            return metadata
+    except (OSError, EOFError, ValueError, TypeError):
+        pass
+    with open(filepath, 'r', encoding='utf-8') as file:
+        metadata = json.load(file)
+    _write_metadata_snapshot(filepath, signature, metadata)
+    return metadata
+
+def _write_metadata_snapshot(filepath, signature, metadata):
+    # без fsync: после сбоя снимок не совпадёт с файлом и будет пересоздан
+    snapshot_path = metadata_snapshot_filepath(filepath)
+    tmp_filepath = f"{snapshot_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_filepath, 'wb') as file:
+            marshal.dump((signature, metadata), file)
+        os.replace(tmp_filepath, snapshot_path)
+    except (OSError, ValueError):
+        if os.path.exists(tmp_filepath):
+            os.remove(tmp_filepath)
 
 @handle_db_errors
 def save_metadata(filepath, data):
-    """Сохраняет переданные данные в JSON-файл"""
-    with open(filepath, 'w', encoding='utf-8') as file:
+    """Сохраняет переданные данные в JSON-файл (атомарно, через временный файл).
+    Внутри транзакции запись откладывается до commit"""
+    key = ('meta', filepath)
+    transaction = current_transaction()
+    if transaction is not None:
+        transaction.stage(key, data, lambda: _write_metadata(filepath, data))
+        return
+    _write_metadata(filepath, data)
+
+def _write_metadata(filepath, data):
+    key = ('meta', filepath)
+    table_cache.invalidate(key)
+    with atomic_write(filepath) as file:
         json.dump(data, file, ensure_ascii=False, indent=2)
+    signature = file_signature(filepath)
+    _write_metadata_snapshot(filepath, signature, data)
+    table_cache.put(key, signature, data)
+
+def table_filepath(table_name):
+    """Путь к файлу (снимку) таблицы в директории data/"""
+    return f"data/{table_name}.json"
+
+def table_log_filepath(table_name):
+    """Путь к журналу изменений таблицы в режиме хранения 'log'"""
+    return f"data/{table_name}.log"
+
+def table_binary_filepath(table_name):
+    """Путь к бинарному файлу таблицы в режиме хранения 'binary'"""
+    return f"data/{table_name}.bin"
+
+def table_lock_filepath(table_name):
+    """Файл блокировки записи таблицы"""
+    return f"data/{table_name}.lock"
+
+def table_sequence_filepath(table_name):
+    """Файл счётчика id таблицы"""
+    return f"data/{table_name}.seq"
+
+def table_lock(table_name):
+    """Межпроцессная блокировка записи в таблицу (читатели её не ждут)"""
+    return write_lock(table_lock_filepath(table_name))
+
+def metadata_lock(filepath):
+    """Межпроцессная блокировка изменения метаданных"""
+    return write_lock(f"{filepath}.lock")
+
+def allocate_ids(table_name, count, initial):
+    """Выделяет count идентификаторов из счётчика data/<таблица>.seq.
+    Вызывается под table_lock, поэтому безопасно для нескольких процессов.
+    Внутри транзакции счётчик пишется при commit и откатывается rollback.
+    initial() вычисляет первый id, если счётчика ещё нет"""
+    filepath = table_sequence_filepath(table_name)
+    key = ('seq', table_name)
+    transaction = current_transaction()
+    first_id = transaction.get(key) if transaction is not None else None
+    if first_id is None:
+        try:
+            with open(filepath, 'r', encoding='utf-8') as file:
+                first_id = int(file.read())
+        except (FileNotFoundError, ValueError):
+            first_id = initial()
+    next_id = first_id + count
+
+    def write():
+        os.makedirs("data", exist_ok=True)
+        with atomic_write(filepath) as file:
+            file.write(str(next_id))
+
+    if transaction is not None:
+        # блокировка таблицы держится до commit — счётчик пишется вместе с данными
+        transaction.stage(key, next_id, write)
+    else:
+        write()
+    return first_id
+
+def remove_sequence(table_name):
+    """Сбрасывает счётчик id: он заново инициализируется по максимальному id"""
+    filepath = table_sequence_filepath(table_name)
+    if os.path.exists(filepath):
+        os.remove(filepath)
+
+def _table_filepaths(table_name):
+    return (
+        table_filepath(table_name),
+        table_log_filepath(table_name),
+        table_binary_filepath(table_name),
+    )
+
+def get_storage(table_info):
+    """Режим хранения таблицы из её метаданных: 'json' (по умолчанию),
+    'log' или 'binary'"""
+    return (table_info or {}).get('storage', 'json')
+
+def get_engine(table_info):
+    """Представление таблицы в памяти: 'rows' (список словарей) или 'columnar'"""
+    return (table_info or {}).get('engine', 'rows')
+
+def get_compression(table_info):
+    """Кодек сжатия снимка таблицы: 'none' (по умолчанию), 'zlib' или 'lzma'.
+    Бинарные таблицы читаются через mmap и не сжимаются"""
+    if get_storage(table_info) == 'binary':
+        return 'none'
+    return (table_info or {}).get('compression', 'none')
+
+def _read_snapshot(table_name):
+    """Записи снимка; сжатый снимок распознаётся по заголовку, поэтому
+    читатель не зависит от кодека в метаданных"""
+    try:
+        file = open(table_filepath(table_name), 'rb')
+    except FileNotFoundError:
+        return []
+    with file:
+        header = read_header(file)
+        if header is None:
+            return json.loads(file.read())
+        return read_records(file, header[0])
+
+def _replay_log(table_name, table_data):
+    """Применяет записи журнала к снимку; строки адресуются по id.
+    Оборванная при сбое последняя строка журнала пропускается"""
+    try:
+        file = open(table_log_filepath(table_name), 'r', encoding='utf-8')
+    except FileNotFoundError:
+        return table_data
+    rows = {record.get('id'): record for record in table_data}
+    with file:
+        for line in file:
+            if not line.strip():
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                if line.endswith('\n'):
+                    raise
+                break
+            if entry['op'] == 'put':
+                rows[entry['row']['id']] = entry['row']
+            elif entry['op'] == 'del':
+                rows.pop(entry['id'], None)
+            elif entry['op'] == 'clear':
+                rows.clear()
+    return list(rows.values())
+
+def _write_snapshot(table_name, data, compact, codec='none'):
+    os.makedirs("data", exist_ok=True)
+    if codec != 'none':
+        with atomic_write(table_filepath(table_name), 'wb') as file:
+            write_records(file, data, codec)
+        return
+    with atomic_write(table_filepath(table_name)) as file:
+        if isinstance(data, ColumnarTable):
+            # строки материализуются по одной, без полного списка словарей
+            file.write('[')
+            for position, record in enumerate(data):
+                if position:
+                    file.write(',')
+                file.write(
+                    json.dumps(record, ensure_ascii=False, separators=(',', ':'))
+                )
+            file.write(']')
+        elif compact:
+            file.write(json.dumps(data, ensure_ascii=False, separators=(',', ':')))
+        else:
+            json.dump(data, file, ensure_ascii=False, indent=2)
+
+def _append_log(table_name, journal):
+    os.makedirs("data", exist_ok=True)
+    lines = [
+        json.dumps(entry, ensure_ascii=False, separators=(',', ':')) + '\n'
+        for entry in journal
+    ]
+    durable_append(table_log_filepath(table_name), lines)
+
+def _needs_compaction(table_name):
+    """Журнал сжимается в снимок, когда перерастает его (амортизированно O(1))"""
+    try:
+        log_size = os.path.getsize(table_log_filepath(table_name))
+    except FileNotFoundError:
+        return False
+    try:
+        snapshot_size = os.path.getsize(table_filepath(table_name))
+    except FileNotFoundError:
+        snapshot_size = 0
+    return log_size > max(LOG_COMPACT_MIN_BYTES, snapshot_size)
+
+def _table_cache_key(table_name):
+    return ('table', table_name)
+
+def _table_signature(table_name, table_info=None):
+    """Отпечаток файлов таблицы и версии её схемы: alter_table меняет схему,
+    не трогая файлы, и закэшированные таблицы всех процессов устаревают"""
+    signature = file_signature(*_table_filepaths(table_name))
+    version = (table_info or {}).get('schema_version')
+    # размер 0: версия схемы не влияет на оценку памяти записи кэша
+    return signature if version is None else signature + ((version, 0),)
+
+def _cache_size(table_name, table_info, signature):
+    """Оценка памяти таблицы для кэша: сжатый снимок — по исходному размеру"""
+    size = signature_size(signature)
+    if get_compression(table_info) == 'none' or signature[0] is None:
+        return size
+    try:
+        with open(table_filepath(table_name), 'rb') as file:
+            header = read_header(file)
+    except FileNotFoundError:
+        return size
+    return size if header is None else size - signature[0][1] + header[1]
+
+def table_version(table_name, table_data=None):
+    """Версия файлов таблицы в виде для JSON (её хранят файлы индексов).
+    С table_data — версия, из которой прочитаны эти данные; None, если их
+    нет в кэше и процесс не держит блокировку таблицы (тогда файлы на диске
+    могли уже смениться)"""
+    signature = None
+    if table_data is not None:
+        signature = table_cache.signature(_table_cache_key(table_name), table_data)
+        if signature is None and not is_locked(table_lock_filepath(table_name)):
+            return None
+    if signature is None:
+        signature = file_signature(*_table_filepaths(table_name))
+    # версия схемы (см. _table_signature) на позиции строк не влияет
+    return [None if part is None else list(part) for part in signature[:3]]
+
+def table_generation(table_name):
+    """Версия данных таблицы: растёт при каждой записи и при внешнем изменении"""
+    return table_cache.generation(_table_cache_key(table_name))
+
+def remove_table_files(table_name, keep_sequence=False):
+    """Удаляет все файлы данных таблицы (счётчик id — если не keep_sequence)"""
+    table_cache.invalidate(_table_cache_key(table_name))
+    if not keep_sequence:
+        remove_sequence(table_name)
+    for filepath in _table_filepaths(table_name):
+        if os.path.exists(filepath):
+            os.remove(filepath)
+
+def _open_binary(table_name, table_info):
+    if not os.path.exists(table_binary_filepath(table_name)):
+        return ColumnarTable(table_info['columns'])
+    return open_binary_table(table_binary_filepath(table_name))
 
 @handle_db_errors
-def load_table_data(table_name):
-    """Загружает данные таблицы из соответствующего JSON-файла в директории data/"""
-    filepath = f"data/{table_name}.json"
+def load_table_data(table_name, table_info=None):
+    """Загружает данные таблицы из соответствующего JSON-файла в директории data/.
+    Разобранная таблица кэшируется, пока файлы не изменились"""
+    key = _table_cache_key(table_name)
+    transaction = current_transaction()
+    if transaction is not None and transaction.get(key) is not None:
+        return transaction.get(key)
+    signature = _table_signature(table_name, table_info)
+    table_data = table_cache.get(key, signature)
+    if table_data is not None:
+        return table_data
+    for _ in range(SNAPSHOT_READ_RETRIES):
+        table_data = _read_table_files(table_name, table_info)
+        current = _table_signature(table_name, table_info)
+        if current == signature:
+            break
+        signature = current
+    else:
+        # таблицу непрерывно переписывают — читаем под блокировкой записи
+        with table_lock(table_name):
+            signature = _table_signature(table_name, table_info)
+            table_data = _read_table_files(table_name, table_info)
+    metrics.add('bytes_read', signature_size(signature))
+    table_cache.put(
+        key, signature, table_data,
+        _cache_size(table_name, table_info, signature),
+    )
+    return table_data
+
+@handle_db_errors
+def load_table_head(table_name, table_info, count):
+    """Первые count записей таблицы (или больше) для select с LIMIT без
+    условия. Сжатый снимок таблицы json, которой нет в кэше, читается только
+    до кадра с count-й записью и в кэш не попадает; иначе — load_table_data"""
+    key = _table_cache_key(table_name)
+    transaction = current_transaction()
+    if (
+        get_storage(table_info) != 'json'
+        or transaction is not None and transaction.get(key) is not None
+        or table_cache.get(key, _table_signature(table_name, table_info)) is not None
+    ):
+        return load_table_data(table_name, table_info)
     try:
-        with open(filepath, 'r', encoding='utf-8') as file:
-            return json.load(file)
+        file = open(table_filepath(table_name), 'rb')
     except FileNotFoundError:
         return []
+    with file:
+        header = read_header(file)
+        if header is None:
+            # несжатый JSON разбирается только целиком
+            return load_table_data(table_name, table_info)
+        records = read_records(file, header[0], count)
+    pending = (table_info or {}).get('pending')
+    if pending:
+        _apply_pending(records, pending)
+    return records
+
+def _read_table_files(table_name, table_info):
+    """Читает таблицу с диска. Файлы заменяются атомарно, а журнал только
+    дописывается, поэтому без блокировок читается согласованная версия,
+    если отпечаток файлов до и после чтения совпал"""
+    pending = (table_info or {}).get('pending')
+    if get_storage(table_info) == 'binary':
+        table_data = _open_binary(table_name, table_info)
+        if pending and isinstance(table_data, MappedTable):
+            table_data.conform(table_info['columns'], pending['add'])
+        return table_data
+    with metrics.timer('json_decode', table_name):
+        table_data = _read_snapshot(table_name)
+        if get_storage(table_info) == 'log':
+            table_data = _replay_log(table_name, table_data)
+    if pending:
+        _apply_pending(table_data, pending)
+    if get_engine(table_info) == 'columnar':
+        table_data = ColumnarTable.from_records(table_info['columns'], table_data)
+    return table_data
+
+def _apply_pending(records, pending):
+    """Приводит строки к схеме после alter_table, пока файлы не переписаны
+    (compact): удалённые столбцы убираются, добавленные получают значение
+    по умолчанию"""
+    for record in records:
+        for name in pending['drop']:
+            record.pop(name, None)
+        for name, default in pending['add'].items():
+            record.setdefault(name, default)
 
 @handle_db_errors
-def save_table_data(table_name, data):
-    """Сохраняет данные таблицы в соответствующий JSON-файл в директории data/"""
-    os.makedirs("data", exist_ok=True)
-    filepath = f"data/{table_name}.json"
-    with open(filepath, 'w', encoding='utf-8') as file:
-        json.dump(data, file, ensure_ascii=False, indent=2)
+def save_table_data(table_name, data, table_info=None, journal=None):
+    """Сохраняет данные таблицы в соответствующий JSON-файл в директории data/.
+    В режиме 'log' дописывает журнал изменений и при необходимости
+    сжимает его в снимок, в режиме 'binary' пишет data/<таблица>.bin.
+    Внутри транзакции изменения копятся в памяти и пишутся одним разом при commit"""
+    transaction = current_transaction()
+    if transaction is not None:
+        journal = transaction.journal(table_name, journal)
+        transaction.stage(
+            _table_cache_key(table_name), data,
+            lambda: _write_table_data(table_name, data, table_info, journal),
+        )
+        return
+    _write_table_data(table_name, data, table_info, journal)
+
+def _write_table_data(table_name, data, table_info, journal):
+    key = _table_cache_key(table_name)
+    table_cache.invalidate(key)
+    storage = get_storage(table_info)
+    if storage == 'binary':
+        os.makedirs("data", exist_ok=True)
+        write_binary_table(
+            table_binary_filepath(table_name), data, table_info['columns']
+        )
+    elif storage != 'log':
+        _write_snapshot(
+            table_name, data, compact=False, codec=get_compression(table_info)
+        )
+    elif journal is None:
+        compact_table(table_name, data, table_info)
+    else:
+        _append_log(table_name, journal)
+        if _needs_compaction(table_name):
+            compact_table(table_name, data, table_info)
+    signature = _table_signature(table_name, table_info)
+    table_cache.put(
+        key, signature, data, _cache_size(table_name, table_info, signature)
+    )
+
+def compact_table(table_name, data, table_info=None):
+    """Записывает актуальное состояние таблицы в снимок и очищает журнал"""
+    table_cache.invalidate(_table_cache_key(table_name))
+    _write_snapshot(
+        table_name, data, compact=True, codec=get_compression(table_info)
+    )
+    log_filepath = table_log_filepath(table_name)
+    if os.path.exists(log_filepath):
+        os.remove(log_filepath)
 
+def iter_import_rows(filepath, column_names):
+    """Потоково читает строки для импорта из .csv или .jsonl.
+    В CSV первая строка с именами столбцов считается заголовком и пропускается
+    (столбец id из файла отбрасывается — id выдаёт счётчик таблицы);
+    в JSONL каждая строка — объект {столбец: значение} или массив значений"""
+    with open(filepath, 'r', encoding='utf-8', newline='') as file:
+        if filepath.lower().endswith('.csv'):
+            reader = csv.reader(file)
+            skip_id = False
+            for number, row in enumerate(reader):
+                if number == 0 and row[:1] == ['id'] and row[1:] == column_names:
+                    skip_id = True
+                    continue
+                if number == 0 and row == column_names:
+                    continue
+                if row:
+                    yield row[1:] if skip_id else row
+        elif filepath.lower().endswith(('.jsonl', '.ndjson')):
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            raise ValueError(
+                f"неизвестный формат файла '{filepath}' (нужен .csv или .jsonl)"
+            )
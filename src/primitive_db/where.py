@@ -0,0 +1,381 @@
+import re
+from functools import lru_cache
+
+from .errors import QuerySyntaxError
+
+# Узлы дерева условия — кортежи, чтобы условие можно было хэшировать
+# (ключ кэша select и кэша скомпилированных предикатов):
+#   ('and', (узел, ...))           ('or', (узел, ...))      ('not', узел)
+#   ('cmp', оп, поле, значение)    оп: = != < <= > >=
+#   ('in', поле, (значение, ...))  ('between', поле, от, до)
+#   ('like', поле, шаблон)
+# В подготовленных запросах (api.py) на месте значения может стоять Param —
+# параметр '?', значение которого подставляет bind_params
+
+COMPARISON_OPERATORS = ('=', '!=', '<', '<=', '>', '>=')
+RANGE_OPERATORS = ('<', '<=', '>', '>=')
+
+_TOKEN_PATTERN = re.compile(r"""
+    \s*(?:
+        (?P<string>'[^']*'|"[^"]*")
+      | (?P<number>-?\d+(?![\w.]))
+      | (?P<op><=|>=|!=|<>|=|<|>)
+      | (?P<punct>[(),])
+      | (?P<param>\?)
+      | (?P<word>[^\s()',=<>!"]+)
+    )""", re.VERBOSE)
+
+# Дробные числа не поддерживаются (столбцы только int): такой литерал
+# без ошибки стал бы строкой и молча не совпал бы ни с одной строкой
+_DECIMAL_PATTERN = re.compile(r"-?(?:\d+\.\d*|\.\d+|\d+(?=[eE]))(?:[eE][-+]?\d+)?")
+
+_KEYWORDS = {'and', 'or', 'not', 'in', 'between', 'like'}
+
+
+class Param:
+    """Параметр '?' подготовленного запроса: номер значения в params"""
+
+    __slots__ = ('index',)
+
+    def __init__(self, index):
+        self.index = index
+
+    def __eq__(self, other):
+        return isinstance(other, Param) and other.index == self.index
+
+    def __hash__(self):
+        return hash((Param, self.index))
+
+    def __repr__(self):
+        return f"Param({self.index})"
+
+
+def _tokenize(text, params=None):
+    """Токены условия. params — счётчик номеров параметров '?'
+    (itertools.count); None — параметры запрещены"""
+    tokens = []
+    position = 0
+    text = text.strip()
+    while position < len(text):
+        match = _TOKEN_PATTERN.match(text, position)
+        if match is None or match.end() == position:
+            raise QuerySyntaxError(f"непонятный фрагмент условия: '{text[position:]}'")
+        position = match.end()
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind == 'string':
+            tokens.append(('literal', value[1:-1]))
+        elif kind == 'number':
+            tokens.append(('literal', int(value)))
+        elif kind == 'op':
+            tokens.append(('op', '!=' if value == '<>' else value))
+        elif kind == 'punct':
+            tokens.append(('punct', value))
+        elif kind == 'param':
+            if params is None:
+                raise QuerySyntaxError(
+                    "параметр '?' допустим только в подготовленном запросе"
+                )
+            tokens.append(('literal', Param(next(params))))
+        elif value.lower() in _KEYWORDS:
+            tokens.append(('keyword', value.lower()))
+        elif value.lower() in ('true', 'false'):
+            tokens.append(('literal', value.lower() == 'true'))
+        elif _DECIMAL_PATTERN.fullmatch(value):
+            raise QuerySyntaxError(
+                f"дробное число '{value}' не поддерживается: "
+                f"используйте целое число или строку в кавычках"
+            )
+        else:
+            tokens.append(('word', value))
+    return tokens
+
+
+class _Parser:
+    """Рекурсивный спуск: or -> and -> not -> сравнение"""
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.position = 0
+
+    def peek(self, kind=None, value=None):
+        if self.position >= len(self.tokens):
+            return None
+        token = self.tokens[self.position]
+        if kind is not None and token[0] != kind:
+            return None
+        if value is not None and token[1] != value:
+            return None
+        return token
+
+    def take(self, kind=None, value=None):
+        token = self.peek(kind, value)
+        if token is None:
+            found = self.tokens[self.position][1] if self.peek() else 'конец строки'
+            expected = value or kind or 'выражение'
+            raise QuerySyntaxError(f"ожидалось '{expected}', получено '{found}'")
+        self.position += 1
+        return token
+
+    def parse(self):
+        node = self.parse_or()
+        if self.peek() is not None:
+            raise QuerySyntaxError(f"лишний фрагмент условия: '{self.peek()[1]}'")
+        return node
+
+    def parse_or(self):
+        nodes = [self.parse_and()]
+        while self.peek('keyword', 'or'):
+            self.take()
+            nodes.append(self.parse_and())
+        return nodes[0] if len(nodes) == 1 else ('or', tuple(nodes))
+
+    def parse_and(self):
+        nodes = [self.parse_not()]
+        while self.peek('keyword', 'and'):
+            self.take()
+            nodes.append(self.parse_not())
+        return nodes[0] if len(nodes) == 1 else ('and', tuple(nodes))
+
+    def parse_not(self):
+        if self.peek('keyword', 'not'):
+            self.take()
+            return ('not', self.parse_not())
+        if self.peek('punct', '('):
+            self.take()
+            node = self.parse_or()
+            self.take('punct', ')')
+            return node
+        return self.parse_comparison()
+
+    def literal(self):
+        token = self.take()
+        if token[0] in ('literal', 'word'):
+            return token[1]
+        raise QuerySyntaxError(f"ожидалось значение, получено '{token[1]}'")
+
+    def parse_comparison(self):
+        field = self.take('word')[1]
+        negate = False
+        if self.peek('keyword', 'not'):
+            self.take()
+            negate = True
+        token = self.take()
+        if token[0] == 'op' and not negate:
+            return ('cmp', token[1], field, self.literal())
+        if token == ('keyword', 'in'):
+            self.take('punct', '(')
+            values = [self.literal()]
+            while self.peek('punct', ','):
+                self.take()
+                values.append(self.literal())
+            self.take('punct', ')')
+            node = ('in', field, tuple(values))
+        elif token == ('keyword', 'between'):
+            low = self.literal()
+            self.take('keyword', 'and')
+            node = ('between', field, low, self.literal())
+        elif token == ('keyword', 'like'):
+            pattern = self.literal()
+            if not isinstance(pattern, (str, Param)):
+                raise QuerySyntaxError("шаблон LIKE должен быть строкой")
+            node = ('like', field, pattern)
+        else:
+            raise QuerySyntaxError(f"ожидался оператор сравнения после '{field}'")
+        return ('not', node) if negate else node
+
+
+def parse_where(text, params=None):
+    """Разбирает текст условия WHERE в дерево; QuerySyntaxError при ошибке
+    синтаксиса. params — счётчик номеров параметров '?' (см. _tokenize)"""
+    tokens = _tokenize(text, params)
+    if not tokens:
+        raise QuerySyntaxError("пустое условие")
+    return _Parser(tokens).parse()
+
+
+def parse_assignments(text, params=None):
+    """Разбирает SET: "name = 'Анна, мл.', age = ?" -> {'name': ..., 'age': ...}.
+    Запятые внутри кавычек не разделяют присваивания"""
+    parser = _Parser(_tokenize(text, params))
+    assignments = {}
+    while True:
+        field = parser.take('word')[1]
+        parser.take('op', '=')
+        assignments[field] = parser.literal()
+        if parser.peek() is None:
+            return assignments
+        parser.take('punct', ',')
+
+
+def parse_values(text, params=None):
+    """Разбирает значения insert, разделённые пробелами: 'Анна' 30 true ?"""
+    values = []
+    for kind, value in _tokenize(text, params):
+        if kind not in ('literal', 'word'):
+            raise QuerySyntaxError(f"ожидалось значение, получено '{value}'")
+        values.append(value)
+    return values
+
+
+def bind_params(condition, params):
+    """Копия условия, в которой параметры '?' заменены значениями params"""
+    def bind(value):
+        return params[value.index] if isinstance(value, Param) else value
+
+    kind = condition[0]
+    if kind in ('and', 'or'):
+        return (kind, tuple(bind_params(node, params) for node in condition[1]))
+    if kind == 'not':
+        return ('not', bind_params(condition[1], params))
+    if kind == 'cmp':
+        return ('cmp', condition[1], condition[2], bind(condition[3]))
+    if kind == 'in':
+        return ('in', condition[1], tuple(map(bind, condition[2])))
+    if kind == 'between':
+        return ('between', condition[1], bind(condition[2]), bind(condition[3]))
+    pattern = bind(condition[2])
+    if not isinstance(pattern, str):
+        raise QuerySyntaxError("шаблон LIKE должен быть строкой")
+    return ('like', condition[1], pattern)
+
+
+def to_condition(where_clause):
+    """Приводит условие к дереву: словарь {поле: значение} — это AND равенств"""
+    if where_clause is None or isinstance(where_clause, tuple):
+        return where_clause
+    terms = tuple(
+        ('cmp', '=', field, value) for field, value in where_clause.items()
+    )
+    if not terms:
+        return None
+    return terms[0] if len(terms) == 1 else ('and', terms)
+
+
+def equality_terms(condition):
+    """Словарь {поле: значение}, если условие — только AND равенств, иначе None"""
+    nodes = condition[1] if condition[0] == 'and' else (condition,)
+    terms = {}
+    for node in nodes:
+        if node[0] != 'cmp' or node[1] != '=' or node[2] in terms:
+            return None
+        terms[node[2]] = node[3]
+    return terms
+
+
+def condition_fields(condition):
+    """Имена всех столбцов, упомянутых в условии"""
+    kind = condition[0]
+    if kind in ('and', 'or'):
+        fields = []
+        for node in condition[1]:
+            for field in condition_fields(node):
+                if field not in fields:
+                    fields.append(field)
+        return fields
+    if kind == 'not':
+        return condition_fields(condition[1])
+    return [condition[2] if kind == 'cmp' else condition[1]]
+
+
+def rename_fields(condition, rename):
+    """Копия условия, в которой имена столбцов заменены на rename(имя)"""
+    kind = condition[0]
+    if kind in ('and', 'or'):
+        return (kind, tuple(rename_fields(node, rename) for node in condition[1]))
+    if kind == 'not':
+        return ('not', rename_fields(condition[1], rename))
+    if kind == 'cmp':
+        return ('cmp', condition[1], rename(condition[2]), condition[3])
+    return (kind, rename(condition[1]), *condition[2:])
+
+
+def _like_regex(pattern):
+    parts = []
+    for char in pattern:
+        if char == '%':
+            parts.append('.*')
+        elif char == '_':
+            parts.append('.')
+        else:
+            parts.append(re.escape(char))
+    return re.compile(''.join(parts), re.DOTALL)
+
+
+def _typed(value):
+    """Тип для упорядочивающих сравнений: bool сравнивается как int"""
+    return str if isinstance(value, str) else int
+
+
+class _CodeGenerator:
+    """Превращает дерево условия в одно выражение Python с константами"""
+
+    def __init__(self, ref):
+        self.ref = ref
+        self.constants = {}
+
+    def constant(self, value):
+        name = f"_k{len(self.constants)}"
+        self.constants[name] = value
+        return name
+
+    def generate(self, node):
+        kind = node[0]
+        if kind in ('and', 'or'):
+            parts = [self.generate(child) for child in node[1]]
+            return '(' + f' {kind} '.join(parts) + ')'
+        if kind == 'not':
+            return f"(not {self.generate(node[1])})"
+        if kind == 'cmp':
+            _, op, field, value = node
+            x = self.ref(field)
+            v = self.constant(value)
+            if op == '=':
+                return f"({x} == {v})"
+            if op == '!=':
+                return f"({x} != {v})"
+            t = self.constant(_typed(value))
+            return f"(isinstance(_x := {x}, {t}) and _x {op} {v})"
+        if kind == 'in':
+            _, field, values = node
+            return f"({self.ref(field)} in {self.constant(frozenset(values))})"
+        if kind == 'between':
+            _, field, low, high = node
+            t = self.constant(_typed(low))
+            return (
+                f"(isinstance(_x := {self.ref(field)}, {t}) and "
+                f"{self.constant(low)} <= _x <= {self.constant(high)})"
+            )
+        _, field, pattern = node
+        x = self.ref(field)
+        if '_' not in pattern and '%' not in pattern.rstrip('%'):
+            if pattern.endswith('%'):
+                prefix = self.constant(pattern.rstrip('%'))
+                return f"(isinstance(_x := {x}, str) and _x.startswith({prefix}))"
+            return f"({x} == {self.constant(pattern)})"
+        regex = self.constant(_like_regex(pattern))
+        return f"(isinstance(_x := {x}, str) and {regex}.fullmatch(_x) is not None)"
+
+
+@lru_cache(maxsize=256)
+def compile_where(condition):
+    """Компилирует условие в одну функцию record -> bool.
+    Код генерируется один раз на условие, без обхода словаря на каждой строке"""
+    generator = _CodeGenerator(lambda field: f"_r.get({field!r})")
+    body = generator.generate(condition)
+    return eval(f"lambda _r: {body}", dict(generator.constants))
+
+
+@lru_cache(maxsize=256)
+def compile_columnar_where(condition):
+    """Компилирует условие для колоночной таблицы: возвращает функцию,
+    которая по спискам значений столбцов строит предикат position -> bool"""
+    fields = condition_fields(condition)
+    slots = {field: f"_c{i}" for i, field in enumerate(fields)}
+    generator = _CodeGenerator(lambda field: f"{slots[field]}[_p]")
+    body = generator.generate(condition)
+    factory = eval(
+        f"lambda {', '.join(slots.values())}: lambda _p: {body}",
+        dict(generator.constants),
+    )
+    return fields, factory
@@ -0,0 +1,20 @@
+import pytest
+
+from src.decorators import confirm_action
+from src.primitive_db.cache import table_cache
+from src.primitive_db.core import select_cacher
+from src.primitive_db.transaction import current_transaction, rollback_transaction
+
+
+@pytest.fixture(autouse=True)
+def database(tmp_path, monkeypatch):
+    """Каждый тест работает с пустой базой во временном каталоге"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(confirm_action, 'answer', True)
+    table_cache.clear()
+    select_cacher.invalidate()
+    yield tmp_path
+    if current_transaction() is not None:
+        rollback_transaction()
+    table_cache.clear()
+    select_cacher.invalidate()
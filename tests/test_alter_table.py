@@ -0,0 +1,122 @@
+import json
+import os
+
+import pytest
+
+from src.primitive_db.api import connect
+from src.primitive_db.binary_storage import open_binary_table
+from src.primitive_db.cache import table_cache
+from src.primitive_db.core import set_storage
+from src.primitive_db.engine import execute_statement
+from src.primitive_db.errors import ColumnNotFoundError, ValidationError
+from src.primitive_db.indexes import index_filepath
+from src.primitive_db.utils import (
+    METADATA_FILE,
+    load_metadata,
+    save_metadata,
+    table_binary_filepath,
+    table_filepath,
+    table_log_filepath,
+)
+
+STORAGES = ['json', 'log', 'binary']
+
+
+def make_table(db, storage):
+    db.execute("create_table u name:str age:int")
+    if storage != 'json':
+        metadata = load_metadata(METADATA_FILE)
+        save_metadata(METADATA_FILE, set_storage(metadata, 'u', storage))
+    db.executemany("insert u ? ?", [(f"user{i}", i) for i in range(4)])
+    db.execute("create_index u age")
+
+
+def stored_columns(storage):
+    """Столбцы, физически записанные в файлы таблицы"""
+    if storage == 'binary':
+        return open_binary_table(table_binary_filepath('u')).names
+    with open(table_filepath('u'), encoding='utf-8') as file:
+        records = json.load(file)
+    if storage == 'log' and os.path.exists(table_log_filepath('u')):
+        with open(table_log_filepath('u'), encoding='utf-8') as file:
+            records += [json.loads(line)['row'] for line in file if '"row"' in line]
+    names = []
+    for record in records:
+        names.extend(name for name in record if name not in names)
+    return names
+
+
+def pending():
+    return load_metadata(METADATA_FILE)['tables']['u'].get('pending')
+
+
+@pytest.mark.parametrize('storage', STORAGES)
+def test_add_column_defaults_until_compact(storage):
+    with connect() as db:
+        make_table(db, storage)
+        db.execute("alter_table u add score:int default 5")
+        db.execute("alter_table u add note:str")
+        assert 'score' not in stored_columns(storage)
+        db.execute("insert u ? ? ? ?", ("new", 9, 7, "n"))
+
+        expected = [
+            {'id': i + 1, 'name': f"user{i}", 'age': i, 'score': 5, 'note': None}
+            for i in range(4)
+        ] + [{'id': 5, 'name': "new", 'age': 9, 'score': 7, 'note': "n"}]
+        assert db.execute("select from u").fetchall() == expected
+        assert db.execute("select count(*) from u where score = 5").scalar() == 4
+        db.execute("update u set score = ? where id = ?", (6, 1))
+        expected[0]['score'] = 6
+
+        execute_statement("compact u")
+        assert pending() is None
+        assert stored_columns(storage) == ['id', 'name', 'age', 'score', 'note']
+        table_cache.clear()
+        assert db.execute("select from u").fetchall() == expected
+
+
+@pytest.mark.parametrize('storage', STORAGES)
+def test_drop_column_removes_index_and_blocks_readd(storage):
+    with connect() as db:
+        make_table(db, storage)
+        assert os.path.exists(index_filepath('u', 'age'))
+        db.execute("alter_table u drop age")
+
+        assert not os.path.exists(index_filepath('u', 'age'))
+        table_info = load_metadata(METADATA_FILE)['tables']['u']
+        assert 'age' not in table_info.get('indexes', {})
+        assert pending() == {'add': {}, 'drop': ['age']}
+        assert db.execute("select from u where id = 2").fetchall() == [
+            {'id': 2, 'name': "user1"}
+        ]
+        with pytest.raises(ColumnNotFoundError):
+            db.execute("select from u where age = 1")
+        db.execute("insert u ?", ("new",))
+
+        with pytest.raises(ValidationError, match="compact u"):
+            db.execute("alter_table u add age:int")
+
+        execute_statement("compact u")
+        assert stored_columns(storage) == ['id', 'name']
+        # старые значения удалённого столбца не возвращаются
+        db.execute("alter_table u add age:int default 0")
+        assert db.execute("select age from u").fetchall() == [{'age': 0}] * 5
+        db.execute("create_index u age")
+        assert db.execute("select count(*) from u where age = 0").scalar() == 5
+
+
+@pytest.mark.parametrize('storage', STORAGES)
+def test_drop_column_added_before_compact(storage):
+    """Столбец, добавленный и записанный в файлы строкой после add, при drop
+    скрывается и в старых, и в новых строках"""
+    with connect() as db:
+        make_table(db, storage)
+        db.execute("alter_table u add flag:bool default true")
+        db.execute("insert u ? ? ?", ("new", 9, False))
+        db.execute("alter_table u drop flag")
+        assert pending() == {'add': {}, 'drop': ['flag']}
+        assert [sorted(row) for row in db.execute("select from u")] == [
+            ['age', 'id', 'name']
+        ] * 5
+        execute_statement("compact u")
+        assert stored_columns(storage) == ['id', 'name', 'age']
@@ -0,0 +1,50 @@
+import pytest
+
+from src.primitive_db import api
+from src.primitive_db.api import connect
+from src.primitive_db.errors import ColumnNotFoundError
+
+
+@pytest.mark.parametrize('sql', [
+    "select from u where nosuch = 1",
+    "select name from u where age > 1 and nosuch = 1",
+    "select count(*) from u where not nosuch in (1, 2)",
+    "update u set age = 5 where nosuch = 1",
+    "delete u where nosuch = 1",
+])
+def test_unknown_where_column(sql):
+    with connect() as db:
+        db.execute("create_table u name:str age:int")
+        db.execute("insert u ? ?", ("a", 1))
+        with pytest.raises(ColumnNotFoundError, match="nosuch"):
+            db.execute(sql).fetchall()
+        assert db.execute("select count(*) from u where age = 1").scalar() == 1
+
+
+def test_prepared_plan_depends_on_parameters(monkeypatch):
+    """Узкий диапазон идёт по индексу, широкий — полным просмотром,
+    хотя команда одна; повтор с теми же границами берёт план из кэша"""
+    planned = []
+    plan_query = api.plan_query
+
+    def spy(*args):
+        plan = plan_query(*args)
+        planned.append(plan['access'])
+        return plan
+
+    monkeypatch.setattr(api, 'plan_query', spy)
+    with connect() as db:
+        db.execute("create_table u name:str age:int")
+        db.executemany("insert u ? ?", [(f"user{i}", i) for i in range(1000)])
+        db.execute("create_index u age sorted")
+        statement = db.prepare("select count(*) from u where age >= ?")
+
+        assert statement.execute((995,)).scalar() == 5
+        assert statement.execute((0,)).scalar() == 1000
+        assert statement.execute((995,)).scalar() == 5
+        assert planned == ['index_range', 'full_scan']
+
+        by_name = db.prepare("select count(*) from u where age >= ? and name = ?")
+        by_name.execute((0, "user1"))
+        by_name.execute((0, "user2"))
+        assert planned[2:] == ['full_scan']
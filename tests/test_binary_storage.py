@@ -0,0 +1,132 @@
+import json
+
+import pytest
+
+from src.primitive_db.api import connect
+from src.primitive_db.binary_storage import (
+    MAGIC,
+    MappedTable,
+    open_binary_table,
+    write_binary_table,
+)
+from src.primitive_db.cache import table_cache
+from src.primitive_db.core import export_json, import_json, set_engine, set_storage
+from src.primitive_db.utils import (
+    METADATA_FILE,
+    load_metadata,
+    load_table_data,
+    save_metadata,
+    table_binary_filepath,
+)
+
+COLUMNS = [('id', 'int'), ('name', 'str'), ('age', 'int'), ('ok', 'bool')]
+RECORDS = [
+    {'id': 1, 'name': "Анна", 'age': 30, 'ok': True},
+    {'id': 2, 'name': None, 'age': None, 'ok': None},
+    {'id': 3, 'name': "", 'age': -2 ** 63, 'ok': False},
+    {'id': 4, 'name': "Анна", 'age': 2 ** 63 - 1, 'ok': True},
+] + [
+    {'id': i, 'name': f"user{i % 3}", 'age': i, 'ok': i % 2 == 0}
+    for i in range(5, 20)
+]
+
+
+def test_write_and_map_round_trip():
+    write_binary_table('t.bin', RECORDS, COLUMNS)
+    with open('t.bin', 'rb') as file:
+        assert file.read(4) == MAGIC
+
+    table = open_binary_table('t.bin')
+    assert isinstance(table, MappedTable)
+    assert len(table) == len(RECORDS)
+    # точечное чтение из mmap и декодированный столбец дают одно и то же
+    assert [table.value('age', p) for p in range(len(table))] == [
+        record['age'] for record in RECORDS
+    ]
+    assert table.column_values('name') == [record['name'] for record in RECORDS]
+    assert list(table) == RECORDS
+    assert table.scan_equal('name', "Анна") == [0, 3]
+    assert table.scan_equal('ok', None) == [1]
+
+
+def test_not_a_binary_table():
+    with open('t.bin', 'wb') as file:
+        file.write(b'JSON' + bytes(20))
+    with pytest.raises(ValueError, match="PDBB"):
+        open_binary_table('t.bin')
+
+
+def binary_table(db):
+    db.execute("create_table u name:str age:int ok:bool")
+    metadata = load_metadata(METADATA_FILE)
+    save_metadata(METADATA_FILE, set_storage(metadata, 'u', 'binary'))
+    db.executemany(
+        "insert u ? ? ?", [(f"user{i}", i, i % 2 == 0) for i in range(10)]
+    )
+
+
+def stored_rows():
+    table_cache.clear()
+    table_info = load_metadata(METADATA_FILE)['tables']['u']
+    table_data = load_table_data('u', table_info)
+    assert isinstance(table_data, MappedTable)
+    return list(table_data)
+
+
+def test_binary_table_update_and_delete():
+    with connect() as db:
+        binary_table(db)
+        db.execute("update u set name = ?, ok = ? where age >= ?", ("Ёж", None, 7))
+        db.execute("delete u where age < ?", (3,))
+        expected = [
+            {'id': i + 1, 'name': f"user{i}", 'age': i, 'ok': i % 2 == 0}
+            for i in range(3, 7)
+        ] + [
+            {'id': i + 1, 'name': "Ёж", 'age': i, 'ok': False} for i in range(7, 10)
+        ]
+        assert stored_rows() == expected
+        with open(table_binary_filepath('u'), 'rb') as file:
+            assert file.read(4) == MAGIC
+
+        db.execute("insert u ? ? ?", ("new", 100, True))
+        assert stored_rows()[-1] == {'id': 11, 'name': "new", 'age': 100, 'ok': True}
+
+
+@pytest.mark.parametrize('storage', ['json', 'binary', 'columnar'])
+def test_import_json_checks_types(storage, capsys):
+    """Значение не того типа отклоняет весь файл с ValidationError,
+    а не попадает в таблицу как есть или падает TypeError"""
+    with connect() as db:
+        binary_table(db)
+        metadata = load_metadata(METADATA_FILE)
+        if storage == 'columnar':
+            metadata = set_storage(metadata, 'u', 'json')
+            metadata = set_engine(metadata, 'u', 'columnar')
+        elif storage == 'json':
+            metadata = set_storage(metadata, 'u', 'json')
+        save_metadata(METADATA_FILE, metadata)
+        before = db.execute("select from u").fetchall()
+
+        with open('bad.json', 'w', encoding='utf-8') as file:
+            json.dump([
+                {'id': 1, 'name': "a", 'age': "7", 'ok': "true"},
+                {'id': 2, 'name': "b", 'age': "x", 'ok': False},
+                {'id': "z", 'name': "c", 'age': 1, 'ok': False},
+            ], file)
+        capsys.readouterr()
+        assert import_json(metadata, 'u', 'bad.json') is None
+        output = capsys.readouterr().out
+        assert "ошибок: 2" in output
+        assert "запись 2: Столбец 'age': ожидается тип 'int', получено 'x'" in output
+        assert "запись 3: Столбец 'id'" in output
+        assert db.execute("select from u").fetchall() == before
+
+        assert export_json(metadata, 'u', 'dump.json') == 'dump.json'
+        with open('dump.json', encoding='utf-8') as file:
+            dumped = json.load(file)
+        dumped[0]['age'] = "41"
+        with open('dump.json', 'w', encoding='utf-8') as file:
+            json.dump(dumped, file)
+        import_json(metadata, 'u', 'dump.json')
+        before[0]['age'] = 41
+        assert db.execute("select from u").fetchall() == before
@@ -0,0 +1,107 @@
+import json
+import os
+
+import pytest
+
+from src.primitive_db.api import connect
+from src.primitive_db.cache import table_cache
+from src.primitive_db.core import bulk_insert
+from src.primitive_db.engine import execute_statement
+from src.primitive_db.utils import (
+    METADATA_FILE,
+    load_metadata,
+    table_sequence_filepath,
+)
+
+
+def rows():
+    with connect() as db:
+        return db.execute("select from u").fetchall()
+
+
+def write(filepath, text):
+    with open(filepath, 'w', encoding='utf-8') as file:
+        file.write(text)
+
+
+@pytest.fixture
+def table():
+    execute_statement("create_table u name:str age:int ok:bool")
+
+
+@pytest.mark.parametrize('text', [
+    "id,name,age,ok\n70,Анна,30,true\n71,\"Б, мл.\",7,false\n",
+    "name,age,ok\nАнна,30,true\n\"Б, мл.\",7,false\n",
+    "Анна,30,true\n\"Б, мл.\",7,false\n",
+])
+def test_import_csv(table, text):
+    """Заголовок с именами столбцов пропускается; id из файла отбрасывается —
+    id выдаёт счётчик таблицы"""
+    write('rows.csv', text)
+    execute_statement("import u rows.csv")
+    assert rows() == [
+        {'id': 1, 'name': "Анна", 'age': 30, 'ok': True},
+        {'id': 2, 'name': "Б, мл.", 'age': 7, 'ok': False},
+    ]
+
+
+def test_import_jsonl_reports_rejected_rows(table, capsys):
+    write('rows.jsonl', "\n".join([
+        json.dumps({'name': "a", 'age': 1, 'ok': True}),
+        json.dumps({'name': "b", 'age': "x", 'ok': True}),
+        "",
+        json.dumps(["c", "3", "no"]),
+        json.dumps(["d", 4]),
+        json.dumps({'ok': "maybe", 'age': 5, 'name': "e"}),
+    ]) + "\n")
+    capsys.readouterr()
+    execute_statement("import u rows.jsonl")
+    output = capsys.readouterr().out
+    assert "строка 2: Столбец 'age': ожидается тип 'int', получено 'x'" in output
+    assert "строка 4: Ожидается 3 значений, получено 2" in output
+    assert "строка 5: Столбец 'ok': неверное булево значение 'maybe'" in output
+    assert "добавлено 2 записей (отклонено 3)" in output
+    assert rows() == [
+        {'id': 1, 'name': "a", 'age': 1, 'ok': True},
+        {'id': 2, 'name': "c", 'age': 3, 'ok': False},
+    ]
+
+
+def test_import_unknown_format(table, capsys):
+    write('rows.txt', "a,1,true\n")
+    execute_statement("import u rows.txt")
+    assert "нужен .csv или .jsonl" in capsys.readouterr().out
+    assert rows() == []
+
+
+def test_bulk_insert_batches_and_indexes(table):
+    execute_statement("create_index u age")
+    metadata = load_metadata(METADATA_FILE)
+    inserted = bulk_insert(
+        metadata, 'u',
+        ([f"user{i}", i % 7, i % 2 == 0] for i in range(25)),
+        batch_size=4,
+    )
+    assert inserted == 25
+    with connect() as db:
+        assert [row['id'] for row in db.execute("select id from u where age = 3")] == [
+            4, 11, 18, 25
+        ]
+    assert [row['id'] for row in rows()] == list(range(1, 26))
+
+
+def test_ids_not_reused_after_delete(table):
+    """Счётчик data/<таблица>.seq не уменьшается при удалении строк,
+    в том числе последних, и переживает перезапуск процесса"""
+    with connect() as db:
+        db.executemany("insert u ? ? ?", [("a", 1, True), ("b", 2, True)])
+        db.execute("delete u where name = ?", ("b",))
+        assert db.execute("insert u ? ? ?", ("c", 3, True)).lastrowid == 3
+        db.execute("delete u where age >= ?", (0,))
+    assert os.path.exists(table_sequence_filepath('u'))
+
+    table_cache.clear()
+    bulk_insert(load_metadata(METADATA_FILE), 'u', [["d", 4, True], ["e", 5, False]])
+    write('rows.csv', "f,6,true\n")
+    execute_statement("import u rows.csv")
+    assert [row['id'] for row in rows()] == [4, 5, 6]
@@ -0,0 +1,82 @@
+import json
+import os
+
+from src.primitive_db.api import connect
+from src.primitive_db.cache import TableCache, file_signature, table_cache
+from src.primitive_db.utils import (
+    METADATA_FILE,
+    load_metadata,
+    load_table_data,
+    table_filepath,
+    table_generation,
+)
+
+
+def test_lru_eviction_by_bytes():
+    cache = TableCache(max_bytes=100)
+    cache.put('a', ('sa',), "A", size=40)
+    cache.put('b', ('sb',), "B", size=40)
+    assert cache.get('a', ('sa',)) == "A"
+    cache.put('c', ('sc',), "C", size=40)
+
+    # вытесняется давно неиспользованная b, а не прочитанная только что a
+    assert cache.get('b', ('sb',)) is None
+    assert cache.get('a', ('sa',)) == "A"
+    assert cache.get('c', ('sc',)) == "C"
+    stats = cache.stats()
+    assert (stats['entries'], stats['bytes'], stats['evictions']) == (2, 80, 1)
+    assert (stats['hits'], stats['misses']) == (3, 1)
+
+    cache.resize(50)
+    assert cache.stats()['entries'] == 1
+    assert cache.get('c', ('sc',)) == "C"
+
+
+def test_stale_signature_and_generation():
+    cache = TableCache(max_bytes=100)
+    assert cache.generation('t') == 0
+    value = ["строки"]
+    cache.put('t', ((1, 10),), value)
+    assert cache.get('t', ((2, 10),)) is None
+    assert cache.signature('t', value) == ((1, 10),)
+    assert cache.signature('t', list(value)) is None
+
+    # значение больше лимита не кэшируется, но поколение всё равно растёт
+    cache.put('t', ((2, 500),), value)
+    assert cache.generation('t') == 2
+    assert cache.get('t', ((2, 500),)) is None
+    assert cache.stats()['bytes'] == 0
+
+    cache.put('t', ((3, 10),), value)
+    cache.invalidate('t')
+    assert cache.get('t', ((3, 10),)) is None
+    assert cache.generation('t') == 3
+
+
+def rewrite(filepath, data):
+    """Внешнее изменение файла другим процессом"""
+    signature = file_signature(filepath)
+    with open(filepath, 'w', encoding='utf-8') as file:
+        json.dump(data, file)
+    mtime_ns = signature[0][0] + 1_000_000_000
+    os.utime(filepath, ns=(mtime_ns, mtime_ns))
+
+
+def test_table_reloaded_after_external_change():
+    with connect() as db:
+        db.execute("create_table u name:str")
+        db.execute("insert u ?", ("a",))
+    table_info = load_metadata(METADATA_FILE)['tables']['u']
+    table_data = load_table_data('u', table_info)
+    generation = table_generation('u')
+    assert load_table_data('u', table_info) is table_data
+
+    rewrite(table_filepath('u'), [{'id': 1, 'name': "b"}])
+    assert load_table_data('u', table_info) == [{'id': 1, 'name': "b"}]
+    assert table_generation('u') == generation + 1
+
+    metadata = load_metadata(METADATA_FILE)
+    assert load_metadata(METADATA_FILE) is metadata
+    rewrite(METADATA_FILE, {'tables': {}})
+    assert load_metadata(METADATA_FILE) == {'tables': {}}
+    assert table_cache.stats()['hits'] >= 2
@@ -0,0 +1,71 @@
+from src.primitive_db.api import connect
+from src.primitive_db.core import set_engine, set_storage
+from src.primitive_db.utils import METADATA_FILE, load_metadata, save_metadata
+
+QUERIES = [
+    ("ok = 2", ()),
+    ("ok = -1", ()),
+    ("ok = 1", ()),
+    ("ok = 0", ()),
+    ("ok = true", ()),
+    ("ok = false", ()),
+    ("ok = ?", (None,)),
+    ("age = 3", ()),
+    ("age = true", ()),
+    ("age = 'x'", ()),
+    ("age = ?", (None,)),
+    ("name = 'user3'", ()),
+    ("name = 3", ()),
+    ("name = ?", (None,)),
+    ("flag = ?", (None,)),
+    ("flag = true", ()),
+    ("flag = 2", ()),
+    ("size = ?", (None,)),
+    ("size = 5", ()),
+    ("note = ?", (None,)),
+    ("note = 'n1'", ()),
+    ("age = 1 and ok = 2", ()),
+    ("age = 1 and ok = 0", ()),
+]
+
+
+def fill(db):
+    """Строки со значениями всех типов и None в столбцах, добавленных
+    alter_table после первых вставок"""
+    db.execute("create_table u name:str age:int ok:bool")
+    db.executemany(
+        "insert u ? ? ?", [(f"user{i}", i % 4, i % 3 == 0) for i in range(12)]
+    )
+    db.execute("alter_table u add flag:bool")
+    db.execute("alter_table u add size:int")
+    db.execute("alter_table u add note:str")
+    db.executemany(
+        "insert u ? ? ? ? ? ?",
+        [(f"more{i}", i, i % 2 == 0, i % 2 == 1, i + 4, f"n{i}") for i in range(4)],
+    )
+
+
+def results(db):
+    return [
+        sorted(row['id'] for row in db.execute(f"select id from u where {where}",
+                                               params))
+        for where, params in QUERIES
+    ]
+
+
+def test_columnar_equality_matches_rows_engine():
+    """Поиск равенства колоночного движка и бинарной таблицы находит те же
+    строки, что и сравнение == строкового: ok = 2 не совпадает с True"""
+    with connect() as db:
+        fill(db)
+        by_rows = results(db)
+        metadata = set_engine(load_metadata(METADATA_FILE), 'u', 'columnar')
+        save_metadata(METADATA_FILE, metadata)
+        assert results(db) == by_rows
+        save_metadata(METADATA_FILE, set_storage(metadata, 'u', 'binary'))
+        assert results(db) == by_rows
+
+    assert by_rows[0] == by_rows[1] == []
+    assert by_rows[2] == by_rows[4] and by_rows[3] == by_rows[5]
+    assert len(by_rows[2]) == 6
+    assert by_rows[14] == list(range(1, 13))
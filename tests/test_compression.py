@@ -0,0 +1,161 @@
+import io
+import json
+import os
+
+import pytest
+
+from src.primitive_db import engine, utils
+from src.primitive_db.backup import BACKUP_SUFFIX, MANIFEST_FILE
+from src.primitive_db.cache import table_cache
+from src.primitive_db.compression import (
+    iter_frames,
+    read_header,
+    read_records,
+    record_chunks,
+    write_frames,
+)
+from src.primitive_db.engine import execute_statement
+from src.primitive_db.utils import METADATA_FILE, load_metadata
+
+
+def compressed(records, rows):
+    file = io.BytesIO()
+    write_frames(file, record_chunks(records, rows), 'zlib')
+    return file.getvalue()
+
+
+def test_read_records_stops_after_limit():
+    """Кадры после limit-й записи не распаковываются: порча хвоста потока
+    не мешает прочитать начало"""
+    records = [{'id': i} for i in range(100)]
+    data = compressed(records, rows=10)
+    damaged = data[:-5] + b'\0' * 5
+
+    file = io.BytesIO(damaged)
+    codec, _ = read_header(file)
+    assert read_records(file, codec, limit=25) == records[:25]
+
+    file = io.BytesIO(damaged)
+    read_header(file)
+    with pytest.raises(ValueError):
+        read_records(file, codec)
+
+
+def test_select_limit_reads_compressed_head(capsys, monkeypatch):
+    for statement in (
+        "create_table u name:str age:int",
+        'insert u "a" 1', 'insert u "b" 2', 'insert u "c" 3',
+        "set_compression u zlib",
+    ):
+        execute_statement(statement)
+    table_cache.clear()
+    capsys.readouterr()
+
+    def load_table_data(*args):
+        raise AssertionError("таблица читается целиком")
+
+    # таблица целиком не читается
+    monkeypatch.setattr(utils, 'load_table_data', load_table_data)
+    monkeypatch.setattr(engine, 'load_table_data', load_table_data)
+    execute_statement("select u limit 1 offset 1")
+    output = capsys.readouterr().out
+    assert "| 2  |  b   |  2  |" in output and "Всего записей: 1" in output
+
+
+@pytest.mark.parametrize('codec', ['zlib', 'lzma'])
+def test_frames_round_trip_and_lazy_read(codec):
+    records = [{'id': i, 'name': f"имя{i}", 'ok': i % 2 == 0} for i in range(95)]
+    file = io.BytesIO()
+    total = write_frames(file, record_chunks(records, rows=10), codec)
+    assert file.getvalue().startswith(b'PDBZ')
+
+    file.seek(0)
+    assert read_header(file) == (codec, total)
+    assert read_records(file, codec) == records
+
+    # limit внутри первого кадра: дальше первого кадра поток не читается
+    file.seek(0)
+    read_header(file)
+    assert read_records(file, codec, limit=5) == records[:5]
+    first_frame_end = file.tell()
+    file.seek(0)
+    read_header(file)
+    next(iter_frames(file, codec))
+    assert first_frame_end == file.tell() < len(file.getvalue())
+
+
+def test_uncompressed_file_has_no_header():
+    file = io.BytesIO(b'[{"id": 1}]')
+    assert read_header(file) is None
+    assert file.tell() == 0
+
+
+def make_database():
+    for statement in (
+        "create_table u name:str age:int",
+        'insert u "a" 1', 'insert u "b" 2',
+        "create_index u age",
+        "set_compression u lzma",
+    ):
+        execute_statement(statement)
+
+
+def table_rows(capsys):
+    capsys.readouterr()
+    execute_statement("select u")
+    return capsys.readouterr().out
+
+
+def test_backup_and_restore(capsys):
+    make_database()
+    before = table_rows(capsys)
+    assert "|  a   |  1  |" in before
+    execute_statement("backup copy")
+    assert os.path.exists(os.path.join('copy', 'data', 'u.json' + BACKUP_SUFFIX))
+
+    execute_statement('insert u "c" 3')
+    execute_statement("create_table v x:int")
+    execute_statement("restore copy")
+    assert table_rows(capsys) == before
+    assert load_metadata(METADATA_FILE)['tables'].keys() == {'u'}
+
+
+def corrupt_one_byte(filepath):
+    with open(filepath, 'r+b') as file:
+        data = file.read()
+        file.seek(len(data) - 1)
+        file.write(bytes([data[-1] ^ 0xFF]))
+
+
+def change_manifest_digest(directory):
+    filepath = os.path.join(directory, MANIFEST_FILE)
+    with open(filepath, encoding='utf-8') as file:
+        manifest = json.load(file)
+    info = manifest['files'][os.path.join('data', 'u.json')]
+    info['sha256'] = '0' * 64
+    with open(filepath, 'w', encoding='utf-8') as file:
+        json.dump(manifest, file)
+
+
+@pytest.mark.parametrize('damage', [
+    lambda: corrupt_one_byte(os.path.join('copy', 'data', 'u.json' + BACKUP_SUFFIX)),
+    lambda: change_manifest_digest('copy'),
+], ids=['byte', 'sha256'])
+def test_restore_refuses_damaged_backup(damage, capsys):
+    """Копия с испорченным байтом или не совпавшим sha256 не восстанавливается:
+    база остаётся как была, временных файлов не остаётся"""
+    make_database()
+    execute_statement("backup copy")
+    execute_statement('insert u "c" 3')
+    before = table_rows(capsys)
+    damage()
+
+    execute_statement("restore copy")
+    output = capsys.readouterr().out
+    assert "повреждён" in output and "База восстановлена" not in output
+    assert table_rows(capsys) == before
+    leftovers = [
+        name for directory in ('.', 'data') for name in os.listdir(directory)
+        if name.endswith('.restore')
+    ]
+    assert leftovers == []
@@ -0,0 +1,13 @@
+import multiprocessing
+
+from benchmarks.concurrency import id_safety
+
+
+def test_concurrent_indexed_writes(capsys):
+    """Писатели и читатели одной таблицы с индексами: все строки сохранены,
+    ни один процесс не упал, индексы на диске совпадают с таблицей"""
+    context = multiprocessing.get_context('spawn')
+    for storage in ('log', 'json'):
+        assert id_safety(
+            context, storage, writers=3, rows_per_writer=30, readers=2, indexed=True
+        ), capsys.readouterr().out
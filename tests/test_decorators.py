@@ -0,0 +1,40 @@
+import threading
+
+from src.decorators import create_cacher
+
+
+def test_cacher_is_silent_and_counts(capsys):
+    cacher = create_cacher()
+    assert cacher(('u', 1), lambda: [1, 2]) == [1, 2]
+    assert cacher(('u', 1), lambda: [3]) == [1, 2]
+    assert capsys.readouterr().out == ""
+    stats = cacher.stats()
+    assert (stats['hits'], stats['misses'], stats['entries']) == (1, 1, 1)
+    cacher.invalidate('u')
+    assert cacher.stats()['entries'] == 0
+
+
+def test_cacher_threads():
+    """Одновременные get/put/invalidate из потоков сервера"""
+    cacher = create_cacher(max_entries=16)
+    errors = []
+
+    def work(number):
+        try:
+            for i in range(2000):
+                key = (f"t{i % 3}", i % 40)
+                assert cacher(key, lambda: [number, i % 40])[1] == i % 40
+                if i % 50 == 0:
+                    cacher.invalidate(key[0])
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=work, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    stats = cacher.stats()
+    assert stats['entries'] <= 16
+    assert stats['hits'] + stats['misses'] == 8 * 2000
@@ -0,0 +1,96 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from src.primitive_db import core
+from src.primitive_db.engine import execute_statement, split_statement
+from src.primitive_db.utils import METADATA_FILE, load_metadata, load_table_data
+
+
+def run(*statements):
+    for statement in statements:
+        execute_statement(statement)
+
+
+def rows(table_name):
+    table_info = load_metadata(METADATA_FILE)['tables'][table_name]
+    return [dict(record) for record in load_table_data(table_name, table_info)]
+
+
+def test_update_checks_set_columns_and_types(capsys):
+    run(
+        "create_table u name:str age:int",
+        'insert u "a" 1',
+        "set_engine u columnar",
+    )
+    capsys.readouterr()
+    run("update u set age = 'x'", "update u set nosuch = 5")
+    output = capsys.readouterr().out
+    assert "Столбец 'age': ожидается тип 'int', получено 'x'" in output
+    assert "Столбцы ['nosuch'] не существуют в таблице 'u'" in output
+    assert "Обновлено" not in output
+    assert rows('u') == [{'id': 1, 'name': 'a', 'age': 1}]
+
+    run("update u set age = '7' where name = 'a'")
+    assert rows('u') == [{'id': 1, 'name': 'a', 'age': 7}]
+
+
+def test_select_where_streams_large_results(capsys, monkeypatch):
+    """select с WHERE без limit: маленький результат кэшируется, большой
+    выводится потоково и в кэш не попадает"""
+    monkeypatch.setattr(core, 'SELECT_CACHE_MAX_ROWS', 3)
+    run("create_table u name:str age:int")
+    for i in range(6):
+        run(f'insert u "user{i}" {i}')
+    capsys.readouterr()
+    hits = core.select_cacher.stats()['hits']
+
+    run("select from u where age < 2", "select from u where age < 2")
+    assert capsys.readouterr().out.count("Всего записей: 2") == 2
+    assert core.select_cacher.stats()['hits'] == hits + 1
+
+    run("select from u where age >= 1", "select from u where age >= 1")
+    assert capsys.readouterr().out.count("Всего записей: 5") == 2
+    stats = core.select_cacher.stats()
+    assert (stats['hits'], stats['entries']) == (hits + 1, 1)
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_list_tables_does_not_import_core(tmp_path):
+    """`database -c list_tables` не загружает core и shlex"""
+    code = (
+        "import sys; from src.primitive_db.engine import run_statements; "
+        "run_statements(['create_table u name:str', 'list_tables']); "
+        "print(sorted(sys.modules.keys() & {'src.primitive_db.core', 'shlex'}))"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code], cwd=tmp_path,
+        env={**os.environ, 'PYTHONPATH': ROOT}, capture_output=True, text=True,
+        check=True,
+    ).stdout.splitlines()
+    assert "  - u" in output
+    assert output[-1] == "['src.primitive_db.core']"
+
+    code = code.replace("'create_table u name:str', ", "")
+    output = subprocess.run(
+        [sys.executable, "-c", code], cwd=tmp_path,
+        env={**os.environ, 'PYTHONPATH': ROOT}, capture_output=True, text=True,
+        check=True,
+    ).stdout.splitlines()
+    assert output == ["Таблицы в базе данных:", "  - u", "[]"]
+
+
+@pytest.mark.parametrize('statement', [
+    'insert u "a b" 1',
+    "select u where name = 'x y'",
+    'insert u "say \\"hi\\"" 2',
+    "update u set age = 5 where id = 1",
+    "  list_tables  ",
+])
+def test_split_statement_matches_shlex(statement):
+    import shlex
+    assert split_statement(statement) == shlex.split(statement)
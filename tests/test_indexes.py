@@ -0,0 +1,153 @@
+import pytest
+
+from src.primitive_db import indexes
+from src.primitive_db.api import connect
+from src.primitive_db.cache import table_cache
+from src.primitive_db.core import set_storage
+from src.primitive_db.indexes import build_index, index_filepath, load_table_indexes
+from src.primitive_db.utils import (
+    METADATA_FILE,
+    load_metadata,
+    load_table_data,
+    save_metadata,
+)
+
+
+def make_table(db, storage='json', rows=20):
+    db.execute("create_table u name:str age:int ok:bool")
+    if storage != 'json':
+        metadata = load_metadata(METADATA_FILE)
+        save_metadata(METADATA_FILE, set_storage(metadata, 'u', storage))
+    db.executemany(
+        "insert u ? ? ?",
+        [(f"user{i}", i % 10, i % 2 == 0) for i in range(rows)],
+    )
+
+
+@pytest.mark.parametrize('storage', ['json', 'log', 'binary'])
+def test_index_stale_after_update_with_same_row_count(storage):
+    """Update оборвался между записью таблицы и записью индекса:
+    число строк то же, но индекс от прошлой версии не используется"""
+    with connect() as db:
+        make_table(db, storage)
+        db.execute("create_index u age")
+        filepath = index_filepath('u', 'age')
+        with open(filepath, 'rb') as file:
+            stale = file.read()
+        db.execute("update u set age = ? where name = ?", (42, "user3"))
+        with open(filepath, 'wb') as file:
+            file.write(stale)
+        table_cache.clear()
+
+        assert db.execute("select name from u where age = 42").fetchall() == [
+            {'name': 'user3'}
+        ]
+        assert db.execute("select count(*) from u where age = 3").scalar() == 1
+
+
+def test_log_insert_does_not_rewrite_index_files():
+    """Вставка в таблицу log дописывает журнал, а индекс новой версии
+    другие процессы получают, дочитав журнал"""
+    with connect() as db:
+        make_table(db, 'log')
+        db.execute("create_index u age sorted")
+        filepath = index_filepath('u', 'age')
+        with open(filepath, 'rb') as file:
+            before = file.read()
+        db.executemany("insert u ? ? ?", [("new1", 7, True), ("new2", 70, False)])
+        with open(filepath, 'rb') as file:
+            assert file.read() == before
+
+        table_cache.clear()
+        assert db.execute("select name from u where age >= 70").fetchall() == [
+            {'name': 'new2'}
+        ]
+        assert db.execute("select count(*) from u where age = 7").scalar() == 3
+        db.execute("update u set age = ? where name = ?", (71, "new1"))
+        table_cache.clear()
+        assert db.execute("select count(*) from u where age >= 70").scalar() == 2
+
+
+def test_sorted_index_batch_merge():
+    """Пачка строк вливается в sorted-индекс сортировкой, порядок тот же"""
+    with connect() as db:
+        make_table(db, rows=50)
+        db.execute("create_index u age sorted")
+        db.executemany(
+            "insert u ? ? ?", [(f"bulk{i}", i * 37 % 101, True) for i in range(300)]
+        )
+        by_index = db.execute("select id from u where age between 10 and 20")
+        ages = {row['id']: row['age'] for row in db.execute("select id, age from u")}
+        expected = sorted(id_ for id_, age in ages.items() if 10 <= age <= 20)
+        assert sorted(row['id'] for row in by_index) == expected
+
+        table_info = load_metadata(METADATA_FILE)['tables']['u']
+        table_data = load_table_data('u', table_info)
+        index = load_table_indexes('u', table_info, table_data)['age']
+        rebuilt = build_index(table_data, 'age', 'sorted')
+        assert (index['keys'], index['positions']) == (
+            rebuilt['keys'], rebuilt['positions']
+        )
+
+
+@pytest.mark.parametrize('literal', ['1', 'true'])
+def test_bool_index_matches_scan(literal):
+    """Ключ индекса сравнивает как ==: ok = 1 и ok = true по индексу
+    находят те же строки, что и полный просмотр"""
+    with connect() as db:
+        make_table(db)
+        queries = [
+            f"select count(*) from u where ok = {literal}",
+            f"select count(*) from u where ok in ({literal}, 5)",
+            f"select id from u where ok = {literal}",
+            "select ok, count(*) from u group by ok",
+        ]
+        scanned = [db.execute(query).fetchall() for query in queries]
+        db.execute("create_index u ok")
+        assert [db.execute(query).fetchall() for query in queries] == scanned
+        assert scanned[0] == [{'count(*)': 10}]
+
+
+def normalized(index):
+    """Содержимое индекса без учёта порядка позиций при равных ключах"""
+    keys = index.get('keys', [])
+    assert keys == sorted(keys)
+    return (
+        {key: sorted(positions) for key, positions in index['hash'].items()},
+        sorted(zip(keys, index.get('positions', []))), index['rows'],
+    )
+
+
+@pytest.mark.parametrize('storage', ['json', 'log', 'binary'])
+@pytest.mark.parametrize('where', [
+    "id = 1", "id = 40", "age = 3", "id >= 15 and id <= 22", "ok = true",
+    "id in (2, 3, 39, 40)", "id > 0",
+])
+def test_delete_remaps_indexes_in_place(storage, where, monkeypatch):
+    """Delete сдвигает позиции в индексах, не перестраивая их по таблице;
+    результат совпадает с индексом, построенным заново"""
+    with connect() as db:
+        make_table(db, storage, rows=40)
+        db.execute("create_index u age sorted")
+        db.execute("create_index u name")
+        db.execute("update u set age = ? where id = ?", (3, 30))
+
+        def rebuild(*args):
+            raise AssertionError("индекс перестраивается целиком")
+
+        with monkeypatch.context() as patch:
+            patch.setattr(indexes, 'build_index', rebuild)
+            deleted = db.execute(f"delete u where {where}").rowcount
+        assert deleted > 0
+
+        table_info = load_metadata(METADATA_FILE)['tables']['u']
+        table_data = load_table_data('u', table_info)
+        loaded = load_table_indexes('u', table_info, table_data)
+        for column, kind in (('age', 'sorted'), ('name', 'hash')):
+            assert normalized(loaded[column]) == normalized(
+                build_index(table_data, column, kind)
+            )
+        table_cache.clear()
+        assert db.execute("select count(*) from u where age = 3").scalar() == len(
+            [row for row in db.execute("select age from u") if row['age'] == 3]
+        )
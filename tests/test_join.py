@@ -0,0 +1,85 @@
+import pytest
+
+from src.primitive_db.api import connect
+from src.primitive_db.core import set_engine
+from src.primitive_db.utils import METADATA_FILE, load_metadata, save_metadata
+
+
+def test_join_by_index_matches_hash_join():
+    """Соединение по индексу и по хэш-таблице находит одни и те же пары,
+    в том числе для bool-ключа против int (True == 1)"""
+    with connect() as db:
+        db.execute("create_table u name:str ok:bool")
+        db.execute("create_table v label:str num:int")
+        db.executemany(
+            "insert u ? ?", [(f"user{i}", i % 3 == 0) for i in range(12)]
+        )
+        db.executemany("insert v ? ?", [(f"label{i}", i % 4) for i in range(8)])
+        query = "select u.name, v.label from u join v on u.ok = v.num"
+
+        def pairs():
+            return sorted(
+                (row['u.name'], row['v.label']) for row in db.execute(query)
+            )
+
+        hashed = pairs()
+        db.execute("create_index u ok")
+        assert pairs() == hashed
+        db.execute("create_index v num")
+        assert pairs() == hashed
+        assert len(hashed) == 4 * 2 + 8 * 2
+
+
+def nested_loop(left, right, left_key, right_key, where):
+    """Эталон: каждая строка слева сравнивается с каждой строкой справа"""
+    return sorted(
+        (a['id'], b['id'])
+        for a in left for b in right
+        if a[left_key] is not None and a[left_key] == b[right_key] and where(a, b)
+    )
+
+
+QUERIES = [
+    ("", lambda a, b: True),
+    ("where u.age > 2", lambda a, b: a['age'] > 2),
+    ("where v.num < 3 and u.age < 8", lambda a, b: b['num'] < 3 and a['age'] < 8),
+    # условие на обе таблицы проверяется после соединения
+    ("where u.age = 3 or v.id > 10", lambda a, b: a['age'] == 3 or b['id'] > 10),
+]
+
+
+@pytest.mark.parametrize('engine', ['rows', 'columnar'])
+@pytest.mark.parametrize('indexed', [(), ('u',), ('v',), ('u', 'v')])
+def test_hash_join_matches_nested_loop(engine, indexed):
+    """Хэш-соединение (по таблице или индексу, с WHERE до и после соединения)
+    находит те же пары, что и вложенный цикл; NULL-ключи не соединяются"""
+    with connect() as db:
+        db.execute("create_table u name:str age:int")
+        db.execute("create_table v label:str")
+        db.executemany("insert u ? ?", [(f"user{i}", i % 10) for i in range(40)])
+        db.executemany("insert v ?", [(f"label{i}",) for i in range(15)])
+        db.execute("alter_table v add num:int")
+        db.executemany(
+            "update v set num = ? where id = ?",
+            [(i % 6, i + 1) for i in range(15) if i % 4],
+        )
+        for table_name in ('u', 'v'):
+            if engine == 'columnar':
+                metadata = load_metadata(METADATA_FILE)
+                save_metadata(
+                    METADATA_FILE, set_engine(metadata, table_name, 'columnar')
+                )
+        if 'u' in indexed:
+            db.execute("create_index u age")
+        if 'v' in indexed:
+            db.execute("create_index v num")
+        left = db.execute("select from u").fetchall()
+        right = db.execute("select from v").fetchall()
+
+        for where, predicate in QUERIES:
+            result = db.execute(
+                f"select u.id, v.id from u join v on v.num = u.age {where}"
+            ).fetchall()
+            pairs = sorted((row['u.id'], row['v.id']) for row in result)
+            assert pairs == nested_loop(left, right, 'age', 'num', predicate)
+            assert pairs
@@ -0,0 +1,109 @@
+import json
+import os
+
+import pytest
+
+from src.primitive_db import utils
+from src.primitive_db.api import connect
+from src.primitive_db.cache import table_cache
+from src.primitive_db.core import set_storage
+from src.primitive_db.engine import execute_statement
+from src.primitive_db.utils import (
+    METADATA_FILE,
+    load_metadata,
+    save_metadata,
+    table_filepath,
+    table_log_filepath,
+)
+
+
+@pytest.fixture
+def db():
+    with connect() as db:
+        db.execute("create_table u name:str age:int")
+        metadata = load_metadata(METADATA_FILE)
+        save_metadata(METADATA_FILE, set_storage(metadata, 'u', 'log'))
+        yield db
+
+
+def journal():
+    with open(table_log_filepath('u'), encoding='utf-8') as file:
+        return [json.loads(line) for line in file]
+
+
+def snapshot():
+    with open(table_filepath('u'), encoding='utf-8') as file:
+        return json.load(file)
+
+
+def reloaded(db):
+    """Строки таблицы, заново собранные из снимка и журнала"""
+    table_cache.clear()
+    return db.execute("select from u").fetchall()
+
+
+def test_changes_append_to_journal(db):
+    """insert, update и delete дописывают журнал, снимок не переписывается"""
+    db.execute("create_index u age")
+    db.executemany("insert u ? ?", [("a", 1), ("b", 2), ("c", 3)])
+    db.execute("update u set age = ? where name = ?", (20, "b"))
+    db.execute("delete u where name = ?", ("a",))
+
+    assert snapshot() == []
+    assert journal() == [
+        {'op': 'put', 'row': {'id': 1, 'name': "a", 'age': 1}},
+        {'op': 'put', 'row': {'id': 2, 'name': "b", 'age': 2}},
+        {'op': 'put', 'row': {'id': 3, 'name': "c", 'age': 3}},
+        {'op': 'put', 'row': {'id': 2, 'name': "b", 'age': 20}},
+        {'op': 'del', 'id': 1},
+    ]
+    expected = [
+        {'id': 2, 'name': "b", 'age': 20},
+        {'id': 3, 'name': "c", 'age': 3},
+    ]
+    assert reloaded(db) == expected
+    assert db.execute("select from u where age = 20").fetchall() == expected[:1]
+
+    db.execute("delete u")
+    assert journal()[-1] == {'op': 'clear'}
+    assert reloaded(db) == []
+
+
+def test_torn_last_line_is_skipped(db):
+    """Оборванная при сбое последняя строка журнала пропускается,
+    испорченная строка в середине — ошибка"""
+    db.executemany("insert u ? ?", [("a", 1), ("b", 2)])
+    with open(table_log_filepath('u'), 'a', encoding='utf-8') as file:
+        file.write('{"op":"put","row":{"id":3,"na')
+    assert [row['id'] for row in reloaded(db)] == [1, 2]
+
+    with open(table_log_filepath('u'), 'a', encoding='utf-8') as file:
+        file.write('\n')
+    with pytest.raises(json.JSONDecodeError):
+        utils._replay_log('u', [])
+
+
+def test_journal_compacts_when_larger_than_snapshot(db, monkeypatch):
+    monkeypatch.setattr(utils, 'LOG_COMPACT_MIN_BYTES', 200)
+    db.execute("insert u ? ?", ("a", 1))
+    assert len(journal()) == 1
+    for i in range(10):
+        db.execute("update u set age = ? where id = 1", (i,))
+        if not os.path.exists(table_log_filepath('u')):
+            break
+    # журнал перерос порог и сжат в снимок
+    assert not os.path.exists(table_log_filepath('u'))
+    assert snapshot() == [{'id': 1, 'name': "a", 'age': i}]
+    assert reloaded(db) == snapshot()
+
+
+def test_compact_command(db):
+    db.executemany("insert u ? ?", [("a", 1), ("b", 2)])
+    db.execute("delete u where id = ?", (1,))
+    execute_statement("compact u")
+    assert not os.path.exists(table_log_filepath('u'))
+    assert snapshot() == [{'id': 2, 'name': "b", 'age': 2}]
+
+    db.execute("insert u ? ?", ("c", 3))
+    assert journal() == [{'op': 'put', 'row': {'id': 3, 'name': "c", 'age': 3}}]
+    assert [row['id'] for row in reloaded(db)] == [2, 3]
@@ -0,0 +1,62 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from src.primitive_db.api import connect
+from src.primitive_db.engine import execute_statement
+from src.primitive_db.metrics import metrics
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(autouse=True)
+def clean_metrics(monkeypatch):
+    monkeypatch.setattr(metrics, 'enabled', metrics.enabled)
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+@pytest.mark.parametrize('value, enabled', [(None, False), ('0', False), ('1', True)])
+def test_metrics_are_off_by_default(value, enabled):
+    env = {k: v for k, v in os.environ.items() if k != 'PRIMITIVE_DB_METRICS'}
+    if value is not None:
+        env['PRIMITIVE_DB_METRICS'] = value
+    output = subprocess.run(
+        [sys.executable, "-c",
+         "from src.primitive_db.metrics import metrics; print(metrics.enabled)"],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    assert output.strip() == str(enabled)
+
+
+def run_queries():
+    with connect() as db:
+        db.execute("create_table u name:str age:int")
+        db.executemany("insert u ? ?", [(f"u{i}", i) for i in range(10)])
+        db.execute("select from u where age < 3").fetchall()
+
+
+def test_disabled_metrics_record_nothing():
+    metrics.enabled = False
+    run_queries()
+    snapshot = metrics.snapshot()
+    assert snapshot['histograms'] == {}
+    assert set(snapshot['counters'].values()) == {0}
+
+
+def test_stats_on_records_statements(capsys):
+    metrics.enabled = False
+    execute_statement("stats on")
+    assert metrics.enabled
+    run_queries()
+    snapshot = metrics.snapshot()
+    assert snapshot['histograms']['statement']['select']['count'] == 1
+    assert snapshot['counters']['rows_scanned'] == 10
+    assert snapshot['counters']['rows_returned'] == 3
+
+    execute_statement("stats off")
+    assert not metrics.enabled
+    assert "Метрики выключены" in capsys.readouterr().out
@@ -0,0 +1,95 @@
+import pytest
+
+from src.primitive_db.api import connect
+from src.primitive_db.core import set_engine
+from src.primitive_db.utils import METADATA_FILE, load_metadata, save_metadata
+
+# (столбец, по убыванию, limit, offset, условие)
+QUERIES = [
+    ('rank', False, None, 0, None),
+    ('rank', True, 10, 0, None),
+    ('rank', False, 5, 3, None),
+    ('rank', True, 5, 0, "rank >= 45"),
+    ('score', False, None, 0, None),
+    ('score', True, 10, 0, None),
+    ('score', False, 7, 2, "rank > 10"),
+    ('score', True, None, 0, "rank < 40"),
+    ('name', True, 3, 0, "score = 7"),
+]
+CONDITIONS = {
+    None: lambda row: True,
+    "rank >= 45": lambda row: row['rank'] >= 45,
+    "rank > 10": lambda row: row['rank'] > 10,
+    "rank < 40": lambda row: row['rank'] < 40,
+    "score = 7": lambda row: row['score'] == 7,
+}
+
+
+def fill(db):
+    """rank без NULL с повторами; score с NULL (добавлен alter_table)"""
+    db.execute("create_table u name:str rank:int")
+    db.executemany("insert u ? ?", [(f"user{i:03}", i * 37 % 50) for i in range(300)])
+    db.execute("alter_table u add score:int")
+    db.execute("begin")
+    db.executemany(
+        "update u set score = ? where id = ?",
+        [(i * 11 % 23, i + 1) for i in range(300) if i % 7],
+    )
+    db.execute("commit")
+
+
+def expected(rows, column, descending, limit, offset, condition):
+    """Полная сортировка всех строк, NULL в конце при любом направлении"""
+    matched = [row for row in rows if CONDITIONS[condition](row)]
+    present = sorted(
+        (row for row in matched if row[column] is not None),
+        key=lambda row: row[column], reverse=descending,
+    )
+    ordered = present + [row for row in matched if row[column] is None]
+    stop = None if limit is None else offset + limit
+    return [row[column] for row in ordered[offset:stop]]
+
+
+def query(column, descending, limit, offset, condition):
+    text = f"select name, {column} from u"
+    if condition is not None:
+        text += f" where {condition}"
+    text += f" order by {column}" + (" desc" if descending else "")
+    if limit is not None:
+        text += f" limit {limit} offset {offset}"
+    return text
+
+
+@pytest.mark.parametrize('engine', ['rows', 'columnar'])
+@pytest.mark.parametrize('index', [None, 'sorted'])
+def test_order_by_matches_full_sort(engine, index):
+    """Обход sorted-индекса и top-k через кучу дают тот же порядок,
+    что и полная сортировка; выводятся только выбранные столбцы"""
+    with connect() as db:
+        fill(db)
+        rows = db.execute("select from u").fetchall()
+        if engine == 'columnar':
+            metadata = load_metadata(METADATA_FILE)
+            save_metadata(METADATA_FILE, set_engine(metadata, 'u', 'columnar'))
+        if index is not None:
+            db.execute("create_index u rank sorted")
+            db.execute("create_index u score sorted")
+
+        for parameters in QUERIES:
+            column = parameters[0]
+            result = db.execute(query(*parameters)).fetchall()
+            assert [row[column] for row in result] == expected(rows, *parameters)
+            assert all(set(row) == {'name', column} for row in result)
+            names = {row['name'] for row in rows if CONDITIONS[parameters[4]](row)}
+            assert {row['name'] for row in result} <= names
+
+
+def test_projection():
+    with connect() as db:
+        fill(db)
+        assert db.execute("select score from u where id = 2").fetchall() == [
+            {'score': 11}
+        ]
+        assert db.execute("select name, id from u limit 2").fetchall() == [
+            {'name': "user000", 'id': 1}, {'name': "user001", 'id': 2},
+        ]
@@ -0,0 +1,122 @@
+import pytest
+
+from src.primitive_db import core, parallel
+from src.primitive_db.api import connect
+from src.primitive_db.binary_storage import open_binary_table, write_binary_table
+from src.primitive_db.cache import table_cache
+from src.primitive_db.columnar import ColumnarTable
+from src.primitive_db.core import select_cacher, set_storage
+from src.primitive_db.parallel import (
+    _chunk_bounds,
+    configure_parallelism,
+    parallel_positions,
+)
+from src.primitive_db.utils import METADATA_FILE, load_metadata, save_metadata
+from src.primitive_db.where import compile_where, parse_where
+
+COLUMNS = [('id', 'int'), ('name', 'str'), ('age', 'int'), ('ok', 'bool')]
+RECORDS = [
+    {
+        'id': i + 1,
+        'name': None if i % 11 == 0 else f"user{i % 13}",
+        'age': None if i % 7 == 0 else i % 90,
+        'ok': i % 3 == 0,
+    }
+    for i in range(1003)
+]
+CONDITIONS = [
+    "age > 50",
+    "age between 10 and 20 or ok = true",
+    "not ok = true and name != 'user3'",
+    "name in ('user1', 'user12') and age < 40",
+    "name like 'user1%'",
+    "age = 1000",
+]
+
+
+@pytest.fixture(autouse=True)
+def pool():
+    """Пул из двух процессов без порога строк; после теста — прежние настройки"""
+    settings = parallel.parallelism()
+    configure_parallelism(workers=2, min_rows=0)
+    yield
+    configure_parallelism(**settings)
+    parallel._reset_pool()
+
+
+def serial(condition):
+    predicate = compile_where(parse_where(condition))
+    return [position for position, record in enumerate(RECORDS) if predicate(record)]
+
+
+def test_chunk_bounds_cover_table():
+    for length, parts in [(1003, 8), (5, 4), (64, 64), (0, 2)]:
+        bounds = _chunk_bounds(length, parts)
+        positions = [p for start, stop in bounds for p in range(start, stop)]
+        assert positions == list(range(length))
+        assert all(start % 8 == 0 for start, _ in bounds)
+
+
+@pytest.mark.parametrize('source', ['columnar', 'binary'])
+def test_parallel_scan_matches_serial(source):
+    """Части, просмотренные в пуле процессов (срезы столбцов или mmap
+    бинарного файла), склеиваются в те же позиции, что и просмотр в одном потоке"""
+    if source == 'binary':
+        write_binary_table('t.bin', RECORDS, COLUMNS)
+        table_data = open_binary_table('t.bin')
+    else:
+        table_data = ColumnarTable.from_records(COLUMNS, RECORDS)
+    for condition in CONDITIONS:
+        positions = parallel_positions(table_data, parse_where(condition))
+        assert positions == serial(condition), condition
+
+
+def test_serial_fallback():
+    """None — просматривать в одном потоке: таблица rows, мало строк,
+    один процесс или файл заменён после открытия"""
+    condition = parse_where("age > 50")
+    assert parallel_positions(RECORDS, condition) is None
+    table_data = ColumnarTable.from_records(COLUMNS, RECORDS)
+    configure_parallelism(min_rows=len(RECORDS) + 1)
+    assert parallel_positions(table_data, condition) is None
+    configure_parallelism(workers=1, min_rows=0)
+    assert parallel_positions(table_data, condition) is None
+
+    configure_parallelism(workers=2)
+    write_binary_table('t.bin', RECORDS, COLUMNS)
+    table_data = open_binary_table('t.bin')
+    write_binary_table('t.bin', RECORDS[:10], COLUMNS)
+    assert parallel_positions(table_data, condition) is None
+
+    with pytest.raises(ValueError):
+        configure_parallelism(workers=0)
+
+
+def test_select_on_binary_table(monkeypatch):
+    scans = []
+
+    def spy(table_data, condition):
+        scans.append(parallel_positions(table_data, condition))
+        return scans[-1]
+
+    monkeypatch.setattr(core, 'parallel_positions', spy)
+    with connect() as db:
+        db.execute("create_table u name:str age:int ok:bool")
+        metadata = load_metadata(METADATA_FILE)
+        save_metadata(METADATA_FILE, set_storage(metadata, 'u', 'binary'))
+        db.executemany(
+            "insert u ? ? ?",
+            [(f"user{i % 13}", i % 90, i % 3 == 0) for i in range(500)],
+        )
+        # читатель в другом процессе: таблица отображается из файла через mmap
+        table_cache.clear()
+        query = "select id from u where age > 80 or ok = false"
+        parallel_result = db.execute(query).fetchall()
+        assert scans and scans[-1] is not None
+        configure_parallelism(workers=1)
+        select_cacher.invalidate()
+        assert db.execute(query).fetchall() == parallel_result
+        assert scans[-1] is None
+        assert len(parallel_result) == 500 - sum(
+            1 for i in range(500) if i % 90 <= 80 and i % 3 == 0
+        )
@@ -0,0 +1,128 @@
+import pytest
+
+from src.primitive_db.api import connect
+from src.primitive_db.engine import execute_statement
+from src.primitive_db.indexes import build_index
+from src.primitive_db.planner import (
+    analyze_table,
+    format_plan,
+    plan_order,
+    plan_query,
+)
+from src.primitive_db.where import parse_where
+
+ROWS = [
+    {'id': i + 1, 'name': f"user{i}", 'age': i % 100, 'flag': i % 2}
+    for i in range(1000)
+]
+COLUMNS = [['id', 'int'], ['name', 'str'], ['age', 'int'], ['flag', 'int']]
+INDEXES = {
+    'name': build_index(ROWS, 'name'),
+    'age': build_index(ROWS, 'age', 'sorted'),
+    'flag': build_index(ROWS, 'flag'),
+}
+
+
+def plan(text, indexes=INDEXES, statistics=None):
+    condition = None if text is None else parse_where(text)
+    return plan_query(condition, indexes, statistics, len(ROWS))
+
+
+@pytest.mark.parametrize('text, access, columns, estimated_rows', [
+    (None, 'full_scan', [], 1000),
+    ("age = 5", 'index_lookup', ['age'], 10),
+    ("age in (1, 2)", 'index_lookup', ['age'], 20),
+    # половина таблицы: выборка по индексу дороже полного просмотра
+    ("flag = 1", 'full_scan', [], 500),
+    # границы диапазона оцениваются включительно
+    ("age > 90", 'index_range', ['age'], 100),
+    ("age between 10 and 14", 'index_range', ['age'], 50),
+    ("age > 10", 'full_scan', [], 900),
+    ("name = 'user7' and flag = 1", 'index_lookup', ['name'], 0),
+    ("name = 'user7' or age < 3", 'index_range', ['name', 'age'], 41),
+    ("name = 'user7' or id = 3", 'full_scan', [], 101),
+    ("name like 'user1%'", 'full_scan', [], 100),
+    ("not age = 5", 'full_scan', [], 990),
+])
+def test_plan_query_choice(text, access, columns, estimated_rows):
+    chosen = plan(text)
+    assert (chosen['access'], chosen['columns']) == (access, columns)
+    assert chosen['estimated_rows'] == estimated_rows
+    assert chosen['cost'] <= len(ROWS)
+
+
+def test_range_needs_sorted_index():
+    indexes = {'age': build_index(ROWS, 'age')}
+    assert plan("age > 90", indexes)['access'] == 'full_scan'
+    assert plan("age = 90", indexes)['access'] == 'index_lookup'
+
+
+def test_estimates_from_analyze_statistics():
+    """Без индексов оценка берётся из статистики analyze, без неё —
+    из долей по умолчанию"""
+    statistics = analyze_table(ROWS, COLUMNS)
+    assert statistics['columns']['age'] == {'distinct': 100, 'min': 0, 'max': 99}
+    assert plan("age >= 90", {}, statistics)['estimated_rows'] == 100
+    assert plan("flag = 1", {}, statistics)['estimated_rows'] == 500
+    assert plan("age >= 90", {})['estimated_rows'] == 333
+    assert plan("age >= 90", {})['access'] == 'full_scan'
+
+
+def test_plan_order():
+    ordered = {'age': INDEXES['age']}
+    full = plan(None)
+    assert plan_order(full, None, ordered) is full
+    assert plan_order(full, ('age', False), ordered)['order'] == 'index'
+    assert plan_order(full, ('age', True), ordered, limit=5)['order'] == 'index'
+    # WHERE сужает выборку через индекс: сортируется только результат
+    assert plan_order(plan("age > 90"), ('age', False), ordered)['order'] == 'sort'
+    assert plan_order(full, ('name', False), ordered, limit=5)['order'] == 'top_k'
+    assert plan_order(full, ('name', False), ordered)['order'] == 'sort'
+
+
+def test_format_plan():
+    chosen = plan_order(plan("age > 90"), ('name', True), INDEXES, limit=3)
+    assert format_plan(chosen) == (
+        "План: диапазон по индексу (age); строк в таблице: 1000, "
+        f"оценка результата: 100, стоимость: {chosen['cost']:.1f}; "
+        "сортировка name DESC: top-k через кучу"
+    )
+
+
+def explain(capsys, statement):
+    capsys.readouterr()
+    execute_statement(f"explain {statement}")
+    return capsys.readouterr().out
+
+
+def test_explain_statements(capsys):
+    with connect() as db:
+        db.execute("create_table u name:str age:int")
+        db.executemany("insert u ? ?", [(f"user{i}", i % 50) for i in range(200)])
+        db.execute("create_index u age sorted")
+
+    output = explain(capsys, "select u where age = 3")
+    assert "План: поиск по индексу (age); строк в таблице: 200" in output
+    assert "Фактически: строк 4" in output
+
+    output = explain(
+        capsys, "select name from u where age > 47 order by age desc limit 2"
+    )
+    assert "План: диапазон по индексу (age)" in output
+    assert "сортировка age DESC: top-k через кучу" in output
+    assert "Фактически: строк 2" in output
+
+    output = explain(capsys, "select u order by age")
+    assert "План: полный просмотр; строк в таблице: 200" in output
+    assert "сортировка age: обход sorted-индекса" in output
+
+    output = explain(capsys, "update u set name = 'x' where age = 1")
+    assert "План: поиск по индексу (age)" in output
+    assert "Фактически: строк 4" in output
+
+    output = explain(capsys, "delete u where age < 10")
+    assert "План: диапазон по индексу (age)" in output
+    assert "Фактически: строк 40" in output
+    with connect() as db:
+        assert db.execute("select count(*) from u").scalar() == 160
+        assert db.execute("select count(*) from u where name = 'x'").scalar() == 0
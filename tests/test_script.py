@@ -0,0 +1,112 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from src.primitive_db import engine, transaction
+from src.primitive_db.api import connect
+from src.primitive_db.engine import read_statements, run_script
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCRIPT = """\
+-- заполнение таблицы
+create_table u name:str age:int;
+# комментарий
+insert u "a" 1
+
+insert u "b" 2;
+commit
+insert u "c" 3
+rollback
+insert u "d" 4
+delete u where age = 1
+"""
+
+
+def names():
+    with connect() as db:
+        return [row['name'] for row in db.execute("select name from u")]
+
+
+def test_read_statements():
+    assert list(read_statements(SCRIPT.splitlines())) == [
+        (2, "create_table u name:str age:int"),
+        (4, 'insert u "a" 1'),
+        (6, 'insert u "b" 2'),
+        (7, "commit"),
+        (8, 'insert u "c" 3'),
+        (9, "rollback"),
+        (10, 'insert u "d" 4'),
+        (11, "delete u where age = 1"),
+    ]
+
+
+def test_script_runs_in_one_transaction(capsys, monkeypatch):
+    """rollback отменяет команды после последнего commit (или с начала скрипта);
+    файл таблицы пишется один раз на commit, а не на каждую команду"""
+    replaced = []
+    with monkeypatch.context() as patch:
+        patch.setattr(
+            transaction.os, 'replace',
+            lambda source, target: replaced.append(target) or os.rename(source, target),
+        )
+        run_script(SCRIPT.splitlines())
+    output = capsys.readouterr().out
+    assert names() == ["b", "d"]
+    assert 'мс: insert u "c" 3' in output and "[11] " in output
+    assert "Скрипт выполнен: команд 8" in output
+    table_file = os.path.join('data', 'u.json')
+    assert sum(os.path.normpath(path) == table_file for path in replaced) == 2
+
+
+def test_interrupted_script_rolls_back(monkeypatch):
+    """Прерванный скрипт не оставляет на диске половину изменений"""
+    run_script(['create_table u name:str', 'insert u "a"'])
+    execute = engine.execute_statement
+
+    def interrupt(statement):
+        if statement == 'insert u "c"':
+            raise KeyboardInterrupt
+        return execute(statement)
+
+    with monkeypatch.context() as patch:
+        patch.setattr(engine, 'execute_statement', interrupt)
+        with pytest.raises(KeyboardInterrupt):
+            run_script(['insert u "b"', 'insert u "c"', 'insert u "d"'])
+    assert transaction.current_transaction() is None
+    assert names() == ["a"]
+
+
+def run_main(tmp_path, *options, script):
+    return subprocess.run(
+        [sys.executable, "-m", "src.primitive_db.main", *options],
+        input=script, cwd=tmp_path, env={**os.environ, 'PYTHONPATH': ROOT},
+        capture_output=True, text=True, check=True,
+    ).stdout
+
+
+@pytest.mark.parametrize('options, deleted', [
+    ((), False),
+    (("--yes",), True),
+    (("--script", "-", "-y"), True),
+])
+def test_stdin_script_confirmation(tmp_path, options, deleted):
+    """Из stdin спросить подтверждение не у кого: без --yes delete отменяется"""
+    output = run_main(tmp_path, *options, script=(
+        'create_table u name:str\ninsert u "a"\ndelete u\n'
+    ))
+    assert ("Операция отменена" in output) != deleted
+    assert "Скрипт выполнен: команд 3" in output
+    assert names() == ([] if deleted else ["a"])
+
+
+def test_script_file(tmp_path):
+    (tmp_path / "nightly.sql").write_text(
+        'create_table u name:str\ninsert u "a"\nexit\ninsert u "b"\n',
+        encoding='utf-8',
+    )
+    output = run_main(tmp_path, "--script", "nightly.sql", script="")
+    assert "Скрипт выполнен: команд 2" in output
+    assert names() == ["a"]
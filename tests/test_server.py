@@ -0,0 +1,234 @@
+import asyncio
+import json
+from contextlib import AsyncExitStack, asynccontextmanager
+from types import SimpleNamespace
+
+import pytest
+
+from src.primitive_db import server as server_module
+from src.primitive_db.client import AsyncClientPool, decode_response, encode_request
+from src.primitive_db.errors import (
+    QuerySyntaxError,
+    TableNotFoundError,
+    TransactionError,
+)
+from src.primitive_db.server import DatabaseServer, _Gate, parse_request
+
+
+def test_shutdown_with_connected_clients():
+    """Остановка сервера с подключёнными клиентами: задачи клиентов
+    отменяются и завершаются без ошибок в обработчике исключений цикла"""
+    errors = []
+
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        loop.set_exception_handler(lambda loop, context: errors.append(context))
+        server = DatabaseServer(workers=2)
+        address = loop.create_future()
+        serving = asyncio.create_task(
+            server.serve('127.0.0.1', 0, lambda *bound: address.set_result(bound))
+        )
+        host, port = await address
+        clients = [await asyncio.open_connection(host, port) for _ in range(3)]
+        reader, writer = clients[0]
+        writer.write(b'create_table u name:str\n')
+        assert json.loads(await reader.readline())['ok']
+        assert server.clients == 3
+
+        serving.cancel()
+        try:
+            await serving
+        except asyncio.CancelledError:
+            pass
+        assert server.clients == 0
+        for reader, writer in clients:
+            assert await reader.read() == b''
+            writer.close()
+
+    asyncio.run(scenario())
+    assert errors == []
+
+
+@pytest.mark.parametrize('line, request_', [
+    (b'list u\n', (None, "list u", (), None)),
+    ('{"id": 7, "sql": "select u where id = ?", "params": [1]}'.encode(),
+     (7, "select u where id = ?", [1], None)),
+    (b'{"sql": "insert u ?", "many": [["a"], ["b"]]}',
+     (None, "insert u ?", [], [["a"], ["b"]])),
+])
+def test_parse_request(line, request_):
+    assert parse_request(line) == request_
+
+
+@pytest.mark.parametrize('line, message', [
+    (b'{"sql": ', "неверный JSON"),
+    (b'{"id": 1}', "строку 'sql'"),
+    (b'{"sql": "select u", "params": 5}', "должны быть списками"),
+    (b'{"sql": "insert u ?", "many": [1, 2]}', "должны быть списками"),
+])
+def test_parse_request_errors(line, message):
+    with pytest.raises(QuerySyntaxError, match=message):
+        parse_request(line)
+
+
+def test_response_decoding():
+    assert json.loads(encode_request(3, "insert u ?", many=[("a",)])) == {
+        'id': 3, 'sql': "insert u ?", 'params': [], 'many': [["a"]],
+    }
+    result = decode_response(json.dumps({
+        'ok': True, 'columns': [["id", "int"]], 'rows': [{'id': 1}],
+        'rowcount': -1, 'lastrowid': None,
+    }))
+    assert result.columns == [("id", "int")] and result.fetchall() == [{'id': 1}]
+    with pytest.raises(TableNotFoundError, match="нет"):
+        decode_response(
+            '{"ok": false, "error": "TableNotFoundError", "message": "нет"}'
+        )
+    with pytest.raises(ConnectionError):
+        decode_response(b'')
+
+
+def test_gate_readers_share_writer_waits():
+    """Чтения идут одновременно; ожидающий писатель пропускается вперёд
+    новых читателей и работает монопольно"""
+    async def scenario():
+        gate = _Gate()
+        log = []
+        release = asyncio.Event()
+
+        async def use(name, access, hold=None):
+            async with access():
+                log.append(f"+{name}")
+                if hold is not None:
+                    await hold.wait()
+                await asyncio.sleep(0)
+                log.append(f"-{name}")
+
+        tasks = [
+            asyncio.create_task(use("r1", gate.read, release)),
+            asyncio.create_task(use("r2", gate.read, release)),
+        ]
+        await asyncio.sleep(0.01)
+        tasks.append(asyncio.create_task(use("w", gate.write)))
+        await asyncio.sleep(0.01)
+        tasks.append(asyncio.create_task(use("r3", gate.read)))
+        await asyncio.sleep(0.01)
+        assert log == ["+r1", "+r2"]
+        release.set()
+        await asyncio.gather(*tasks)
+        return log
+
+    log = asyncio.run(scenario())
+    assert sorted(log[:4]) == ["+r1", "+r2", "-r1", "-r2"]
+    assert log[4:] == ["+w", "-w", "+r3", "-r3"]
+
+
+def test_write_blocks_only_its_table():
+    """Запись в u не мешает читать v; изменение схемы ждёт всех"""
+    async def scenario():
+        server = DatabaseServer(workers=1)
+        try:
+            writing = AsyncExitStack()
+            await server._access(
+                SimpleNamespace(command="insert", tables=["u"]), writing
+            )
+
+            async def access(command, tables):
+                async with AsyncExitStack() as stack:
+                    await server._access(
+                        SimpleNamespace(command=command, tables=tables), stack
+                    )
+
+            await asyncio.wait_for(access("select", ["v"]), 1)
+            waiting = [
+                asyncio.create_task(access("select", ["u"])),
+                asyncio.create_task(access("select", ["v", "u"])),
+                asyncio.create_task(access("create_table", [])),
+            ]
+            await asyncio.sleep(0.01)
+            assert not any(task.done() for task in waiting)
+            await writing.aclose()
+            await asyncio.wait_for(asyncio.gather(*waiting), 1)
+        finally:
+            server.pool.shutdown()
+            server.connection.close()
+
+    asyncio.run(scenario())
+
+
+@asynccontextmanager
+async def running_server():
+    server = DatabaseServer(workers=2)
+    loop = asyncio.get_running_loop()
+    address = loop.create_future()
+    serving = asyncio.create_task(
+        server.serve('127.0.0.1', 0, lambda *bound: address.set_result(bound))
+    )
+    try:
+        yield await address
+    finally:
+        serving.cancel()
+        try:
+            await serving
+        except asyncio.CancelledError:
+            pass
+
+
+def test_pipelined_requests_answered_in_order():
+    """Несколько запросов одной записью в сокет: ответы по одному на строку,
+    в порядке запросов, с их id; ошибка запроса не рвёт соединение"""
+    async def scenario():
+        async with running_server() as (host, port):
+            reader, writer = await asyncio.open_connection(host, port)
+            writer.write(b"".join([
+                b"create_table u name:str\n",
+                b"\n",
+                encode_request(1, "insert u ?", many=[("a",), ("b",)]),
+                b'{"sql": \n',
+                encode_request(2, "select name from u where id = ?", (2,)),
+                encode_request(3, "begin"),
+                "select nosuch\n".encode(),
+            ]))
+            await writer.drain()
+            responses = [json.loads(await reader.readline()) for _ in range(6)]
+            writer.close()
+            return responses
+
+    created, inserted, broken, selected, begin, missing = asyncio.run(scenario())
+    assert created['ok'] and created['id'] is None
+    assert (inserted['id'], inserted['rowcount'], inserted['lastrowid']) == (1, 2, 2)
+    assert broken['error'] == 'QuerySyntaxError' and broken['id'] is None
+    assert selected['id'] == 2 and selected['rows'] == [{'name': "b"}]
+    assert begin['error'] == 'TransactionError'
+    assert missing['error'] == 'TableNotFoundError'
+
+
+def test_oversized_request_closes_connection(monkeypatch):
+    monkeypatch.setattr(server_module, 'MAX_REQUEST_BYTES', 64)
+
+    async def scenario():
+        async with running_server() as (host, port):
+            reader, writer = await asyncio.open_connection(host, port)
+            writer.write(b"select u where name = '" + b"x" * 200 + b"'\n")
+            await writer.drain()
+            assert await reader.read() == b''
+            writer.close()
+
+    asyncio.run(scenario())
+
+
+def test_async_client_pool():
+    async def scenario():
+        async with running_server() as (host, port):
+            async with AsyncClientPool(host, port, size=3) as db:
+                await db.execute("create_table u name:str age:int")
+                await asyncio.gather(*(
+                    db.execute("insert u ? ?", (f"user{i}", i)) for i in range(10)
+                ))
+                result = await db.execute("select count(*) from u where age >= ?", (5,))
+                assert result.scalar() == 5
+                with pytest.raises(TransactionError):
+                    await db.execute("commit")
+                assert len(db._idle) <= 3
+
+    asyncio.run(scenario())
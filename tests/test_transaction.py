@@ -0,0 +1,119 @@
+import copy
+import os
+from collections import Counter
+
+import pytest
+
+from src.primitive_db import transaction
+from src.primitive_db.api import connect
+from src.primitive_db.errors import TransactionError
+from src.primitive_db.indexes import build_index, load_table_indexes
+from src.primitive_db.transaction import atomic_write
+from src.primitive_db.utils import METADATA_FILE, load_metadata, load_table_data
+
+
+def make_table(db):
+    db.execute("create_table u name:str age:int")
+    db.execute("create_index u age")
+    db.executemany("insert u ? ?", [(f"user{i}", i % 5) for i in range(10)])
+
+
+def snapshot(db):
+    """Строки и индекс таблицы u в том виде, в каком их видит процесс"""
+    table_info = load_metadata(METADATA_FILE)['tables']['u']
+    table_data = load_table_data('u', table_info)
+    index = load_table_indexes('u', table_info, table_data)['age']
+    return (
+        [dict(record) for record in table_data],
+        copy.deepcopy(index['hash']),
+        db.execute("select id from u where age = 3").fetchall(),
+    )
+
+
+def test_rollback_restores_rows_and_indexes():
+    with connect() as db:
+        make_table(db)
+        before = snapshot(db)
+        db.begin()
+        db.execute("insert u ? ?", ("new", 3))
+        db.execute("update u set age = ? where name = ?", (3, "user0"))
+        db.execute("delete u where age = 4")
+        assert len(db.execute("select id from u where age = 3").fetchall()) == 4
+        db.rollback()
+
+        assert snapshot(db) == before
+        table_info = load_metadata(METADATA_FILE)['tables']['u']
+        table_data = load_table_data('u', table_info)
+        assert before[1] == build_index(table_data, 'age')['hash']
+
+
+def test_commit_writes_each_staged_file_once(monkeypatch):
+    """Сколько бы команд ни меняли таблицу, при commit каждый файл
+    заменяется один раз, а до commit на диск ничего не пишется"""
+    replaced = Counter()
+    replace = os.replace
+
+    def counting_replace(source, target):
+        replaced[target] += 1
+        replace(source, target)
+
+    with connect() as db:
+        make_table(db)
+        monkeypatch.setattr(transaction.os, 'replace', counting_replace)
+        with db.transaction():
+            for i in range(5):
+                db.execute("insert u ? ?", (f"tx{i}", i))
+            db.execute("update u set age = ? where age = ?", (9, 1))
+            db.execute("delete u where name = ?", ("user0",))
+            assert not replaced
+        assert replaced
+        assert set(replaced.values()) == {1}
+        assert os.path.join('data', 'u.json') in replaced
+
+        rows = db.execute("select name from u where age = 9").fetchall()
+        assert rows == [{'name': 'user1'}, {'name': 'user6'}, {'name': 'tx1'}]
+        assert db.execute("select count(*) from u").scalar() == 14
+
+
+def test_transaction_errors():
+    with connect() as db:
+        make_table(db)
+        with pytest.raises(TransactionError):
+            db.commit()
+        db.begin()
+        with pytest.raises(TransactionError):
+            db.begin()
+        db.rollback()
+
+
+def test_atomic_write_replaces_file_after_fsync(monkeypatch):
+    synced = []
+    fsync = os.fsync
+
+    def counting_fsync(descriptor):
+        synced.append(descriptor)
+        fsync(descriptor)
+
+    monkeypatch.setattr(transaction.os, 'fsync', counting_fsync)
+    with open('file.txt', 'w', encoding='utf-8') as file:
+        file.write('old')
+    with atomic_write('file.txt') as file:
+        file.write('new')
+        with open('file.txt', encoding='utf-8') as current:
+            assert current.read() == 'old'
+    with open('file.txt', encoding='utf-8') as file:
+        assert file.read() == 'new'
+    assert synced
+    assert os.listdir('.') == ['file.txt']
+
+
+def test_atomic_write_failure_keeps_original():
+    with open('file.txt', 'w', encoding='utf-8') as file:
+        file.write('old')
+    with pytest.raises(RuntimeError):
+        with atomic_write('file.txt') as file:
+            file.write('partial')
+            raise RuntimeError("сбой посреди записи")
+    with open('file.txt', encoding='utf-8') as file:
+        assert file.read() == 'old'
+    assert os.listdir('.') == ['file.txt']
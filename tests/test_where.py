@@ -0,0 +1,155 @@
+import pytest
+
+from src.primitive_db.api import connect
+from src.primitive_db.errors import QuerySyntaxError
+from src.primitive_db.indexes import build_index, find_candidates
+from src.primitive_db.where import compile_where, parse_where
+
+RECORDS = [
+    {'id': i + 1, 'name': name, 'age': age, 'ok': i % 2 == 0}
+    for i, (name, age) in enumerate([
+        ("Анна", 17), ("Борис", 30), ("Вера", 45), ("Глеб", 30),
+        ("Алла", 64), ("Антон", 18), ("Дина", 5), ("a_b", 30),
+    ])
+]
+
+CASES = [
+    ("age = 30", lambda r: r['age'] == 30),
+    ("age != 30", lambda r: r['age'] != 30),
+    ("age <> 30", lambda r: r['age'] != 30),
+    ("age < 18", lambda r: r['age'] < 18),
+    ("age <= 18", lambda r: r['age'] <= 18),
+    ("age > 30", lambda r: r['age'] > 30),
+    ("age >= 30", lambda r: r['age'] >= 30),
+    ("age > -1", lambda r: True),
+    ("age in (5, 64, 99)", lambda r: r['age'] in (5, 64)),
+    ("age not in (5, 64)", lambda r: r['age'] not in (5, 64)),
+    ("age between 18 and 45", lambda r: 18 <= r['age'] <= 45),
+    ("age not between 18 and 45", lambda r: not 18 <= r['age'] <= 45),
+    ("name like 'А%'", lambda r: r['name'].startswith("А")),
+    ("name like '%а'", lambda r: r['name'].endswith("а")),
+    ("name like '_ера'", lambda r: r['name'] == "Вера"),
+    ("name like 'a_b'", lambda r: r['name'] == "a_b"),
+    ("name not like 'А%'", lambda r: not r['name'].startswith("А")),
+    ("name = 'Вера'", lambda r: r['name'] == "Вера"),
+    ("name = Вера", lambda r: r['name'] == "Вера"),
+    ("name > 'В'", lambda r: r['name'] > "В"),
+    ("name > 5", lambda r: False),
+    ("age < 'x'", lambda r: False),
+    ("ok = true", lambda r: r['ok']),
+    ("ok = 0", lambda r: not r['ok']),
+    ("age = 30 or age = 5 and ok = true",
+     lambda r: r['age'] == 30 or (r['age'] == 5 and r['ok'])),
+    ("(age = 30 or age = 5) and ok = true",
+     lambda r: r['age'] in (30, 5) and r['ok']),
+    ("not age = 30 and ok = false", lambda r: r['age'] != 30 and not r['ok']),
+    ("not (age = 30 and ok = false)", lambda r: not (r['age'] == 30 and not r['ok'])),
+    ("NOT age >= 30 OR name LIKE 'Г%'",
+     lambda r: r['age'] < 30 or r['name'].startswith("Г")),
+    ("missing = 1", lambda r: False),
+]
+
+
+def matching(where):
+    predicate = compile_where(parse_where(where))
+    return [record['id'] for record in RECORDS if predicate(record)]
+
+
+@pytest.mark.parametrize('where, expected', CASES)
+def test_operators(where, expected):
+    assert matching(where) == [r['id'] for r in RECORDS if expected(r)]
+
+
+def test_precedence():
+    """NOT связывает сильнее AND, AND — сильнее OR"""
+    assert parse_where("a = 1 or not b = 2 and c = 3") == (
+        'or', (
+            ('cmp', '=', 'a', 1),
+            ('and', (('not', ('cmp', '=', 'b', 2)), ('cmp', '=', 'c', 3))),
+        ),
+    )
+
+
+@pytest.mark.parametrize('where, message', [
+    ("age > 1.5", "дробное число '1.5'"),
+    ("age = -0.5", "дробное число '-0.5'"),
+    ("age in (1, 2.0)", "дробное число '2.0'"),
+    ("age between .5 and 3", "дробное число '.5'"),
+    ("age = 1e3", "дробное число '1e3'"),
+    ("", "пустое условие"),
+    ("age", "ожидалось"),
+    ("age = 1 and", "ожидалось"),
+    ("(age = 1", r"ожидалось '\)'"),
+    ("age = 1)", "лишний фрагмент"),
+    ("age like 5", "шаблон LIKE"),
+    ("age = ?", "параметр '?'"),
+])
+def test_syntax_errors(where, message):
+    with pytest.raises(QuerySyntaxError, match=message):
+        parse_where(where)
+
+
+def test_compiled_predicate_is_cached():
+    """Одно и то же условие компилируется один раз"""
+    compile_where.cache_clear()
+    first = compile_where(parse_where("age between 18 and 45 and ok = true"))
+    again = compile_where(parse_where("age  BETWEEN 18 AND 45 AND ok = TRUE"))
+    assert first is again
+    assert compile_where.cache_info().hits == 1
+
+
+INDEX_CASES = [
+    ("age = 30", 'hash', [2, 4, 8]),
+    ("age in (5, 64)", 'hash', [5, 7]),
+    ("age = 30 and ok = false", 'hash', [2, 4, 8]),
+    ("age = 30 or age = 5", 'hash', [2, 4, 7, 8]),
+    ("age > 30", 'sorted', [3, 5]),
+    ("age >= 30", 'sorted', [2, 3, 4, 5, 8]),
+    ("age < 18", 'sorted', [1, 7]),
+    ("age <= 18", 'sorted', [1, 6, 7]),
+    ("age between 18 and 30", 'sorted', [2, 4, 6, 8]),
+    ("age < 18 or age = 64", 'sorted', [1, 5, 7]),
+    ("age > 30", 'hash', None),
+    ("not age = 30", 'hash', None),
+    ("age = 30 or ok = true", 'hash', None),
+    ("name like 'А%'", 'sorted', None),
+    ("age > 'x'", 'sorted', None),
+]
+
+
+@pytest.mark.parametrize('where, kind, candidates', INDEX_CASES)
+def test_index_candidates(where, kind, candidates):
+    """Равенства и IN идут по хэшу, диапазоны — по sorted-индексу; условия,
+    которые индекс не сужает, дают None (полный просмотр)"""
+    indexes = {'age': build_index(RECORDS, 'age', kind)}
+    positions = find_candidates(indexes, parse_where(where))
+    if candidates is None:
+        assert positions is None
+    else:
+        assert [RECORDS[p]['id'] for p in positions] == candidates
+
+
+@pytest.mark.parametrize('kind', ['hash', 'sorted'])
+def test_indexed_select_matches_scan(kind):
+    with connect() as db:
+        db.execute("create_table u name:str age:int ok:bool")
+        db.executemany(
+            "insert u ? ? ?", [(r['name'], r['age'], r['ok']) for r in RECORDS]
+        )
+        queries = [
+            f"select id from u where {where}"
+            for where, _ in CASES if not where.startswith("missing")
+        ]
+        scanned = [db.execute(query).fetchall() for query in queries]
+        db.execute(f"create_index u age {kind}")
+        assert [db.execute(query).fetchall() for query in queries] == scanned
+
+
+def test_decimal_literal_is_rejected_by_api():
+    """age > 1.5 — ошибка синтаксиса, а не пустой результат"""
+    with connect() as db:
+        db.execute("create_table u age:int")
+        db.execute("insert u 2")
+        with pytest.raises(QuerySyntaxError, match="дробное число '1.5'"):
+            db.execute("select from u where age > 1.5")
+        assert db.execute("select count(*) from u where age > ?", (1,)).scalar() == 1